@@ -30,6 +30,12 @@ class Settings(BaseSettings):
     DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
     DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Pool of the async engine behind the async routes. It is separate from the
+    # sync pool above, so each worker can hold up to DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW + ASYNC_DB_POOL_SIZE + ASYNC_DB_MAX_OVERFLOW connections;
+    # size the pair together against the server's connection limit.
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", os.getenv("DB_POOL_SIZE", "5")))
+    ASYNC_DB_MAX_OVERFLOW: int = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", os.getenv("DB_MAX_OVERFLOW", "10")))
     
     # Security settings
     SECRET_KEY: str = os.getenv(
@@ -62,7 +68,46 @@ class Settings(BaseSettings):
     
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
-    
+
+    # Stock data freshness
+    STOCK_FRESHNESS_SECONDS: int = int(os.getenv("STOCK_FRESHNESS_SECONDS", "900"))
+    STOCK_REFRESH_RETRY_SECONDS: int = int(os.getenv("STOCK_REFRESH_RETRY_SECONDS", "60"))
+    STOCK_REFRESH_WORKERS: int = int(os.getenv("STOCK_REFRESH_WORKERS", "4"))
+    BATCH_QUOTE_MAX_ITEMS: int = int(os.getenv("BATCH_QUOTE_MAX_ITEMS", "5000"))
+    PRICE_DOWNLOAD_MAX_STOCKS: int = int(os.getenv("PRICE_DOWNLOAD_MAX_STOCKS", "500"))
+
+    # Technical indicators
+    INDICATOR_LOOKBACK_DAYS: int = int(os.getenv("INDICATOR_LOOKBACK_DAYS", "400"))
+    INDICATOR_BATCH_SIZE: int = int(os.getenv("INDICATOR_BATCH_SIZE", "2000"))
+
+    # In-process price history arrays
+    PRICE_CACHE_MAX_MB: int = int(os.getenv("PRICE_CACHE_MAX_MB", "256"))
+    PRICE_CACHE_TTL_SECONDS: int = int(os.getenv("PRICE_CACHE_TTL_SECONDS", "300"))
+
+    # Price history storage: "sql" reads stock_prices, "mmap" reads
+    # memory-mapped columnar files kept in step with it
+    PRICE_STORE_BACKEND: str = os.getenv("PRICE_STORE_BACKEND", "sql")
+    PRICE_STORE_PATH: str = os.getenv("PRICE_STORE_PATH", "data/prices")
+    # Bars older than this many days move to Parquet files; 0 keeps all in SQL
+    PRICE_ARCHIVE_AFTER_DAYS: int = int(os.getenv("PRICE_ARCHIVE_AFTER_DAYS", "0"))
+    PRICE_ARCHIVE_PATH: str = os.getenv("PRICE_ARCHIVE_PATH", "data/archive")
+    # PostgreSQL only: range partitions of stock_prices per "year" or "month",
+    # or "none"; partitions older than the retention window are dropped
+    PRICE_PARTITION_INTERVAL: str = os.getenv("PRICE_PARTITION_INTERVAL", "year")
+    PRICE_PARTITIONS_AHEAD: int = int(os.getenv("PRICE_PARTITIONS_AHEAD", "3"))
+    PRICE_RETENTION_DAYS: int = int(os.getenv("PRICE_RETENTION_DAYS", "0"))
+
+    # Analytics results
+    ANALYTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "5000"))
+    ANALYTICS_CACHE_TTL_SECONDS: int = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+    ANALYTICS_CACHE_MAX_MB: int = int(os.getenv("ANALYTICS_CACHE_MAX_MB", "512"))
+    ANALYTICS_MAX_STOCKS: int = int(os.getenv("ANALYTICS_MAX_STOCKS", "5000"))
+    CORRELATION_BLOCK_SIZE: int = int(os.getenv("CORRELATION_BLOCK_SIZE", "512"))
+    ROLLING_BLOCK_SIZE: int = int(os.getenv("ROLLING_BLOCK_SIZE", "512"))
+
+    # Listing totals
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "300"))
+
     # API documentation
     API_V1_PREFIX: str = "/api/v1"
     DOCS_URL: Optional[str] = "/docs"
@@ -91,6 +136,20 @@ class Settings(BaseSettings):
             if not self.DATABASE_URL:
                 raise ValueError("DATABASE_URL must be set")
             
+            if self.PRICE_STORE_BACKEND not in ("sql", "mmap"):
+                raise ValueError("PRICE_STORE_BACKEND must be 'sql' or 'mmap'")
+            # Indicator and derived-series windows read only the SQL tier
+            if 0 < self.PRICE_ARCHIVE_AFTER_DAYS < 730:
+                raise ValueError("PRICE_ARCHIVE_AFTER_DAYS must be 0 (disabled) or at least 730")
+            if self.PRICE_PARTITION_INTERVAL not in ("year", "month", "none"):
+                raise ValueError("PRICE_PARTITION_INTERVAL must be 'year', 'month' or 'none'")
+            if 0 < self.PRICE_RETENTION_DAYS < 730:
+                raise ValueError("PRICE_RETENTION_DAYS must be 0 (disabled) or at least 730")
+            # Bars must reach the archive before retention drops them
+            if self.PRICE_ARCHIVE_AFTER_DAYS and self.PRICE_RETENTION_DAYS and \
+                    self.PRICE_RETENTION_DAYS < self.PRICE_ARCHIVE_AFTER_DAYS:
+                raise ValueError("PRICE_RETENTION_DAYS must not be shorter than PRICE_ARCHIVE_AFTER_DAYS")
+            
             # Validate CORS origins
             if not self.CORS_ORIGINS:
                 logger.warning("No CORS origins specified. API may be inaccessible from frontend applications.")
@@ -1,24 +0,0 @@
-from pydantic_settings import BaseSettings
-from typing import Optional
-import os
-
-class Settings(BaseSettings):
-    # Database settings
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./financial_screener.db")
-    
-    # JWT settings
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
-    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-    
-    # API settings
-    API_V1_STR: str = "/api/v1"
-    PROJECT_NAME: str = "Financial Screener API"
-    
-    # CORS settings
-    BACKEND_CORS_ORIGINS: list = ["*"]
-    
-    class Config:
-        case_sensitive = True
-
-settings = Settings() 
\ No newline at end of file
@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine, exc, text
+from sqlalchemy import create_engine, delete, exc, func, inspect, select, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
 import logging
 
@@ -12,10 +14,10 @@ try:
     engine = create_engine(
         settings.DATABASE_URL,
         poolclass=QueuePool,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
-        pool_recycle=1800,  # Recycle connections after 30 minutes
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
         echo=False  # Set to True for SQL query logging
     )
     
@@ -31,6 +33,37 @@ except exc.SQLAlchemyError as e:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the same databases
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg"
+}
+
+def async_database_url(url: str) -> URL:
+    """
+    DATABASE_URL with its driver swapped for the async one
+    """
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+# Async engine over the same database for request handlers; connections
+# are opened on first use. Its pool comes on top of the sync one (see
+# ASYNC_DB_POOL_SIZE in app.config)
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=False
+)
+
+# Loaded attributes stay usable after commit, as handlers return them
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -48,13 +81,71 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Dependency for getting an async DB session with error handling
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except exc.SQLAlchemyError as e:
+            logger.error(f"Database session error: {str(e)}")
+            await db.rollback()
+            raise
+
 def create_tables():
     """
     Create all tables in the database with error handling
     """
+    # Imported here: the models module imports Base from this one
+    from app.db.partitioning import create_partitioned_table, ensure_partitions
+
     try:
+        # stock_prices must exist as a partitioned table before create_all()
+        create_partitioned_table(engine)
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created successfully")
     except exc.SQLAlchemyError as e:
         logger.error(f"Error creating database tables: {str(e)}")
         raise
+
+    ensure_indexes()
+    ensure_partitions(engine)
+
+# Unique indexes added over tables that may already hold duplicate rows;
+# all but the newest row (highest id) of each duplicate group are deleted
+# before the index is created
+DEDUPLICATED_INDEXES = {"ix_stock_prices_stock_id_date"}
+
+def ensure_indexes(bind=None):
+    """
+    Create indexes added to models after their tables already existed.
+    create_all() only creates indexes together with new tables.
+    """
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                if index.name in DEDUPLICATED_INDEXES:
+                    delete_duplicates(bind, table, [column.name for column in index.columns])
+                index.create(bind=bind)
+            except exc.SQLAlchemyError as e:
+                logger.warning(f"Could not create index {index.name}: {str(e)}")
+
+def delete_duplicates(bind, table, columns) -> int:
+    """
+    Delete rows of `table` sharing `columns` with a newer row, keeping the
+    one with the highest id. Returns the number of rows deleted.
+    """
+    keep = select(func.max(table.c.id)).group_by(*[table.c[name] for name in columns])
+    with bind.begin() as conn:
+        deleted = conn.execute(delete(table).where(table.c.id.notin_(keep))).rowcount
+    if deleted:
+        logger.warning(f"Deleted {deleted} duplicate rows from {table.name} on {', '.join(columns)}")
+    return deleted
@@ -1,26 +0,0 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import settings
-
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///"),
-    echo=True,
-    future=True
-)
-
-# Create async session factory
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
-
-# Create base class for models
-Base = declarative_base()
-
-# Dependency to get DB session
-async def get_db():
-    async with async_session() as session:
-        try:
-            yield session
-        finally:
-            await session.close() 
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Declarative range partitioning of stock_prices by date on PostgreSQL.
+
+The parent table is partitioned by RANGE (date) with one partition per
+year or month (`stock_prices_p2024` / `stock_prices_p2024_01`) plus a
+DEFAULT partition for bars older than the first managed partition. Its
+primary key is (id, date), as PostgreSQL requires the partition key in
+every unique constraint; indexes are the model's own and are created on
+the parent, so every partition inherits them.
+
+Other databases keep the plain table and every function here is a no-op.
+"""
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+import logging
+import re
+
+from sqlalchemy import Column, MetaData, Table, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.models.stock import StockPrice, StockPriceCoverage, StockPriceDerived
+from app.services.price_archive import get_price_archive
+
+logger = logging.getLogger(__name__)
+
+TABLE = StockPrice.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+# First managed partition when no retention is configured
+FIRST_PARTITION_DATE = date(2000, 1, 1)
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(?:_(\d{{2}}))?$")
+
+def is_enabled(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql" and settings.PRICE_PARTITION_INTERVAL != "none"
+
+def _period_start(day: date, interval: str) -> date:
+    return date(day.year, 1, 1) if interval == "year" else date(day.year, day.month, 1)
+
+def _next_period(start: date, interval: str) -> date:
+    if interval == "year":
+        return date(start.year + 1, 1, 1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+def _partition_name(start: date, interval: str) -> str:
+    suffix = f"{start.year}" if interval == "year" else f"{start.year}_{start.month:02d}"
+    return f"{TABLE}_p{suffix}"
+
+def _partition_range(name: str) -> Optional[Tuple[date, date]]:
+    """[start, end) of a managed partition, from its name"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    year, month = int(match.group(1)), match.group(2)
+    if month is None:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    start = date(year, int(month), 1)
+    return start, _next_period(start, "month")
+
+def _table_kind(conn: Connection) -> Optional[str]:
+    """'p' for a partitioned table, 'r' for a plain one, None if missing"""
+    return conn.execute(text(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = :name AND n.nspname = current_schema()"
+    ), {"name": TABLE}).scalar()
+
+def _partitions(conn: Connection) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "JOIN pg_namespace n ON n.oid = p.relnamespace "
+        "WHERE p.relname = :name AND n.nspname = current_schema()"
+    ), {"name": TABLE}).scalars())
+
+def partitioned_table(metadata: MetaData) -> Table:
+    """
+    The stock_prices columns as a RANGE (date) partitioned table keyed on (id, date)
+    """
+    source = StockPrice.__table__
+    return Table(
+        TABLE,
+        metadata,
+        *[
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.name in ("id", "date"),
+                autoincrement=column.name == "id",
+                nullable=column.nullable and column.name not in ("id", "date"),
+                server_default=column.server_default.arg if column.server_default is not None else None
+            )
+            for column in source.columns
+        ],
+        postgresql_partition_by="RANGE (date)"
+    )
+
+def _first_partition_date(today: date) -> date:
+    if settings.PRICE_RETENTION_DAYS:
+        return today - timedelta(days=settings.PRICE_RETENTION_DAYS)
+    return FIRST_PARTITION_DATE
+
+def _create_table(conn: Connection) -> None:
+    partitioned_table(MetaData()).create(conn)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    for index in StockPrice.__table__.indexes:
+        index.create(conn)
+
+def create_partitioned_table(engine: Engine) -> bool:
+    """
+    Create stock_prices as a partitioned table if it does not exist yet.
+    Must run before metadata.create_all(), which would create a plain
+    table. Returns whether the table was created.
+    """
+    if not is_enabled(engine):
+        return False
+    with engine.begin() as conn:
+        if _table_kind(conn) is not None:
+            return False
+        _create_table(conn)
+        _create_partitions(conn, date.today())
+    logger.info(f"Created {TABLE} partitioned by {settings.PRICE_PARTITION_INTERVAL}")
+    return True
+
+def _create_partitions(conn: Connection, today: date, first: Optional[date] = None) -> List[str]:
+    interval = settings.PRICE_PARTITION_INTERVAL
+    period = _period_start(first or _first_partition_date(today), interval)
+    last = _period_start(today, interval)
+    for _ in range(settings.PRICE_PARTITIONS_AHEAD):
+        last = _next_period(last, interval)
+
+    existing = _partitions(conn)
+    covered = [r for r in map(_partition_range, existing) if r is not None]
+    created = []
+    while period <= last:
+        end = _next_period(period, interval)
+        name = _partition_name(period, interval)
+        # Skip periods already covered, e.g. after switching interval
+        if name not in existing and not any(lo < end and period < hi for lo, hi in covered):
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                        f"FOR VALUES FROM ('{period.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                # e.g. rows for the period already sit in the default partition
+                logger.warning(f"Could not create partition {name}: {str(e)}")
+        period = end
+    if created:
+        logger.info(f"Created {len(created)} {TABLE} partitions: {', '.join(created)}")
+    return created
+
+def ensure_partitions(engine: Engine, today: Optional[date] = None) -> List[str]:
+    """
+    Create missing partitions from the first managed period through
+    PRICE_PARTITIONS_AHEAD periods past today. Returns their names.
+    """
+    if not is_enabled(engine):
+        return []
+    with engine.begin() as conn:
+        if _table_kind(conn) != "p":
+            logger.warning(
+                f"{TABLE} is not partitioned; run app/scripts/partition_stock_prices.py to convert it"
+            )
+            return []
+        return _create_partitions(conn, today or date.today())
+
+def drop_expired_partitions(engine: Engine, today: Optional[date] = None) -> List[str]:
+    """
+    Drop partitions that lie entirely before the retention cutoff and delete
+    older bars from the default partition, along with their derived rows
+    and, unless the archive still serves them, their fetch coverage.
+    Returns the names of the dropped partitions.
+    """
+    if not is_enabled(engine) or not settings.PRICE_RETENTION_DAYS:
+        return []
+    cutoff = (today or date.today()) - timedelta(days=settings.PRICE_RETENTION_DAYS)
+
+    dropped = []
+    with engine.begin() as conn:
+        if _table_kind(conn) != "p":
+            return []
+        for name in _partitions(conn):
+            bounds = _partition_range(name)
+            if bounds is not None and bounds[1] <= cutoff:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date < :cutoff"), {"cutoff": cutoff})
+        conn.execute(
+            text(f"DELETE FROM {StockPriceDerived.__tablename__} WHERE date < :cutoff"), {"cutoff": cutoff}
+        )
+        # Archived bars were moved out before the drop and are still served
+        if get_price_archive() is None:
+            trim_coverage(conn, cutoff)
+    if dropped:
+        logger.info(f"Dropped {TABLE} partitions before {cutoff}: {', '.join(dropped)}")
+    return dropped
+
+def trim_coverage(conn: Connection, cutoff: date) -> None:
+    """
+    Forget fetch coverage of dates before `cutoff`, so ranges whose bars
+    were dropped are fetched again when requested instead of read as empty
+    """
+    coverage = StockPriceCoverage.__tablename__
+    conn.execute(text(f"DELETE FROM {coverage} WHERE end_date < :cutoff"), {"cutoff": cutoff})
+    conn.execute(
+        text(f"UPDATE {coverage} SET start_date = :cutoff WHERE start_date < :cutoff"), {"cutoff": cutoff}
+    )
+
+def partition_existing_table(engine: Engine, batch_days: int = 366) -> bool:
+    """
+    Convert a plain stock_prices table into a partitioned one in a single
+    transaction: the old table is renamed, its rows copied one date range
+    at a time, and it is dropped once the id sequence has been carried
+    over. Returns whether a conversion happened.
+    """
+    if not is_enabled(engine):
+        return False
+    old = f"{TABLE}_unpartitioned"
+    columns = ", ".join(column.name for column in StockPrice.__table__.columns)
+    with engine.begin() as conn:
+        if _table_kind(conn) != "r":
+            return False
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old}"))
+        # Free the index and sequence names for the new table
+        for index in StockPrice.__table__.indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_unpartitioned"))
+        conn.execute(text(f"ALTER INDEX IF EXISTS {TABLE}_pkey RENAME TO {TABLE}_unpartitioned_pkey"))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABLE}_id_seq RENAME TO {TABLE}_unpartitioned_id_seq"))
+
+        first, last = conn.execute(text(f"SELECT min(date), max(date) FROM {old}")).one()
+        _create_table(conn)
+        today = date.today()
+        _create_partitions(conn, today, min(first, _first_partition_date(today)) if first else None)
+
+        start = first
+        while start is not None and start <= last:
+            end = start + timedelta(days=batch_days)
+            conn.execute(text(
+                f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {old} "
+                "WHERE date >= :start AND date < :end"
+            ), {"start": start, "end": end})
+            start = end
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)"
+        ))
+        conn.execute(text(f"DROP TABLE {old}"))
+    logger.info(f"Converted {TABLE} to a partitioned table")
+    return True
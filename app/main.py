@@ -3,17 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import uvicorn
 import logging
 import time
 from typing import Callable
 
-from app.database import get_db, create_tables
-from app.routers import screens, auth, stocks
+from app.database import get_async_db, async_engine, create_tables
+from app.routers import screens, auth, stocks, analytics, portfolios
 from app.config import settings
 from app.tasks.stock_sync import start_stock_sync
+from app.services.stock_refresh_service import stock_refresh_service
 
 # Configure logging
 logging.basicConfig(
@@ -86,6 +87,16 @@ app.include_router(
     prefix=f"{settings.API_V1_PREFIX}/stocks",
     tags=["Stocks"]
 )
+app.include_router(
+    portfolios.router,
+    prefix=f"{settings.API_V1_PREFIX}/portfolios",
+    tags=["Portfolios"]
+)
+app.include_router(
+    analytics.router,
+    prefix=f"{settings.API_V1_PREFIX}/analytics",
+    tags=["Analytics"]
+)
 
 @app.on_event("startup")
 async def startup_event():
@@ -109,17 +120,17 @@ async def shutdown_event():
     Cleanup on application shutdown
     """
     logger.info("Shutting down application...")
+    stock_refresh_service.shutdown()
+    await async_engine.dispose()
 
 @app.get("/health", tags=["Health"])
-async def health_check():
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """
     Health check endpoint with database connection test
     """
     try:
         # Test database connection
-        db: Session = next(get_db())
-        db.execute(text("SELECT 1"))
-        db.commit()
+        await db.execute(text("SELECT 1"))
         
         return {
             "status": "healthy",
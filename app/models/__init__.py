@@ -1,3 +1,7 @@
 from app.models.user import User
-from app.models.stock import Stock, StockPrice
+from app.models.stock import (
+    Stock, StockPrice, StockPriceCoverage, StockIndicator, StockIndicatorState, StockPriceDerived,
+    StockFactorScore
+)
 from app.models.screen import Screen, ScreenCriteria
+from app.models.portfolio import Portfolio, PortfolioHolding
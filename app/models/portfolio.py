@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class Portfolio(Base):
+    __tablename__ = "portfolios"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True, nullable=False)
+    description = Column(String)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+    
+    # Relationship
+    holdings = relationship(
+        "PortfolioHolding",
+        back_populates="portfolio",
+        cascade="all, delete-orphan",
+        order_by="PortfolioHolding.id"
+    )
+    user = relationship("User")
+
+class PortfolioHolding(Base):
+    __tablename__ = "portfolio_holdings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False)
+    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
+    weight = Column(Float, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    # Relationships
+    portfolio = relationship("Portfolio", back_populates="holdings")
+    stock = relationship("Stock", lazy="joined")
+    
+    @property
+    def symbol(self) -> str:
+        return self.stock.symbol
+    
+    __table_args__ = (
+        Index("ix_portfolio_holdings_portfolio_id_stock_id", "portfolio_id", "stock_id", unique=True),
+    )
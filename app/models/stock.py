@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index, JSON
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -34,3 +34,108 @@ class StockPrice(Base):
     close = Column(Float)
     volume = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_stock_prices_stock_id_date", "stock_id", "date", unique=True),
+    )
+
+class StockPriceCoverage(Base):
+    """
+    Date ranges of price history already fetched from Yahoo Finance.
+    Trading holidays and weekends have no bars, so coverage is tracked
+    explicitly instead of being inferred from the stored rows.
+    """
+    __tablename__ = "stock_price_coverage"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, index=True, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class StockIndicator(Base):
+    """
+    Latest technical indicators per stock, refreshed in bulk for the whole
+    universe by IndicatorService
+    """
+    __tablename__ = "stock_indicators"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, unique=True, index=True, nullable=False)
+    as_of = Column(Date, nullable=False)  # Date of the last bar used
+    sma_20 = Column(Float)
+    sma_50 = Column(Float)
+    sma_200 = Column(Float)
+    rsi_14 = Column(Float)
+    macd = Column(Float)
+    macd_signal = Column(Float)
+    macd_histogram = Column(Float)
+    bollinger_upper = Column(Float)
+    bollinger_middle = Column(Float)
+    bollinger_lower = Column(Float)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class StockIndicatorState(Base):
+    """
+    Running state for O(1) indicator updates as new bars arrive
+    (see app.services.indicator_state.IndicatorState)
+    """
+    __tablename__ = "stock_indicator_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, unique=True, index=True, nullable=False)
+    last_date = Column(Date, nullable=False)
+    bar_count = Column(Integer, nullable=False)
+    closes = Column(JSON, nullable=False)  # Last 201 closes, oldest first
+    sum_20 = Column(Float, nullable=False)
+    sum_50 = Column(Float, nullable=False)
+    sum_200 = Column(Float, nullable=False)
+    gain_14 = Column(Float, nullable=False)
+    loss_14 = Column(Float, nullable=False)
+    ema_12 = Column(Float)  # EMA values as of the bar before last_date
+    ema_26 = Column(Float)
+    macd_signal = Column(Float)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class StockPriceDerived(Base):
+    """
+    Per-bar series derived from stock_prices, kept up to date as bars are
+    ingested (see app.services.derived_series_service)
+    """
+    __tablename__ = "stock_price_derived"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    daily_return = Column(Float)  # Close over the previous bar's close, minus 1
+    log_return = Column(Float)
+    high_52w = Column(Float)  # Highest high over the 52 weeks ending on this bar
+    low_52w = Column(Float)
+    avg_volume_50 = Column(Float)  # Mean volume of the last 50 bars
+    # Indexed for max(updated_at) in screen result validators
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
+    
+    __table_args__ = (
+        Index("ix_stock_price_derived_stock_id_date", "stock_id", "date", unique=True),
+    )
+
+class StockFactorScore(Base):
+    """
+    Cross-sectional rank of one Stock fundamental, refreshed for the whole
+    universe by FactorScoreService (see app.services.factor_service)
+    """
+    __tablename__ = "stock_factor_scores"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stock_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)  # Stock column, e.g. "pe_ratio"
+    pct = Column(Float)  # Percentile rank in the universe, 0-100, ascending
+    sector_pct = Column(Float)
+    sector_z = Column(Float)  # Standard deviations from the sector mean
+    industry_pct = Column(Float)
+    industry_z = Column(Float)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
+    
+    __table_args__ = (
+        Index("ix_stock_factor_scores_stock_id_field", "stock_id", "field", unique=True),
+    )
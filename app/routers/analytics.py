@@ -0,0 +1,213 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import logging
+
+from app.database import get_db
+from app.config import settings
+from app.models.stock import Stock
+from app.models.screen import Screen
+from app.models.user import User
+from app.schemas.analytics import CorrelationMatrix, RollingSeriesList
+from app.utils.security import get_current_user
+from app.utils.fast_json import FastJSONResponse
+from app.services.analytics_cache import analytics_cache
+from app.services.correlation_service import CorrelationService
+from app.services.rolling_service import RollingService, ROLLING_METRICS
+from app.services.screen_service import ScreenService
+from app.services.stock_service import StockService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def _correlation_response(
+    db: Session,
+    members: List[Tuple[int, str]],
+    days: int,
+    min_periods: int,
+    covariance: bool
+) -> FastJSONResponse:
+    """
+    Compute or reuse the correlation matrix for (stock ID, symbol) members
+    """
+    if len(members) < 2:
+        raise ValueError("At least two stocks are needed for a correlation matrix")
+    if len(members) > settings.ANALYTICS_MAX_STOCKS:
+        raise ValueError(f"At most {settings.ANALYTICS_MAX_STOCKS} stocks can be correlated at once")
+    
+    members = sorted(members)
+    ids = [stock_id for stock_id, symbol in members]
+    # Cached per stock set and window until any member gets a new bar
+    last_bars = analytics_cache.latest_bar_dates(db, ids)
+    result = analytics_cache.get_or_compute(
+        ("correlation", tuple(ids), days, min_periods, covariance),
+        analytics_cache.version(last_bars),
+        lambda: CorrelationService(db).compute(ids, days, min_periods, covariance)
+    )
+    
+    # Matrices are encoded straight from the NumPy arrays
+    return FastJSONResponse({
+        "stock_ids": ids,
+        "symbols": [symbol for stock_id, symbol in members],
+        "start_date": result["start_date"],
+        "end_date": result["end_date"],
+        "observations": result["observations"],
+        "min_periods": min_periods,
+        "correlation": result["correlation"],
+        "covariance": result["covariance"]
+    })
+
+@router.get("/correlation", response_model=CorrelationMatrix)
+def get_correlation(
+    stock_ids: Optional[str] = Query(None, description="Comma-separated stock IDs"),
+    symbols: Optional[str] = Query(None, description="Comma-separated stock symbols"),
+    days: int = Query(365, ge=7, le=3650, description="Calendar days of daily returns"),
+    min_periods: int = Query(20, ge=2, description="Minimum common returns per pair"),
+    covariance: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Get pairwise daily-return correlations (and optionally covariances) for
+    the given stocks, or for the whole universe when none are given
+    """
+    try:
+        if stock_ids or symbols:
+            stocks, missing = StockService.resolve_stocks(db, stock_ids, symbols, settings.ANALYTICS_MAX_STOCKS)
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Stocks not found: {', '.join(missing)}"
+                )
+        else:
+            stocks = db.query(Stock.id, Stock.symbol).order_by(Stock.id).limit(
+                settings.ANALYTICS_MAX_STOCKS + 1
+            ).all()
+        
+        members = [(stock.id, stock.symbol) for stock in stocks]
+        return _correlation_response(db, members, days, min_periods, covariance)
+    except ValueError as e:
+        logger.error(f"Validation error computing correlation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing correlation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error computing correlation. Please try again later."
+        )
+
+@router.get("/screens/{screen_id}/correlation", response_model=CorrelationMatrix)
+def get_screen_correlation(
+    screen_id: int,
+    days: int = Query(365, ge=7, le=3650, description="Calendar days of daily returns"),
+    min_periods: int = Query(20, ge=2, description="Minimum common returns per pair"),
+    covariance: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get pairwise daily-return correlations for the stocks matching a screen
+    """
+    screen = db.query(Screen.id, Screen.user_id, Screen.is_public).filter(Screen.id == screen_id).first()
+    if not screen:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Screen with ID {screen_id} not found"
+        )
+    if screen.user_id != current_user.id and not screen.is_public:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this screen"
+        )
+    
+    try:
+        results = ScreenService(db).run_screen(screen_id)["results"]
+        members = [(row["id"], row["symbol"]) for row in results]
+        return _correlation_response(db, members, days, min_periods, covariance)
+    except ValueError as e:
+        logger.error(f"Validation error computing screen correlation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error computing screen correlation: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error computing correlation. Please try again later."
+        )
+
+@router.get("/rolling", response_model=RollingSeriesList)
+def get_rolling_series(
+    stock_ids: Optional[str] = Query(None, description="Comma-separated stock IDs"),
+    symbols: Optional[str] = Query(None, description="Comma-separated stock symbols"),
+    benchmark: Optional[str] = Query(None, description="Benchmark symbol for beta and correlation"),
+    metrics: str = Query("volatility,sharpe", description="Comma-separated: volatility, sharpe, beta, correlation"),
+    window: int = Query(63, ge=2, le=2520, description="Window length in daily returns"),
+    days: int = Query(3 * 365, ge=7, le=20 * 365, description="Calendar days of history"),
+    risk_free_rate: float = 0.0,
+    db: Session = Depends(get_db)
+):
+    """
+    Get full rolling-window series of volatility, Sharpe ratio and beta and
+    correlation against a benchmark, for every requested stock
+    """
+    try:
+        requested = list(dict.fromkeys(m.strip() for m in metrics.split(",") if m.strip()))
+        invalid = [m for m in requested if m not in ROLLING_METRICS]
+        if not requested or invalid:
+            raise ValueError(f"Invalid metric. Must be one of: {', '.join(ROLLING_METRICS)}")
+        
+        stocks, missing = StockService.resolve_stocks(db, stock_ids, symbols, settings.ANALYTICS_MAX_STOCKS)
+        benchmark_id = None
+        if benchmark:
+            benchmark_id = db.query(Stock.id).filter(Stock.symbol == benchmark.strip().upper()).scalar()
+            if benchmark_id is None:
+                missing.append(benchmark.strip().upper())
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Stocks not found: {', '.join(missing)}"
+            )
+        
+        ids = [stock.id for stock in stocks]
+        last_bars = analytics_cache.latest_bar_dates(db, ids + ([benchmark_id] if benchmark_id else []))
+        result = analytics_cache.get_or_compute(
+            ("rolling", tuple(ids), benchmark_id, tuple(requested), window, days, risk_free_rate),
+            analytics_cache.version(last_bars),
+            lambda: RollingService(db).compute(ids, window, requested, days, benchmark_id, risk_free_rate)
+        )
+        
+        # Each series is a contiguous row of the stocks x dates result arrays
+        return FastJSONResponse({
+            "window": window,
+            "benchmark": benchmark.strip().upper() if benchmark else None,
+            "dates": result["dates"],
+            "series": [
+                {
+                    "stock_id": stock.id,
+                    "symbol": stock.symbol,
+                    **{metric: result[metric][i] for metric in requested}
+                }
+                for i, stock in enumerate(stocks)
+            ]
+        })
+    except ValueError as e:
+        logger.error(f"Validation error computing rolling series: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing rolling series: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error computing rolling series. Please try again later."
+        )
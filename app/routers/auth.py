@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 import logging
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
 from app.utils.security import (
@@ -12,7 +14,7 @@ from app.utils.security import (
     verify_password,
     create_access_token,
     validate_password_strength,
-    get_current_user
+    get_current_user_async
 )
 from app.config import settings
 
@@ -21,7 +23,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user with improved validation and error handling
     """
@@ -34,21 +36,21 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Check if email already exists
-        if db.query(User).filter(User.email == user.email).first():
+        if (await db.execute(select(User.id).where(User.email == user.email))).first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
         # Check if username already exists
-        if db.query(User).filter(User.username == user.username).first():
+        if (await db.execute(select(User.id).where(User.username == user.username))).first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
             )
         
-        # Create new user
-        hashed_password = get_password_hash(user.password)
+        # Create new user; bcrypt is CPU-bound, so keep it off the event loop
+        hashed_password = await run_in_threadpool(get_password_hash, user.password)
         db_user = User(
             email=user.email,
             username=user.username,
@@ -56,8 +58,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         logger.info(f"User registered successfully: {user.username}")
         return db_user
@@ -66,7 +68,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         logger.error(f"Error registering user: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error registering user"
@@ -75,17 +77,17 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user and return JWT token with improved security
     """
     try:
         # Find user by username
-        user = db.query(User).filter(User.username == form_data.username).first()
+        user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
         
         # If user not found or password incorrect
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
             logger.warning(f"Failed login attempt for username: {form_data.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -121,7 +123,7 @@ async def login(
         )
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_async)):
     """
     Get current user information
     """
@@ -0,0 +1,186 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Tuple
+import logging
+
+from app.database import get_db
+from app.models.portfolio import Portfolio, PortfolioHolding
+from app.models.stock import Stock
+from app.models.user import User
+from app.schemas.portfolio import (
+    HoldingBase, PortfolioCreate, PortfolioResponse,
+    PortfolioAnalyticsRequest, PortfolioAnalytics
+)
+from app.utils.security import get_current_user
+from app.services.analytics_cache import analytics_cache
+from app.services.portfolio_service import PortfolioService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def _resolve_holdings(db: Session, holdings: List[HoldingBase]) -> List[Tuple[int, str, float]]:
+    """
+    Map submitted symbols to (stock ID, symbol, weight) with one query
+    """
+    symbols = [h.symbol.strip().upper() for h in holdings]
+    if len(set(symbols)) != len(symbols):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each symbol can only be held once"
+        )
+
+    ids = dict(db.query(Stock.symbol, Stock.id).filter(Stock.symbol.in_(symbols)).all())
+    missing = [s for s in symbols if s not in ids]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Stocks not found: {', '.join(missing)}"
+        )
+    return [(ids[s], s, h.weight) for s, h in zip(symbols, holdings)]
+
+def _analyze(
+    db: Session,
+    holdings: List[Tuple[int, str, float]],
+    days: int,
+    risk_free_rate: float,
+    confidence: float
+):
+    """
+    Compute or reuse portfolio analytics until a holding gets a new bar
+    """
+    try:
+        ids = [stock_id for stock_id, symbol, weight in holdings]
+        last_bars = analytics_cache.latest_bar_dates(db, ids)
+        return analytics_cache.get_or_compute(
+            ("portfolio", tuple(holdings), days, risk_free_rate, confidence),
+            analytics_cache.version(last_bars),
+            lambda: PortfolioService(db).analyze(holdings, days, risk_free_rate, confidence)
+        )
+    except ValueError as e:
+        logger.error(f"Validation error analyzing portfolio: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error analyzing portfolio: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error analyzing portfolio. Please try again later."
+        )
+
+def _get_own_portfolio(db: Session, portfolio_id: int, user: User) -> Portfolio:
+    portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
+    if not portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Portfolio with ID {portfolio_id} not found"
+        )
+    if portfolio.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to access this portfolio"
+        )
+    return portfolio
+
+@router.post("/analytics", response_model=PortfolioAnalytics)
+def analyze_portfolio(
+    request: PortfolioAnalyticsRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get return series, volatility, Sharpe ratio, drawdown, VaR/CVaR and
+    per-holding contributions for submitted holdings without saving them
+    """
+    holdings = _resolve_holdings(db, request.holdings)
+    return _analyze(db, holdings, request.days, request.risk_free_rate, request.confidence)
+
+@router.post("/", response_model=PortfolioResponse, status_code=status.HTTP_201_CREATED)
+def create_portfolio(
+    portfolio: PortfolioCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Save a portfolio of symbols and weights
+    """
+    existing_portfolio = db.query(Portfolio.id).filter(
+        Portfolio.name == portfolio.name,
+        Portfolio.user_id == current_user.id
+    ).first()
+    if existing_portfolio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Portfolio with name '{portfolio.name}' already exists for this user"
+        )
+
+    holdings = _resolve_holdings(db, portfolio.holdings)
+    db_portfolio = Portfolio(
+        name=portfolio.name,
+        description=portfolio.description,
+        user_id=current_user.id,
+        holdings=[
+            PortfolioHolding(stock_id=stock_id, weight=weight)
+            for stock_id, symbol, weight in holdings
+        ]
+    )
+    db.add(db_portfolio)
+    db.commit()
+    db.refresh(db_portfolio)
+
+    return db_portfolio
+
+@router.get("/", response_model=List[PortfolioResponse])
+def get_portfolios(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the current user's portfolios
+    """
+    return db.query(Portfolio).filter(
+        Portfolio.user_id == current_user.id
+    ).order_by(Portfolio.id).all()
+
+@router.get("/{portfolio_id}", response_model=PortfolioResponse)
+def get_portfolio(
+    portfolio_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get portfolio by ID
+    """
+    return _get_own_portfolio(db, portfolio_id, current_user)
+
+@router.delete("/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_portfolio(
+    portfolio_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delete portfolio
+    """
+    db.delete(_get_own_portfolio(db, portfolio_id, current_user))
+    db.commit()
+
+    return None
+
+@router.get("/{portfolio_id}/analytics", response_model=PortfolioAnalytics)
+def get_portfolio_analytics(
+    portfolio_id: int,
+    days: int = Query(365, ge=30, le=3650),
+    risk_free_rate: float = 0.0,
+    confidence: float = Query(0.95, gt=0.5, lt=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get analytics for a saved portfolio
+    """
+    portfolio = _get_own_portfolio(db, portfolio_id, current_user)
+    holdings = [(h.stock_id, h.symbol, h.weight) for h in portfolio.holdings]
+    return _analyze(db, holdings, days, risk_free_rate, confidence)
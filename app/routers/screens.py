@@ -1,36 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
-from sqlalchemy import text, and_, or_
+from sqlalchemy import text, and_, or_, func, select
+from datetime import datetime
 import time
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.screen import Screen, ScreenCriteria
-from app.models.stock import Stock
+from app.models.stock import Stock, StockPriceDerived, StockFactorScore
 from app.schemas.screen import (
     ScreenCreate, ScreenResponse, ScreenUpdate, 
-    ScreenList, ScreenResult
+    ScreenList, ScreenResult, ScreenCriteriaResponse
 )
-from app.utils.security import get_current_user
+from app.utils.security import get_current_user_async
 from app.models.user import User
-from app.services.screen_service import ScreenService
+from app.services.screen_service import AsyncScreenService
+from app.services.count_cache import count_cache
+from app.services.facet_service import facet_service
+from app.utils.pagination import page_query, split_page
+from app.utils.fast_json import FastJSONResponse
+from app.utils.http_cache import make_etag, latest, is_not_modified, set_validators, not_modified
 
 router = APIRouter()
 
+async def _load_screen(db: AsyncSession, screen_id: int) -> Optional[Screen]:
+    """
+    A screen with its criteria, refreshed from the database; async sessions
+    cannot lazy load them during serialization
+    """
+    result = await db.execute(
+        select(Screen).options(selectinload(Screen.criteria)).where(Screen.id == screen_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 @router.post("/", response_model=ScreenResponse, status_code=status.HTTP_201_CREATED)
-def create_screen(
+async def create_screen(
     screen: ScreenCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Create a new screening criteria
     """
     # Check if screen name already exists for this user
-    existing_screen = db.query(Screen).filter(
+    existing_screen = (await db.execute(select(Screen.id).where(
         Screen.name == screen.name,
         Screen.user_id == current_user.id
-    ).first()
+    ))).first()
     
     if existing_screen:
         raise HTTPException(
@@ -47,8 +65,7 @@ def create_screen(
     )
     
     db.add(db_screen)
-    db.commit()
-    db.refresh(db_screen)
+    await db.commit()
     
     # Add criteria
     for criterion in screen.criteria:
@@ -60,24 +77,66 @@ def create_screen(
         )
         db.add(db_criterion)
     
-    db.commit()
-    db.refresh(db_screen)
+    await db.commit()
     
-    return db_screen
+    return await _load_screen(db, db_screen.id)
+
+SCREEN_SORT_COLUMNS = {
+    "id": Screen.id,
+    "name": Screen.name,
+    "created_at": Screen.created_at,
+    "updated_at": Screen.updated_at
+}
+
+# Columns selected by the fast path, in response field order
+SCREEN_RESPONSE_FIELDS = [f for f in ScreenResponse.model_fields if f != "criteria"]
+CRITERIA_RESPONSE_FIELDS = list(ScreenCriteriaResponse.model_fields)
+
+async def _screen_rows(db: AsyncSession, screens) -> List[Dict[str, Any]]:
+    """
+    Shape screen row tuples as ScreenResponse dicts, loading all of their
+    criteria with one query
+    """
+    rows = [row._asdict() for row in screens]
+    by_id = {}
+    for row in rows:
+        row["criteria"] = []
+        by_id[row["id"]] = row
+    if by_id:
+        criteria = (await db.execute(select(
+            *[getattr(ScreenCriteria, f) for f in CRITERIA_RESPONSE_FIELDS]
+        ).where(
+            ScreenCriteria.screen_id.in_(list(by_id))
+        ).order_by(ScreenCriteria.id))).all()
+        for criterion in criteria:
+            by_id[criterion.screen_id]["criteria"].append(criterion._asdict())
+    return rows
 
 @router.get("/", response_model=ScreenList)
-def get_screens(
+async def get_screens(
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fast: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
-    Get list of screens for current user
+    Get list of screens for current user.
+    Pass `next_cursor` from the previous page as `cursor` for keyset paging.
+    With `fast=true` rows are selected as tuples and encoded directly.
     """
     # Query screens owned by current user or public screens
-    query = db.query(Screen).filter(
+    if fast:
+        statement = select(*[getattr(Screen, f) for f in SCREEN_RESPONSE_FIELDS])
+    else:
+        # Criteria are serialized after the session work ends
+        statement = select(Screen).options(selectinload(Screen.criteria))
+    statement = statement.where(
         or_(
             Screen.user_id == current_user.id,
             Screen.is_public == True
@@ -86,54 +145,93 @@ def get_screens(
     
     # Apply name filter if provided
     if name:
-        query = query.filter(Screen.name.ilike(f"%{name}%"))
+        statement = statement.where(Screen.name.ilike(f"%{name}%"))
     
-    # Get total count
-    total = query.count()
+    # Total is cached until the next write to screens
+    total = None
+    if include_total:
+        total = await count_cache.get_or_count_async(Screen, (current_user.id, name), db, statement)
     
-    # Apply pagination
-    screens = query.offset(skip).limit(limit).all()
+    try:
+        page = page_query(
+            statement, SCREEN_SORT_COLUMNS, Screen.id,
+            sort=sort, order=order, cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    result = await db.execute(page)
+    rows = result.all() if fast else result.scalars().all()
+    screens, next_cursor = split_page(rows, SCREEN_SORT_COLUMNS, Screen.id, sort, order, limit)
     
-    return {"screens": screens, "total": total}
+    if fast:
+        return FastJSONResponse({
+            "screens": await _screen_rows(db, screens),
+            "total": total,
+            "next_cursor": next_cursor
+        })
+    return {"screens": screens, "total": total, "next_cursor": next_cursor}
 
-@router.get("/{screen_id}", response_model=ScreenResponse)
-def get_screen(
-    screen_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+async def _get_screen_version(db: AsyncSession, screen_id: int, current_user: User):
     """
-    Get screen by ID
+    Load only the columns needed for access checks and cache validators
     """
-    screen = db.query(Screen).filter(Screen.id == screen_id).first()
+    version = (await db.execute(select(
+        Screen.id, Screen.user_id, Screen.is_public, Screen.created_at, Screen.updated_at
+    ).where(Screen.id == screen_id))).first()
     
-    if not screen:
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Screen with ID {screen_id} not found"
         )
     
     # Check if user has access to this screen
-    if screen.user_id != current_user.id and not screen.is_public:
+    if version.user_id != current_user.id and not version.is_public:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have permission to access this screen"
         )
     
+    return version
+
+@router.get("/{screen_id}", response_model=ScreenResponse)
+async def get_screen(
+    screen_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Get screen by ID. Supports If-None-Match / If-Modified-Since.
+    """
+    version = await _get_screen_version(db, screen_id, current_user)
+    
+    # Answer from the version columns alone when the client copy is current
+    last_modified = version.updated_at or version.created_at
+    etag = make_etag("screen", screen_id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    screen = await _load_screen(db, screen_id)
+    set_validators(response, etag, last_modified)
     return screen
 
 @router.put("/{screen_id}", response_model=ScreenResponse)
-def update_screen(
+async def update_screen(
     screen_id: int,
     screen_update: ScreenUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Update screen
     """
     # Get screen
-    db_screen = db.query(Screen).filter(Screen.id == screen_id).first()
+    db_screen = await _load_screen(db, screen_id)
     
     if not db_screen:
         raise HTTPException(
@@ -152,11 +250,11 @@ def update_screen(
     if screen_update.name is not None:
         # Check if new name already exists for this user
         if screen_update.name != db_screen.name:
-            existing_screen = db.query(Screen).filter(
+            existing_screen = (await db.execute(select(Screen.id).where(
                 Screen.name == screen_update.name,
                 Screen.user_id == current_user.id,
                 Screen.id != screen_id
-            ).first()
+            ))).first()
             
             if existing_screen:
                 raise HTTPException(
@@ -174,35 +272,35 @@ def update_screen(
     
     # Update criteria if provided
     if screen_update.criteria is not None:
-        # Delete existing criteria
-        db.query(ScreenCriteria).filter(ScreenCriteria.screen_id == screen_id).delete()
-        
-        # Add new criteria
-        for criterion in screen_update.criteria:
-            db_criterion = ScreenCriteria(
-                screen_id=screen_id,
+        # Replace the criteria; delete-orphan removes the old rows
+        db_screen.criteria = [
+            ScreenCriteria(
                 field=criterion.field,
                 operator=criterion.operator,
                 value=criterion.value
             )
-            db.add(db_criterion)
+            for criterion in screen_update.criteria
+        ]
+    
+    # Stamp the version explicitly: criteria-only changes do not touch the
+    # screens row, and func.now() has one-second resolution on SQLite
+    db_screen.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(db_screen)
+    await db.commit()
     
-    return db_screen
+    return await _load_screen(db, screen_id)
 
 @router.delete("/{screen_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_screen(
+async def delete_screen(
     screen_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Delete screen
     """
     # Get screen
-    db_screen = db.query(Screen).filter(Screen.id == screen_id).first()
+    db_screen = await _load_screen(db, screen_id)
     
     if not db_screen:
         raise HTTPException(
@@ -218,25 +316,29 @@ def delete_screen(
         )
     
     # Delete screen (cascade will delete criteria)
-    db.delete(db_screen)
-    db.commit()
+    await db.delete(db_screen)
+    await db.commit()
     
     return None
 
 @router.post("/{screen_id}/run", response_model=ScreenResult)
-def run_screen(
+async def run_screen(
     screen_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    include_facets: bool = False,
+    fast: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
-    Execute a screen and return matching stocks
+    Execute a screen and return matching stocks, optionally with sector and
+    industry facet counts for the matches. With `fast=true` the result is
+    encoded directly without response model validation.
     """
     # Start timer for execution time
     start_time = time.time()
     
     # Get screen
-    screen = db.query(Screen).filter(Screen.id == screen_id).first()
+    screen = (await db.execute(select(Screen.user_id, Screen.is_public).where(Screen.id == screen_id))).first()
     
     if not screen:
         raise HTTPException(
@@ -251,14 +353,68 @@ def run_screen(
             detail="You don't have permission to access this screen"
         )
     
+    return await _run_screen_result(db, screen_id, include_facets, fast, start_time)
+
+@router.get("/{screen_id}/results", response_model=ScreenResult)
+async def get_screen_results(
+    screen_id: int,
+    request: Request,
+    response: Response,
+    include_facets: bool = False,
+    fast: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Get the current results of a screen. Supports If-None-Match /
+    If-Modified-Since, so polling clients only download results after the
+    screen or the stock data changes.
+    """
+    start_time = time.time()
+    version = await _get_screen_version(db, screen_id, current_user)
+    
+    # Results depend on the screen definition, on every stock row and on
+    # the derived series and factor scores criteria can filter on
+    stock_count, stocks_updated, derived_updated, scores_updated = (await db.execute(
+        select(
+            func.count(Stock.id),
+            func.max(Stock.last_updated),
+            select(func.max(StockPriceDerived.updated_at)).scalar_subquery(),
+            select(func.max(StockFactorScore.updated_at)).scalar_subquery()
+        )
+    )).one()
+    screen_updated = version.updated_at or version.created_at
+    etag = make_etag(
+        "screen-results", screen_id, screen_updated, stock_count, stocks_updated,
+        derived_updated, scores_updated, include_facets
+    )
+    last_modified = latest(screen_updated, stocks_updated, derived_updated, scores_updated)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    
+    result = await _run_screen_result(db, screen_id, include_facets, fast, start_time)
+    if fast:
+        return set_validators(result, etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return result
+
+async def _run_screen_result(db: AsyncSession, screen_id: int, include_facets: bool, fast: bool, start_time: float):
+    """
+    Run a screen and shape its ScreenResult, optionally with facets
+    """
     try:
         # Create screen service and run the screen
-        screen_service = ScreenService(db)
-        result = screen_service.run_screen(screen_id)
+        result = await AsyncScreenService(db).run_screen(screen_id)
+        
+        if include_facets:
+            await facet_service.ensure_loaded_async(db)
+            result["facets"] = facet_service.facets_for(r["id"] for r in result["results"])
         
         # Add execution time to result
         result["execution_time"] = time.time() - start_time
         
+        if fast:
+            return FastJSONResponse(result)
         return result
         
     except ValueError as e:
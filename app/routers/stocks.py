@@ -1,23 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from sqlalchemy import func
+from typing import List, Optional, Tuple
+from datetime import date, datetime
+from sqlalchemy import func, or_
 import logging
+import math
 
 from app.database import get_db
+from app.config import settings
 from app.models.stock import Stock, StockPrice
 from app.schemas.stock import (
     StockCreate, StockResponse, StockList,
-    StockPriceCreate, StockPriceResponse
+    StockPriceCreate, StockPriceResponse, StockSearchResult,
+    SectorFacet, GroupAggregate, BatchQuoteRequest, BatchQuoteResponse,
+    TechnicalIndicators, StockPerformance, PerformanceList
 )
 from app.utils.security import get_current_user
 from app.models.user import User
 from app.services.yfinance_service import YFinanceService
+from app.services.stock_refresh_service import stock_refresh_service
+from app.services.price_history_service import PriceHistoryService
+from app.services.price_resampling import INTERVALS, resample_ohlcv, downsample
+from app.services.stock_service import StockService, PERFORMANCE_PERIODS
+from app.services.analytics_cache import analytics_cache
+from app.services.performance_service import PerformanceService
+from app.services.derived_series_service import DerivedSeriesService
+from app.services.indicator_service import IndicatorService, INDICATOR_FIELDS
+from app.services.count_cache import count_cache
+from app.services.search_index import search_index
+from app.services.facet_service import facet_service
+from app.services.sector_aggregates import sector_aggregates
+from app.utils.pagination import paginate
+from app.utils.fast_json import FastJSONResponse
+from app.utils.http_cache import make_etag, is_not_modified, set_validators, not_modified
+from app.utils.columnar import (
+    negotiate_format, arrow_available, split_series, to_rows,
+    columnar_json_response, arrow_response
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _finite(value) -> Optional[float]:
+    """Plain float, or None for missing and NaN values"""
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def _stored_indicators(db: Session, stock_id: int, last_bar) -> dict:
+    """
+    Indicators of the stock as of its latest bar from stock_indicators,
+    recomputed over the same lookback window when the row is missing or
+    behind the stored bars. Indicators without enough history are omitted.
+    """
+    service = IndicatorService(db)
+    row = service.get(stock_id)
+    if row is not None and row.as_of == last_bar:
+        values = {name: getattr(row, name) for name in INDICATOR_FIELDS}
+    else:
+        values = analytics_cache.get_or_compute(
+            ("stored_indicators", stock_id),
+            analytics_cache.version({stock_id: last_bar}),
+            lambda: service.compute([stock_id]).get(stock_id, {})
+        )
+    return {name: values[name] for name in INDICATOR_FIELDS if values.get(name) is not None}
+
+def _price_range_validators(
+    price_history: PriceHistoryService, stock_id: int, start: date, end: date, variant: tuple
+) -> Tuple[str, Optional[datetime]]:
+    """
+    ETag and Last-Modified of a stored price range: its bar count, last bar
+    and last write to the stock's history, per response representation
+    """
+    bar_count, last_bar, last_written = price_history.get_range_version(stock_id, start, end)
+    etag = make_etag("prices", stock_id, start, end, *variant, bar_count, last_bar, last_written)
+    return etag, last_written
+
+def _resolve_stocks(
+    db: Session,
+    stock_ids: Optional[str],
+    symbols: Optional[str],
+    limit: int
+) -> List[Stock]:
+    """
+    Load the stocks named by comma-separated IDs and/or symbols, or raise a 404
+    """
+    stocks, missing = StockService.resolve_stocks(db, stock_ids, symbols, limit)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Stocks not found: {', '.join(missing)}"
+        )
+    return stocks
+
 @router.post("/", response_model=StockResponse, status_code=status.HTTP_201_CREATED)
 def create_stock(
     stock: StockCreate,
@@ -48,34 +125,75 @@ def create_stock(
             detail="Error creating stock. Please try again later."
         )
 
+STOCK_SORT_COLUMNS = {
+    "id": Stock.id,
+    "symbol": Stock.symbol,
+    "company_name": Stock.company_name,
+    "market_cap": Stock.market_cap,
+    "pe_ratio": Stock.pe_ratio,
+    "price": Stock.price,
+    "dividend_yield": Stock.dividend_yield,
+    "last_updated": Stock.last_updated
+}
+
+# Columns selected by the fast path, in StockResponse field order
+STOCK_RESPONSE_FIELDS = list(StockResponse.model_fields)
+
 @router.get("/", response_model=StockList)
 def get_stocks(
     skip: int = 0,
     limit: int = 100,
     symbol: Optional[str] = None,
     sector: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fast: bool = False,
     db: Session = Depends(get_db)
 ):
     """
-    Get list of stocks with optional filtering
+    Get list of stocks with optional filtering.
+    Pass `next_cursor` from the previous page as `cursor` to page with a
+    keyset on (sort, id) instead of an offset. With `fast=true` rows are
+    selected as tuples and encoded directly, skipping model validation.
     """
     try:
-        query = db.query(Stock)
+        if fast:
+            query = db.query(*[getattr(Stock, f) for f in STOCK_RESPONSE_FIELDS])
+        else:
+            query = db.query(Stock)
         
-        # Apply filters if provided
+        # Apply filters if provided; symbol fragments resolve through the search index
         if symbol:
-            query = query.filter(Stock.symbol.ilike(f"%{symbol}%"))
+            search_index.ensure_loaded(db)
+            query = query.filter(Stock.id.in_(search_index.find_symbol_ids(symbol)))
         
         if sector:
             query = query.filter(Stock.sector == sector)
         
-        # Get total count
-        total = query.count()
+        # Total is cached until the next write to stocks
+        total = None
+        if include_total:
+            total = count_cache.get_or_count(Stock, (symbol, sector), query)
         
-        # Apply pagination
-        stocks = query.offset(skip).limit(limit).all()
+        stocks, next_cursor = paginate(
+            query, STOCK_SORT_COLUMNS, Stock.id,
+            sort=sort, order=order, cursor=cursor, skip=skip, limit=limit
+        )
         
-        return {"stocks": stocks, "total": total}
+        if fast:
+            return FastJSONResponse({
+                "stocks": [row._asdict() for row in stocks],
+                "total": total,
+                "next_cursor": next_cursor
+            })
+        return {"stocks": stocks, "total": total, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error getting stocks: {str(e)}")
         raise HTTPException(
@@ -83,35 +201,304 @@ def get_stocks(
             detail="Error retrieving stocks. Please try again later."
         )
 
-@router.get("/{stock_id}", response_model=StockResponse)
-def get_stock(
-    stock_id: int,
+@router.get("/search", response_model=List[StockSearchResult])
+def search_stocks(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
     """
-    Get stock by ID and update data from Yahoo Finance
+    Typeahead search over symbols and company names, best match first
     """
     try:
-        stock = db.query(Stock).filter(Stock.id == stock_id).first()
-        if not stock:
+        search_index.ensure_loaded(db)
+        return search_index.search(q, limit=limit)
+    except Exception as e:
+        logger.error(f"Error searching stocks: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error searching stocks. Please try again later."
+        )
+
+@router.get("/sectors", response_model=List[str])
+def get_sectors(db: Session = Depends(get_db)):
+    """
+    Get list of all sectors
+    """
+    try:
+        facet_service.ensure_loaded(db)
+        return facet_service.sectors()
+    except Exception as e:
+        logger.error(f"Error getting sectors: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving sectors. Please try again later."
+        )
+
+@router.get("/industries", response_model=List[str])
+def get_industries(
+    sector: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get list of all industries, optionally filtered by sector
+    """
+    try:
+        facet_service.ensure_loaded(db)
+        return facet_service.industries(sector)
+    except Exception as e:
+        logger.error(f"Error getting industries: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving industries. Please try again later."
+        )
+
+@router.get("/facets", response_model=List[SectorFacet])
+def get_facets(
+    sector: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get sector and industry facets with stock counts and total market cap
+    """
+    try:
+        facet_service.ensure_loaded(db)
+        return facet_service.facets(sector)
+    except Exception as e:
+        logger.error(f"Error getting facets: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving facets. Please try again later."
+        )
+
+@router.get("/aggregates", response_model=List[GroupAggregate])
+def get_aggregates(
+    level: str = Query("sector", description="sector or industry"),
+    sector: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get median P/E, total market cap, average dividend yield and average
+    1-day / 1-month return per sector or per industry, served from memory
+    """
+    try:
+        sector_aggregates.ensure_current(db)
+        return FastJSONResponse(sector_aggregates.aggregates(level, sector))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error getting aggregates: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving aggregates. Please try again later."
+        )
+
+@router.post("/batch", response_model=BatchQuoteResponse)
+def get_stock_batch(
+    request: BatchQuoteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Get many stocks by ID and/or symbol in one round trip.
+    Stale entries are returned as stored and refreshed together in the background.
+    """
+    ids = list(dict.fromkeys(request.ids))
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+    
+    if not ids and not symbols:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide at least one stock ID or symbol"
+        )
+    if len(ids) + len(symbols) > settings.BATCH_QUOTE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_QUOTE_MAX_ITEMS} stocks can be requested at once"
+        )
+    
+    fields = request.fields or list(StockResponse.model_fields)
+    invalid = [f for f in fields if f not in StockResponse.model_fields]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {', '.join(invalid)}"
+        )
+    
+    try:
+        # Select only the requested columns with one IN query
+        columns = list(dict.fromkeys(["id", "symbol", *fields, "last_updated"]))
+        rows = db.query(*[getattr(Stock, c) for c in columns]).filter(
+            or_(Stock.id.in_(ids), Stock.symbol.in_(symbols))
+        ).all()
+        
+        by_id = {row.id: row for row in rows}
+        by_symbol = {row.symbol.upper(): row for row in rows}
+        ordered = list(dict.fromkeys(
+            [by_id[i] for i in ids if i in by_id] +
+            [by_symbol[s] for s in symbols if s in by_symbol]
+        ))
+        
+        output_fields = list(dict.fromkeys(["id", "symbol", *fields]))
+        quotes = [{f: getattr(row, f) for f in output_fields} for row in ordered]
+        
+        # Apply the freshness policy to the whole batch with one provider refresh
+        stale = [row.symbol for row in ordered if not stock_refresh_service.is_fresh(row.last_updated)]
+        if stale and request.refresh:
+            stock_refresh_service.schedule_batch_refresh(stale)
+        
+        return {
+            "quotes": quotes,
+            "missing_ids": [i for i in ids if i not in by_id],
+            "missing_symbols": [s for s in symbols if s not in by_symbol],
+            "stale": stale
+        }
+    except Exception as e:
+        logger.error(f"Error getting stock batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving stocks. Please try again later."
+        )
+
+@router.get("/prices")
+def download_stock_prices(
+    stock_ids: Optional[str] = Query(None, description="Comma-separated stock IDs"),
+    symbols: Optional[str] = Query(None, description="Comma-separated stock symbols"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    format: Optional[str] = Query(None, description="columnar or arrow"),
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Download price history for several stocks in one columnar response
+    """
+    try:
+        fmt = negotiate_format(format, accept, default="columnar")
+        if fmt == "json":
+            fmt = "columnar"
+        if fmt == "arrow" and not arrow_available():
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Stock with ID {stock_id} not found"
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail="Arrow output is not available on this server"
             )
         
-        # Update stock data from Yahoo Finance
-        yf_service = YFinanceService(db)
-        updated_stock = yf_service.update_stock_data(stock.symbol)
+        stocks = _resolve_stocks(db, stock_ids, symbols, settings.PRICE_DOWNLOAD_MAX_STOCKS)
         
-        return updated_stock
+        start, end = PriceHistoryService.resolve_range(start_date, end_date)
+        price_history = PriceHistoryService(db, YFinanceService(db))
+        for stock in stocks:
+            price_history.fill_gaps(stock, start, end)
+        
+        stock_symbols = {stock.id: stock.symbol for stock in stocks}
+        columns = price_history.get_price_columns(list(stock_symbols), start, end)
+        
+        if fmt == "arrow":
+            return arrow_response(columns, stock_symbols)
+        return columnar_json_response({"series": split_series(columns, stock_symbols)})
     except ValueError as e:
-        logger.error(f"Validation error getting stock: {str(e)}")
+        logger.error(f"Validation error downloading stock prices: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except HTTPException:
         raise
+    except Exception as e:
+        logger.error(f"Error downloading stock prices: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving stock prices. Please try again later."
+        )
+
+@router.get("/performance", response_model=PerformanceList)
+def get_performance_for_stocks(
+    stock_ids: Optional[str] = Query(None, description="Comma-separated stock IDs"),
+    symbols: Optional[str] = Query(None, description="Comma-separated stock symbols"),
+    periods: str = Query(",".join(PERFORMANCE_PERIODS), description="Comma-separated periods"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get performance metrics for several stocks and periods at once. The
+    longest period is loaded once and shorter periods are slices of it.
+    """
+    try:
+        requested = list(dict.fromkeys(p.strip() for p in periods.split(",") if p.strip()))
+        invalid = [p for p in requested if p not in PERFORMANCE_PERIODS]
+        if not requested or invalid:
+            raise ValueError(f"Invalid period. Must be one of: {', '.join(PERFORMANCE_PERIODS)}")
+        
+        stocks = _resolve_stocks(db, stock_ids, symbols, settings.ANALYTICS_MAX_STOCKS)
+        ids = [stock.id for stock in stocks]
+        
+        last_bars = analytics_cache.latest_bar_dates(db, ids)
+        results = analytics_cache.get_or_compute(
+            ("performance", tuple(ids), tuple(requested)),
+            analytics_cache.version(last_bars),
+            lambda: PerformanceService(db).compute(ids, requested)
+        )
+        
+        return {
+            "periods": requested,
+            "results": [
+                {
+                    "stock_id": stock.id,
+                    "symbol": stock.symbol,
+                    "company_name": stock.company_name,
+                    "periods": results[stock.id]
+                }
+                for stock in stocks
+            ]
+        }
+    except ValueError as e:
+        logger.error(f"Validation error getting stock performance: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting stock performance: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error calculating stock performance. Please try again later."
+        )
+
+@router.get("/{stock_id}", response_model=StockResponse)
+def get_stock(
+    stock_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Get stock by ID, refreshing stale data from Yahoo Finance in the background.
+    Supports If-None-Match / If-Modified-Since.
+    """
+    try:
+        version = db.query(Stock.id, Stock.symbol, Stock.last_updated).filter(Stock.id == stock_id).first()
+        if not version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Stock with ID {stock_id} not found"
+            )
+        
+        # Serve the stored row; stale rows are refreshed asynchronously
+        stock_refresh_service.ensure_fresh(version)
+        
+        # Answer from the version columns alone when the client copy is current
+        etag = make_etag("stock", stock_id, version.last_updated)
+        if is_not_modified(request, etag, version.last_updated):
+            return not_modified(etag, version.last_updated)
+        
+        stock = db.query(Stock).filter(Stock.id == stock_id).first()
+        set_validators(response, etag, stock.last_updated)
+        return stock
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting stock: {str(e)}")
         raise HTTPException(
@@ -159,14 +546,37 @@ def create_stock_price(
 @router.get("/prices/{stock_id}", response_model=List[StockPriceResponse])
 def get_stock_prices(
     stock_id: int,
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    interval: str = Query("1d", description="1d, 1w or 1mo"),
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample to at most this many bars"),
+    format: Optional[str] = Query(None, description="json, columnar or arrow"),
+    include_derived: bool = Query(False, description="Add daily/log returns, 52-week range and 50-day average volume"),
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
-    Get historical price data for a stock
+    Get historical price data for a stock, fetching only missing ranges.
+    Bars can be aggregated to weekly/monthly OHLCV (`interval`) and reduced
+    with shape-preserving LTTB downsampling (`max_points`). Daily bars can
+    carry their stored derived series (`include_derived`).
+    Also available as column arrays (`columnar`) or an Arrow IPC stream (`arrow`).
+    Supports If-None-Match / If-Modified-Since.
     """
     try:
+        fmt = negotiate_format(format, accept)
+        if interval not in INTERVALS:
+            raise ValueError(f"Invalid interval. Must be one of: {', '.join(INTERVALS)}")
+        if include_derived and interval != "1d":
+            raise ValueError("Derived series are only available for daily bars")
+        if fmt == "arrow" and not arrow_available():
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail="Arrow output is not available on this server"
+            )
+        
         # Check if stock exists
         stock = db.query(Stock).filter(Stock.id == stock_id).first()
         if not stock:
@@ -175,37 +585,51 @@ def get_stock_prices(
                 detail=f"Stock with ID {stock_id} not found"
             )
         
-        # Initialize YFinance service
-        yf_service = YFinanceService(db)
+        start, end = PriceHistoryService.resolve_range(start_date, end_date)
+        price_history = PriceHistoryService(db, YFinanceService(db))
         
-        # Fetch historical data
-        historical_data = yf_service.fetch_historical_data(
-            stock.symbol,
-            start_date=start_date,
-            end_date=end_date
-        )
+        # A client already holding the stored range never triggers an upstream fetch
+        variant = (fmt, interval, max_points, include_derived)
+        etag, last_written = _price_range_validators(price_history, stock_id, start, end, variant)
+        if is_not_modified(request, etag, last_written):
+            return not_modified(etag, last_written)
         
-        # Update database with new data
-        for data in historical_data:
-            price = StockPrice(
-                stock_id=stock_id,
-                **data
-            )
-            db.add(price)
-        
-        db.commit()
-        
-        # Query updated price data
-        query = db.query(StockPrice).filter(StockPrice.stock_id == stock_id)
-        
-        if start_date:
-            query = query.filter(StockPrice.date >= start_date)
+        # Fetch only the sub-ranges that are not stored yet
+        if price_history.get_missing_ranges(stock_id, start, end):
+            price_history.fill_gaps(stock, start, end)
+            etag, last_written = _price_range_validators(price_history, stock_id, start, end, variant)
         
-        if end_date:
-            query = query.filter(StockPrice.date <= end_date)
+        reshaped = interval != "1d" or max_points is not None
+        if fmt != "json" or reshaped or include_derived:
+            # Build the response straight from a column query
+            columns = price_history.get_price_columns([stock_id], start, end)
+            if include_derived:
+                columns = DerivedSeriesService(db).add_columns(columns, stock_id)
+            columns = resample_ohlcv(columns, interval)
+            if max_points is not None:
+                columns = downsample(columns, max_points)
+            
+            if fmt == "json":
+                # Aggregated bars have no row id or creation time
+                if include_derived:
+                    # Derived fields are not part of the bar schema
+                    output = FastJSONResponse(to_rows(columns))
+                    output.headers["Vary"] = "Accept"
+                    return set_validators(output, etag, last_written)
+                response.headers["Vary"] = "Accept"
+                set_validators(response, etag, last_written)
+                return to_rows(columns)
+            if fmt == "arrow":
+                output = arrow_response(columns, {stock.id: stock.symbol})
+            else:
+                output = columnar_json_response(split_series(columns, {stock.id: stock.symbol})[0])
+            output.headers["Vary"] = "Accept"
+            return set_validators(output, etag, last_written)
         
-        prices = query.order_by(StockPrice.date).all()
+        prices = price_history.get_prices(stock_id, start, end)
         
+        response.headers["Vary"] = "Accept"
+        set_validators(response, etag, last_written)
         return prices
     except ValueError as e:
         logger.error(f"Validation error getting stock prices: {str(e)}")
@@ -222,42 +646,110 @@ def get_stock_prices(
             detail="Error retrieving stock prices. Please try again later."
         )
 
-@router.get("/sectors", response_model=List[str])
-def get_sectors(db: Session = Depends(get_db)):
+@router.get("/indicators/{stock_id}", response_model=TechnicalIndicators)
+def get_stock_indicators(
+    stock_id: int,
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Calendar days of history to use"),
+    db: Session = Depends(get_db)
+):
     """
-    Get list of all sectors
+    Get SMA, RSI, MACD and Bollinger values for a stock. Without `days` the
+    indicators kept up to date in stock_indicators are served; a custom
+    window is computed from stored history and cached until the stock's
+    next bar is written.
     """
     try:
-        sectors = db.query(Stock.sector).distinct().filter(Stock.sector != None).all()
-        return [sector[0] for sector in sectors if sector[0]]
+        stock = db.query(Stock.id, Stock.symbol, Stock.company_name, Stock.price).filter(
+            Stock.id == stock_id
+        ).first()
+        if not stock:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Stock with ID {stock_id} not found"
+            )
+        
+        last_bar = analytics_cache.latest_bar_date(db, stock_id)
+        if last_bar is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No price data found for stock ID {stock_id}"
+            )
+        
+        if days is None:
+            indicators = _stored_indicators(db, stock_id, last_bar)
+        else:
+            result = analytics_cache.get_or_compute(
+                ("indicators", stock_id, days),
+                analytics_cache.version({stock_id: last_bar}),
+                lambda: StockService.calculate_technical_indicators(stock_id, db, days)
+            )
+            if "error" in result:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result["error"])
+            indicators = result["indicators"]
+        
+        return {
+            "stock_id": stock.id,
+            "symbol": stock.symbol,
+            "company_name": stock.company_name,
+            # The quote moves independently of the bars the result is keyed on
+            "current_price": stock.price,
+            "as_of": last_bar,
+            "indicators": {name: _finite(value) for name, value in indicators.items()}
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting sectors: {str(e)}")
+        logger.error(f"Error getting stock indicators: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error retrieving sectors. Please try again later."
+            detail="Error calculating stock indicators. Please try again later."
         )
 
-@router.get("/industries", response_model=List[str])
-def get_industries(
-    sector: Optional[str] = None,
+@router.get("/performance/{stock_id}", response_model=StockPerformance)
+def get_stock_performance(
+    stock_id: int,
+    period: str = Query("1y", description="1m, 3m, 6m, 1y, 3y or 5y"),
     db: Session = Depends(get_db)
 ):
     """
-    Get list of all industries, optionally filtered by sector
+    Get total and annualized return, volatility and maximum drawdown for a
+    stock over a period. Results are cached until the stock's next bar is written.
     """
+    if period not in PERFORMANCE_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid period. Must be one of: {', '.join(PERFORMANCE_PERIODS)}"
+        )
     try:
-        query = db.query(Stock.industry).distinct().filter(Stock.industry != None)
+        if not db.query(Stock.id).filter(Stock.id == stock_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Stock with ID {stock_id} not found"
+            )
         
-        if sector:
-            query = query.filter(Stock.sector == sector)
+        last_bar = analytics_cache.latest_bar_date(db, stock_id)
+        if last_bar is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No price data found for stock ID {stock_id}"
+            )
+        
+        result = analytics_cache.get_or_compute(
+            ("performance", stock_id, period),
+            analytics_cache.version({stock_id: last_bar}),
+            lambda: StockService.get_stock_performance(stock_id, db, period)
+        )
+        if "error" in result:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result["error"])
         
-        industries = query.all()
-        return [industry[0] for industry in industries if industry[0]]
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting industries: {str(e)}")
+        logger.error(f"Error getting stock performance: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error retrieving industries. Please try again later."
+            detail="Error calculating stock performance. Please try again later."
         )
 
 @router.post("/update/{symbol}", response_model=StockResponse)
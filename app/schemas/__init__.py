@@ -2,10 +2,17 @@ from app.schemas.user import UserBase, UserCreate, UserResponse, UserLogin, Toke
 from app.schemas.stock import (
     StockBase, StockCreate, StockResponse, 
     StockPriceBase, StockPriceCreate, StockPriceResponse,
-    StockList
+    StockList, StockSearchResult, IndustryFacet, SectorFacet, GroupAggregate,
+    BatchQuoteRequest, BatchQuoteResponse, TechnicalIndicators,
+    PeriodPerformance, StockPerformance, MultiPeriodPerformance, PerformanceList
 )
 from app.schemas.screen import (
     ScreenBase, ScreenCreate, ScreenUpdate, ScreenResponse, 
     ScreenCriteriaBase, ScreenCriteriaCreate, ScreenCriteriaResponse,
     ScreenList, ScreenResult
 )
+from app.schemas.analytics import CorrelationMatrix, RollingSeries, RollingSeriesList
+from app.schemas.portfolio import (
+    HoldingBase, HoldingResponse, PortfolioBase, PortfolioCreate, PortfolioResponse,
+    PortfolioAnalyticsRequest, HoldingContribution, PortfolioSeries, PortfolioAnalytics
+)
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date
+
+class CorrelationMatrix(BaseModel):
+    stock_ids: List[int]
+    symbols: List[str]
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    observations: int
+    min_periods: int
+    # Rows and columns follow `stock_ids`; null where a pair has too few common returns
+    correlation: List[List[Optional[float]]]
+    covariance: Optional[List[List[Optional[float]]]] = None
+
+class RollingSeries(BaseModel):
+    stock_id: int
+    symbol: str
+    # One value per date; null for windows with missing returns
+    volatility: Optional[List[Optional[float]]] = None
+    sharpe: Optional[List[Optional[float]]] = None
+    beta: Optional[List[Optional[float]]] = None
+    correlation: Optional[List[Optional[float]]] = None
+
+class RollingSeriesList(BaseModel):
+    window: int
+    benchmark: Optional[str] = None
+    dates: List[date]
+    series: List[RollingSeries]
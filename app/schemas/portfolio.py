@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, datetime
+
+class HoldingBase(BaseModel):
+    symbol: str
+    # Relative weight; weights are normalized to sum to 1
+    weight: float
+
+class HoldingResponse(HoldingBase):
+    stock_id: int
+    
+    class Config:
+        from_attributes = True
+
+class PortfolioBase(BaseModel):
+    name: str = Field(..., min_length=3, max_length=100)
+    description: Optional[str] = None
+
+class PortfolioCreate(PortfolioBase):
+    holdings: List[HoldingBase] = Field(..., min_length=1)
+
+class PortfolioResponse(PortfolioBase):
+    id: int
+    user_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    holdings: List[HoldingResponse]
+    
+    class Config:
+        from_attributes = True
+
+class PortfolioAnalyticsRequest(BaseModel):
+    holdings: List[HoldingBase] = Field(..., min_length=1)
+    days: int = Field(365, ge=30, le=3650)
+    risk_free_rate: float = 0.0
+    confidence: float = Field(0.95, gt=0.5, lt=1)
+
+class HoldingContribution(BaseModel):
+    stock_id: int
+    symbol: str
+    weight: float
+    return_contribution: Optional[float] = None
+    risk_contribution: Optional[float] = None
+
+class PortfolioSeries(BaseModel):
+    dates: List[date]
+    returns: List[float]
+    value: List[float]
+
+class PortfolioAnalytics(BaseModel):
+    start_date: date
+    end_date: date
+    observations: int
+    total_return: Optional[float] = None
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    confidence: float
+    value_at_risk: Optional[float] = None
+    conditional_value_at_risk: Optional[float] = None
+    holdings: List[HoldingContribution]
+    series: PortfolioSeries
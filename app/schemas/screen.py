@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Union, Any
 from datetime import datetime
 
+from app.schemas.stock import SectorFacet
+
 class ScreenCriteriaBase(BaseModel):
     field: str
     operator: str
@@ -45,7 +47,8 @@ class ScreenResponse(ScreenBase):
 
 class ScreenList(BaseModel):
     screens: List[ScreenResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class ScreenResult(BaseModel):
     screen_id: int
@@ -53,3 +56,4 @@ class ScreenResult(BaseModel):
     results: List[Any]
     count: int
     execution_time: float
+    facets: Optional[List[SectorFacet]] = None
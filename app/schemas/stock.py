@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import date, datetime
 
 class StockBase(BaseModel):
@@ -41,12 +41,88 @@ class StockPriceCreate(StockPriceBase):
     pass
 
 class StockPriceResponse(StockPriceBase):
-    id: int
-    created_at: datetime
+    # Unset for aggregated or downsampled bars
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
 class StockList(BaseModel):
     stocks: List[StockResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class StockSearchResult(BaseModel):
+    id: int
+    symbol: str
+    company_name: str
+    sector: Optional[str] = None
+    score: int
+
+class IndustryFacet(BaseModel):
+    name: str
+    count: int
+    market_cap: float
+
+class SectorFacet(IndustryFacet):
+    industries: List[IndustryFacet]
+
+class GroupAggregate(BaseModel):
+    name: str
+    sector: str
+    count: int
+    median_pe_ratio: Optional[float] = None
+    total_market_cap: float
+    avg_dividend_yield: Optional[float] = None
+    avg_return_1d: Optional[float] = None
+    avg_return_1m: Optional[float] = None
+
+class BatchQuoteRequest(BaseModel):
+    ids: List[int] = []
+    symbols: List[str] = []
+    fields: Optional[List[str]] = None
+    refresh: bool = True
+
+class BatchQuoteResponse(BaseModel):
+    quotes: List[Dict[str, Any]]
+    missing_ids: List[int] = []
+    missing_symbols: List[str] = []
+    stale: List[str] = []
+
+class TechnicalIndicators(BaseModel):
+    stock_id: int
+    symbol: str
+    company_name: str
+    current_price: Optional[float] = None
+    as_of: date
+    indicators: Dict[str, Optional[float]]
+
+class PeriodPerformance(BaseModel):
+    start_date: date
+    end_date: date
+    start_price: Optional[float] = None
+    end_price: Optional[float] = None
+    total_return: Optional[float] = None
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    max_drawdown: Optional[float] = None
+
+class StockPerformance(PeriodPerformance):
+    stock_id: int
+    symbol: str
+    company_name: str
+    period: str
+    high_52w: Optional[float] = None
+    low_52w: Optional[float] = None
+
+class MultiPeriodPerformance(BaseModel):
+    stock_id: int
+    symbol: str
+    company_name: str
+    # None for periods without bars
+    periods: Dict[str, Optional[PeriodPerformance]]
+
+class PerformanceList(BaseModel):
+    periods: List[str]
+    results: List[MultiPeriodPerformance]
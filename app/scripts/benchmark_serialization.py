@@ -0,0 +1,149 @@
+"""
+Compare the default (ORM + Pydantic) and fast (row tuples + orjson) response
+paths for stock listings, screen listings and screen runs.
+
+Runs against a throwaway SQLite database, so no server or network is needed:
+
+    python app/scripts/benchmark_serialization.py --rows 1000 --repeat 20
+
+Requires httpx for FastAPI's TestClient.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_db, get_async_db
+from app.models.screen import Screen, ScreenCriteria
+from app.models.stock import Stock
+from app.models.user import User
+from app.utils.security import get_current_user, get_current_user_async
+
+SECTORS = ["Technology", "Healthcare", "Financials", "Energy", "Utilities"]
+
+def seed(db, rows: int) -> User:
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    db.execute(insert(Stock), [
+        {
+            "symbol": f"S{i:05d}",
+            "company_name": f"Company {i}",
+            "sector": SECTORS[i % len(SECTORS)],
+            "industry": f"Industry {i % 17}",
+            "market_cap": 1e9 + i * 1e6,
+            "pe_ratio": 5 + i % 40,
+            "price": 10 + i % 300,
+            "price_to_book": 1.5,
+            "dividend_yield": 0.02,
+            "eps": 3.1,
+            "beta": 1.1,
+            "fifty_two_week_high": 400.0,
+            "fifty_two_week_low": 5.0,
+            "avg_volume": 1000000 + i
+        }
+        for i in range(rows)
+    ])
+    db.execute(insert(Screen), [
+        {"name": f"Screen {i}", "description": "benchmark", "user_id": user.id, "is_public": True}
+        for i in range(rows)
+    ])
+    db.execute(insert(ScreenCriteria), [
+        {"screen_id": i + 1, "field": "pe_ratio", "operator": ">", "value": 0}
+        for i in range(rows)
+    ] + [
+        {"screen_id": i + 1, "field": "market_cap", "operator": "between", "value": [0, 1e15]}
+        for i in range(rows)
+    ])
+    db.commit()
+    db.refresh(user)
+    return user
+
+def timed(client: TestClient, method: str, url: str, params: dict, repeat: int):
+    timings = []
+    body = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.request(method, url, params=params)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body = response.json()
+    return statistics.median(timings), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per page")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/benchmark.db", connect_args={"check_same_thread": False})
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+        db = Session()
+        user = seed(db, args.rows)
+        db.close()
+
+        def override_get_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        # Screens run on the async session; TestClient requests each get
+        # their own event loop, so connections are not pooled
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/benchmark.db", poolclass=NullPool)
+        AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with AsyncSession() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_user_async] = lambda: user
+        client = TestClient(app)
+
+        cases = [
+            ("GET /stocks", "GET", "/api/v1/stocks/", {"limit": args.rows, "include_total": False}),
+            ("GET /screens", "GET", "/api/v1/screens/", {"limit": args.rows, "include_total": False}),
+            ("POST /screens/1/run", "POST", "/api/v1/screens/1/run", {"include_facets": True})
+        ]
+
+        print(f"{'endpoint':<22}{'default ms':>12}{'fast ms':>12}{'speedup':>10}")
+        try:
+            for label, method, url, params in cases:
+                default_time, default_body = timed(client, method, url, params, args.repeat)
+                fast_time, fast_body = timed(client, method, url, {**params, "fast": True}, args.repeat)
+                default_body.pop("execution_time", None)
+                fast_body.pop("execution_time", None)
+                if default_body != fast_body:
+                    raise SystemExit(f"{label}: fast response differs from the default response")
+                print(
+                    f"{label:<22}{default_time * 1000:>12.1f}{fast_time * 1000:>12.1f}"
+                    f"{default_time / fast_time:>9.1f}x"
+                )
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+import logging
+from app.database import engine
+from app.db.partitioning import is_enabled, partition_existing_table
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def partition_stock_prices():
+    """
+    Convert an existing plain stock_prices table into the partitioned layout.
+    Writers should be stopped while it runs; the table is locked throughout.
+    """
+    if not is_enabled(engine):
+        logger.info("Partitioning needs PostgreSQL and PRICE_PARTITION_INTERVAL other than 'none'")
+        return
+    if partition_existing_table(engine):
+        logger.info("stock_prices is now partitioned")
+    else:
+        logger.info("stock_prices is already partitioned or does not exist yet")
+
+if __name__ == "__main__":
+    partition_stock_prices()
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock import StockPrice
+from app.services.change_events import register_listener
+
+def _result_bytes(result: Any) -> int:
+    """Memory held by the NumPy arrays of a result; other values count as 0"""
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, dict):
+        return sum(_result_bytes(value) for value in result.values())
+    return 0
+
+class AnalyticsCache:
+    """
+    Per-process LRU cache of analytics results computed from price history.
+    Entries are keyed on the request (kind, stock, parameters), the version
+    of the stocks' bars and the current day, so a new or rewritten bar or a
+    new day is a new key and old entries simply age out. Entries are bounded
+    by count and by the size of the arrays they hold.
+
+    Latest bar dates are kept in memory as well, dropped after any committed
+    write to stock_prices and refreshed after a TTL to pick up writes made by
+    other processes, so cache hits do not query stock_prices at all. A
+    version pairs each stock's latest bar date with a count of committed
+    writes to its bars, as rewriting the latest bar leaves its date unchanged.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._results: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._latest_bars: Dict[int, Tuple[Optional[date], float]] = {}
+        self._generation = 0
+        self._bar_writes: Dict[int, int] = {}
+        self._bulk_writes = 0
+        self._lock = threading.Lock()
+
+    def latest_bar_date(self, db: Session, stock_id: int) -> Optional[date]:
+        """
+        Date of the stock's latest stored bar, or None if it has no bars
+        """
+        return self.latest_bar_dates(db, [stock_id]).get(stock_id)
+
+    def latest_bar_dates(self, db: Session, stock_ids: Iterable[int]) -> Dict[int, Optional[date]]:
+        """
+        Latest stored bar date per stock, querying only the stocks not cached
+        """
+        now = time.monotonic()
+        dates: Dict[int, Optional[date]] = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for stock_id in stock_ids:
+                cached = self._latest_bars.get(stock_id)
+                if cached is not None and now - cached[1] < self.ttl_seconds:
+                    dates[stock_id] = cached[0]
+                else:
+                    missing.append(stock_id)
+        if not missing:
+            return dates
+
+        found = dict(db.query(StockPrice.stock_id, func.max(StockPrice.date)).filter(
+            StockPrice.stock_id.in_(missing)
+        ).group_by(StockPrice.stock_id).all())
+        with self._lock:
+            # Skip storing dates that raced with a price write
+            store = self._generation == generation
+            for stock_id in missing:
+                dates[stock_id] = found.get(stock_id)
+                if store:
+                    self._latest_bars[stock_id] = (dates[stock_id], now)
+        return dates
+
+    def version(self, last_bars: Dict[int, Optional[date]]) -> Hashable:
+        """
+        Version of the bars of the stocks in `last_bars`, as returned by
+        latest_bar_dates(), for use with get_or_compute()
+        """
+        with self._lock:
+            return self._bulk_writes, tuple(
+                (stock_id, last_bar, self._bar_writes.get(stock_id, 0))
+                for stock_id, last_bar in sorted(last_bars.items())
+            )
+
+    def get_or_compute(self, key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for (key, version, today), calling `compute` on a miss
+        """
+        cache_key = (key, version, datetime.now().date())
+        with self._lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                return self._results[cache_key][0]
+
+        result = compute()
+        size = _result_bytes(result)
+        if size > self.max_bytes:
+            return result
+        with self._lock:
+            if cache_key in self._results:
+                self._bytes -= self._results.pop(cache_key)[1]
+            self._results[cache_key] = (result, size)
+            self._bytes += size
+            while len(self._results) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._results.popitem(last=False)[1][1]
+        return result
+
+    def invalidate_bars(self, stock_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Forget latest bar dates for some stocks, or for all stocks
+        """
+        with self._lock:
+            self._generation += 1
+            if stock_ids is None:
+                self._latest_bars.clear()
+            else:
+                for stock_id in stock_ids:
+                    self._latest_bars.pop(stock_id, None)
+
+    def apply_price_changes(self, changes) -> None:
+        stock_ids = set()
+        for operation, snapshot in changes:
+            if "stock_id" not in snapshot:
+                # Bulk writes do not say which stocks they touched
+                with self._lock:
+                    self._bulk_writes += 1
+                self.invalidate_bars()
+                return
+            stock_ids.add(snapshot["stock_id"])
+        with self._lock:
+            for stock_id in stock_ids:
+                self._bar_writes[stock_id] = self._bar_writes.get(stock_id, 0) + 1
+        self.invalidate_bars(stock_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+            self._latest_bars.clear()
+
+# Create a singleton instance
+analytics_cache = AnalyticsCache(
+    settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    settings.ANALYTICS_CACHE_TTL_SECONDS,
+    settings.ANALYTICS_CACHE_MAX_MB * 1024 * 1024
+)
+
+register_listener(StockPrice, analytics_cache.apply_price_changes)
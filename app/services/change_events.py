@@ -0,0 +1,96 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# A change is (operation, snapshot): operation is "insert", "update", "delete"
+# or "bulk" for statement-level writes. Bulk inserts and bulk updates by
+# primary key give one change per parameter set, with the values written as
+# the snapshot; other statements' rows are unknown and give one empty snapshot.
+Change = Tuple[str, Dict[str, Any]]
+ChangeListener = Callable[[List[Change]], None]
+
+_PENDING_KEY = "_pending_change_events"
+_listeners: Dict[type, List[ChangeListener]] = defaultdict(list)
+
+def register_listener(model: type, callback: ChangeListener) -> None:
+    """
+    Call `callback` with the committed changes to `model` after every commit
+    that wrote to it. Rolled back changes are discarded.
+    """
+    _listeners[model].append(callback)
+
+def has_pending_changes(session: Session, model: type) -> bool:
+    """
+    Whether the session has written rows of `model` that are not committed yet
+    """
+    return any(pending[0] is model for pending in session.info.get(_PENDING_KEY, ()))
+
+def _snapshot(obj: Any) -> Dict[str, Any]:
+    """Loaded column values of an instance, without triggering lazy loads"""
+    state = inspect(obj)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(session, flush_context):
+    if not _listeners:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for operation, objects in (
+        ("insert", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted)
+    ):
+        for obj in objects:
+            model = type(obj)
+            if model not in _listeners:
+                continue
+            if operation == "update" and not session.is_modified(obj):
+                continue
+            pending.append((model, operation, _snapshot(obj)))
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in _listeners:
+        return
+    pending = orm_execute_state.session.info.setdefault(_PENDING_KEY, [])
+    parameters = orm_execute_state.parameters
+    by_rows = orm_execute_state.is_insert or (
+        orm_execute_state.is_update and orm_execute_state.statement.whereclause is None
+    )
+    if by_rows and isinstance(parameters, list) and parameters:
+        pending.extend((mapper.class_, "bulk", row) for row in parameters)
+    else:
+        pending.append((mapper.class_, "bulk", {}))
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    changes_by_model: Dict[type, List[Change]] = defaultdict(list)
+    for model, operation, snapshot in pending:
+        changes_by_model[model].append((operation, snapshot))
+
+    for model, changes in changes_by_model.items():
+        for callback in _listeners.get(model, []):
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"Change listener for {model.__name__} failed: {str(e)}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.price_history_service import PriceHistoryService
+
+logger = logging.getLogger(__name__)
+
+def pairwise_correlation(
+    returns: np.ndarray,
+    min_periods: int = 2,
+    block_size: int = 512,
+    covariance: bool = False
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Pairwise-complete correlation (and optionally sample covariance) of the
+    columns of a dates x stocks matrix with NaN for missing returns, as
+    DataFrame.corr/cov compute it, but one block of columns at a time.
+
+    Each block pair needs six block x block products of the zero-filled
+    returns and their validity mask, so working memory is bounded by the
+    block size; only the float32 outputs grow with the number of stocks.
+    Pairs with fewer than `min_periods` common returns are NaN.
+    """
+    n_stocks = returns.shape[1]
+    valid = ~np.isnan(returns)
+    # Pairwise moments are shift-invariant; centering each column keeps the
+    # one-pass sums below from cancelling
+    with np.errstate(invalid="ignore"):
+        centre = np.nan_to_num(np.nanmean(returns, axis=0)) if returns.size else 0.0
+    x = np.where(valid, returns - centre, 0.0)
+    mask = valid.astype(np.float64)
+    x2 = x * x
+
+    correlation = np.full((n_stocks, n_stocks), np.nan, dtype=np.float32)
+    cov = np.full((n_stocks, n_stocks), np.nan, dtype=np.float32) if covariance else None
+    min_periods = max(min_periods, 2)
+
+    for i in range(0, n_stocks, block_size):
+        bi = slice(i, i + block_size)
+        for j in range(i, n_stocks, block_size):
+            bj = slice(j, j + block_size)
+            # Sums over the dates where both stocks of a pair have a return
+            n = mask[:, bi].T @ mask[:, bj]
+            sum_x = x[:, bi].T @ mask[:, bj]
+            sum_y = mask[:, bi].T @ x[:, bj]
+            sum_xx = x2[:, bi].T @ mask[:, bj]
+            sum_yy = mask[:, bi].T @ x2[:, bj]
+            sum_xy = x[:, bi].T @ x[:, bj]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cross = n * sum_xy - sum_x * sum_y
+                spread = (n * sum_xx - sum_x ** 2) * (n * sum_yy - sum_y ** 2)
+                block = np.clip(cross / np.sqrt(spread), -1.0, 1.0)
+                # Too few common returns, or no variance over them
+                block[(n < min_periods) | (spread <= 0)] = np.nan
+                correlation[bi, bj] = block
+                correlation[bj, bi] = block.T
+                if cov is not None:
+                    block = cross / (n * (n - 1))
+                    block[n < min_periods] = np.nan
+                    cov[bi, bj] = block
+                    cov[bj, bi] = block.T
+
+    # A series with enough returns and non-zero variance correlates perfectly with itself
+    diagonal = np.diagonal(correlation).copy()
+    diagonal[~np.isnan(diagonal)] = 1.0
+    np.fill_diagonal(correlation, diagonal)
+    return correlation, cov
+
+class CorrelationService:
+    """
+    Return correlations and covariances across many stocks. Closes are read
+    with one query into a dates x stocks matrix aligned on the union of
+    trading dates, so a missing bar leaves gaps instead of shifting a
+    stock's returns against the others.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def compute(
+        self,
+        stock_ids: List[int],
+        days: int = 365,
+        min_periods: int = 20,
+        covariance: bool = False,
+        end: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Correlation (and covariance) matrices for the stocks' daily returns
+        over the last `days` calendar days, rows and columns in `stock_ids` order
+        """
+        started = time.perf_counter()
+        end = end or datetime.now().date()
+        start = end - timedelta(days=days)
+        dates, returns = PriceHistoryService(self.db).get_return_matrix(stock_ids, start, end)
+        correlation, cov = pairwise_correlation(
+            returns,
+            min_periods=min_periods,
+            block_size=settings.CORRELATION_BLOCK_SIZE,
+            covariance=covariance
+        )
+        logger.info(
+            f"Correlation of {len(stock_ids)} stocks over {len(dates)} dates "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return {
+            "start_date": dates[0].item() if len(dates) else None,
+            "end_date": dates[-1].item() if len(dates) else None,
+            "observations": len(dates),
+            "correlation": correlation,
+            "covariance": cov
+        }
@@ -0,0 +1,81 @@
+from typing import Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+from app.config import settings
+from app.models.screen import Screen
+from app.models.stock import Stock
+from app.services.change_events import register_listener
+
+class CountCache:
+    """
+    Per-process cache of listing totals. Entries are keyed by model and filter
+    values and dropped after any committed write to that model, with a TTL as
+    a safety net for writes made by other processes.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._counts: Dict[Tuple[str, Hashable], Tuple[int, float]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, model: type, key: Hashable, query: Query) -> int:
+        """
+        Return the cached total for (model, key), running `query.count()` on a miss
+        """
+        cached, generation, now = self._lookup(model, key)
+        if cached is not None:
+            return cached
+        total = query.order_by(None).count()
+        self._store(model, key, total, generation, now)
+        return total
+
+    async def get_or_count_async(self, model: type, key: Hashable, db: AsyncSession, statement: Select) -> int:
+        """
+        As get_or_count(), counting the rows of a select() on an async session
+        """
+        cached, generation, now = self._lookup(model, key)
+        if cached is not None:
+            return cached
+        total = await db.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+        self._store(model, key, total, generation, now)
+        return total
+
+    def _lookup(self, model: type, key: Hashable) -> Tuple[Optional[int], int, float]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get((model.__name__, key))
+            generation = self._generations.get(model.__name__, 0)
+        if cached is not None and now - cached[1] < self.ttl_seconds:
+            return cached[0], generation, now
+        return None, generation, now
+
+    def _store(self, model: type, key: Hashable, total: int, generation: int, now: float) -> None:
+        with self._lock:
+            # Skip storing a total that raced with an invalidation
+            if self._generations.get(model.__name__, 0) == generation:
+                self._counts[(model.__name__, key)] = (total, now)
+
+    def invalidate(self, model: type) -> None:
+        """
+        Drop all cached totals for a model
+        """
+        with self._lock:
+            self._generations[model.__name__] = self._generations.get(model.__name__, 0) + 1
+            for cache_key in [k for k in self._counts if k[0] == model.__name__]:
+                del self._counts[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+# Create a singleton instance
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS)
+
+register_listener(Stock, lambda changes: count_cache.invalidate(Stock))
+register_listener(Screen, lambda changes: count_cache.invalidate(Screen))
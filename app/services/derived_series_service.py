@@ -0,0 +1,175 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockPrice, StockPriceDerived
+from app.services.price_history_service import register_bar_listener
+
+DERIVED_FIELDS = ("daily_return", "log_return", "high_52w", "low_52w", "avg_volume_50")
+
+# The 52-week range covers bars dated within 364 days of each bar, i.e. a
+# time-based window of 365 days ending at the bar
+RANGE_DAYS = 364
+RANGE_WINDOW = f"{RANGE_DAYS + 1}D"
+AVG_VOLUME_BARS = 50
+# Bars before the first changed one that its successors' windows can reach
+LOOKBACK_DAYS = RANGE_DAYS + 120
+
+def derive_series(
+    dates: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Derived values for every bar of one stock's date-ordered bars. Returns
+    are against the previous bar; the 52-week range and average volume use
+    the bars available when the history is shorter than the window.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_return = np.full(len(close), np.nan)
+        daily_return[1:] = close[1:] / close[:-1] - 1
+        daily_return[~np.isfinite(daily_return)] = np.nan
+        log_return = np.log1p(daily_return)
+
+    # Bars without a high/low still count with their close
+    high = np.where(np.isnan(high), close, high)
+    low = np.where(np.isnan(low), close, low)
+    # Time-based rolling windows run in O(n) with a monotonic deque; bars
+    # without any value in their window stay NaN
+    index = pd.DatetimeIndex(dates)
+    high_52w = pd.Series(high, index=index).rolling(RANGE_WINDOW).max().to_numpy()
+    low_52w = pd.Series(low, index=index).rolling(RANGE_WINDOW).min().to_numpy()
+
+    cumulative = np.concatenate(([0.0], np.cumsum(volume, dtype=np.float64)))
+    first = np.maximum(np.arange(len(volume)) - AVG_VOLUME_BARS + 1, 0)
+    ends = np.arange(1, len(volume) + 1)
+    avg_volume = (cumulative[ends] - cumulative[first]) / (ends - first)
+
+    return {
+        "daily_return": daily_return,
+        "log_return": log_return,
+        "high_52w": high_52w,
+        "low_52w": low_52w,
+        "avg_volume_50": avg_volume
+    }
+
+class DerivedSeriesService:
+    """
+    Maintains stock_price_derived. New or changed bars recompute only the
+    derived rows from the first changed date on, from a bounded window of
+    earlier bars.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def update_from(self, stock_id: int, first_date: date) -> int:
+        """
+        Recompute and upsert the stock's derived rows dated `first_date` or
+        later. Returns the number of rows written.
+        """
+        rows = self.db.connection().execute(
+            select(StockPrice.date, StockPrice.high, StockPrice.low, StockPrice.close, StockPrice.volume).where(
+                StockPrice.stock_id == stock_id,
+                StockPrice.date >= first_date - timedelta(days=LOOKBACK_DAYS)
+            ).order_by(StockPrice.date)
+        ).all()
+        if not rows:
+            return 0
+
+        dates, high, low, close, volume = zip(*rows)
+        dates = np.array(dates, dtype="datetime64[D]")
+        derived = derive_series(
+            dates,
+            np.array(high, dtype=np.float64),
+            np.array(low, dtype=np.float64),
+            np.array(close, dtype=np.float64),
+            np.array([v or 0 for v in volume], dtype=np.float64)
+        )
+
+        offset = int(np.searchsorted(dates, np.datetime64(first_date, "D")))
+        values = {
+            name: [None if v != v else v for v in derived[name][offset:].tolist()]
+            for name in DERIVED_FIELDS
+        }
+        existing = dict(self.db.query(StockPriceDerived.date, StockPriceDerived.id).filter(
+            StockPriceDerived.stock_id == stock_id,
+            StockPriceDerived.date >= first_date
+        ).all())
+
+        now = datetime.utcnow()
+        new_rows = []
+        changed_rows = []
+        for i, bar_date in enumerate(dates[offset:].tolist()):
+            row = {name: values[name][i] for name in DERIVED_FIELDS}
+            row["updated_at"] = now
+            if bar_date in existing:
+                changed_rows.append({"id": existing[bar_date], **row})
+            else:
+                new_rows.append({"stock_id": stock_id, "date": bar_date, **row})
+
+        if new_rows:
+            self.db.execute(insert(StockPriceDerived), new_rows)
+        if changed_rows:
+            self.db.execute(update(StockPriceDerived), changed_rows)
+        return len(new_rows) + len(changed_rows)
+
+    def rebuild(self, stock_id: int, commit: bool = True) -> int:
+        """
+        Recompute all derived rows of a stock
+        """
+        first = self.db.query(func.min(StockPrice.date)).filter(StockPrice.stock_id == stock_id).scalar()
+        written = self.update_from(stock_id, first) if first else 0
+        if commit:
+            self.db.commit()
+        return written
+
+    def backfill(self) -> int:
+        """
+        Rebuild stocks whose derived rows do not match their bars, e.g. bars
+        stored before this table existed. Returns the number of stocks rebuilt.
+        """
+        bars = dict(self.db.query(StockPrice.stock_id, func.count(StockPrice.id)).group_by(
+            StockPrice.stock_id
+        ).all())
+        derived = dict(self.db.query(StockPriceDerived.stock_id, func.count(StockPriceDerived.id)).group_by(
+            StockPriceDerived.stock_id
+        ).all())
+        stale = [stock_id for stock_id, count in bars.items() if derived.get(stock_id) != count]
+        for stock_id in stale:
+            self.rebuild(stock_id)
+        return len(stale)
+
+    def add_columns(self, columns: Dict[str, np.ndarray], stock_id: int) -> Dict[str, np.ndarray]:
+        """
+        Add the stored derived series to one stock's date-ordered price
+        columns; bars without a derived row get NaN
+        """
+        dates = columns["date"]
+        rows = self.db.query(StockPriceDerived.date, *[getattr(StockPriceDerived, f) for f in DERIVED_FIELDS]).filter(
+            StockPriceDerived.stock_id == stock_id,
+            StockPriceDerived.date >= dates[0].item(),
+            StockPriceDerived.date <= dates[-1].item()
+        ).order_by(StockPriceDerived.date).all() if len(dates) else []
+
+        stored = list(zip(*rows)) if rows else [[]] * (len(DERIVED_FIELDS) + 1)
+        stored_dates = np.array(stored[0], dtype="datetime64[D]")
+        at = np.minimum(np.searchsorted(stored_dates, dates), max(len(stored_dates) - 1, 0))
+        found = stored_dates[at] == dates if len(stored_dates) else np.zeros(len(dates), dtype=bool)
+
+        merged = dict(columns)
+        for name, values in zip(DERIVED_FIELDS, stored[1:]):
+            values = np.array(values, dtype=np.float64)
+            merged[name] = np.where(found, values[at] if len(values) else np.nan, np.nan)
+        return merged
+
+def _update_derived(db: Session, stock_id: int, bars: List[Dict[str, Any]]) -> None:
+    DerivedSeriesService(db).update_from(stock_id, bars[0]["date"])
+
+register_bar_listener(_update_derived)
@@ -0,0 +1,170 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.stock import Stock
+from app.services.change_events import register_listener
+
+logger = logging.getLogger(__name__)
+
+FACET_COLUMNS = (Stock.id, Stock.sector, Stock.industry, Stock.market_cap)
+
+class FacetService:
+    """
+    In-memory sector -> industry -> (count, market cap) facets, kept current
+    from committed Stock writes instead of SELECT DISTINCT per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stocks: Dict[int, Tuple[Optional[str], Optional[str], float]] = {}
+        self._sectors: Dict[str, Dict[str, Any]] = {}
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        Build the facets from the database on first use
+        """
+        if not self._loaded:
+            self.rebuild(db)
+
+    async def ensure_loaded_async(self, db: AsyncSession) -> None:
+        """
+        As ensure_loaded(), reading the stocks table on an async session
+        """
+        if not self._loaded:
+            self._load((await db.execute(select(*FACET_COLUMNS))).all())
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Rebuild all facets from the stocks table
+        """
+        self._load(db.query(*FACET_COLUMNS).all())
+
+    def _load(self, rows) -> None:
+        with self._lock:
+            self._stocks.clear()
+            self._sectors.clear()
+            for row in rows:
+                self._add(row.id, row.sector, row.industry, row.market_cap)
+            self._loaded = True
+        logger.info(f"Sector facets built from {len(rows)} stocks")
+
+    def reset(self) -> None:
+        """
+        Drop all facets; the next ensure_loaded() rebuilds from the database
+        """
+        with self._lock:
+            self._stocks.clear()
+            self._sectors.clear()
+            self._loaded = False
+
+    def sectors(self) -> List[str]:
+        with self._lock:
+            return sorted(self._sectors)
+
+    def industries(self, sector: Optional[str] = None) -> List[str]:
+        with self._lock:
+            if sector is not None:
+                group = self._sectors.get(sector)
+                return sorted(group["industries"]) if group else []
+            return sorted({i for group in self._sectors.values() for i in group["industries"]})
+
+    def facets(self, sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Sector facets with counts and aggregate market cap, each with its industries
+        """
+        with self._lock:
+            sectors = [sector] if sector is not None else sorted(self._sectors)
+            return [
+                self._format(name, self._sectors[name])
+                for name in sectors if name in self._sectors
+            ]
+
+    def facets_for(self, stock_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Facets restricted to the given stocks, e.g. the matches of a screen
+        """
+        sectors: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for stock_id in stock_ids:
+                values = self._stocks.get(stock_id)
+                if values is not None:
+                    self._count(sectors, *values, sign=1)
+        return [self._format(name, sectors[name]) for name in sorted(sectors)]
+
+    def apply_changes(self, changes) -> None:
+        """
+        Change listener: apply committed Stock writes to loaded facets
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            for operation, snapshot in changes:
+                if operation == "bulk":
+                    # Rows unknown; rebuild on next use
+                    self._stocks.clear()
+                    self._sectors.clear()
+                    self._loaded = False
+                    return
+                stock_id = snapshot.get("id")
+                if stock_id is None:
+                    continue
+                current = self._remove(stock_id)
+                if operation == "delete":
+                    continue
+                sector, industry, market_cap = current or (None, None, 0.0)
+                self._add(
+                    stock_id,
+                    snapshot.get("sector", sector),
+                    snapshot.get("industry", industry),
+                    snapshot.get("market_cap", market_cap)
+                )
+
+    def _add(self, stock_id: int, sector, industry, market_cap) -> None:
+        values = (sector or None, industry or None, market_cap or 0.0)
+        self._stocks[stock_id] = values
+        self._count(self._sectors, *values, sign=1)
+
+    def _remove(self, stock_id: int):
+        values = self._stocks.pop(stock_id, None)
+        if values is not None:
+            self._count(self._sectors, *values, sign=-1)
+        return values
+
+    @staticmethod
+    def _count(sectors, sector, industry, market_cap, sign: int) -> None:
+        if sector is None:
+            return
+        group = sectors.setdefault(sector, {"count": 0, "market_cap": 0.0, "industries": {}})
+        group["count"] += sign
+        group["market_cap"] += sign * market_cap
+        if industry is not None:
+            sub = group["industries"].setdefault(industry, {"count": 0, "market_cap": 0.0})
+            sub["count"] += sign
+            sub["market_cap"] += sign * market_cap
+            if sub["count"] <= 0:
+                del group["industries"][industry]
+        if group["count"] <= 0:
+            del sectors[sector]
+
+    @staticmethod
+    def _format(name: str, group: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "count": group["count"],
+            "market_cap": group["market_cap"],
+            "industries": [
+                {"name": industry, "count": sub["count"], "market_cap": sub["market_cap"]}
+                for industry, sub in sorted(group["industries"].items())
+            ]
+        }
+
+# Create a singleton instance
+facet_service = FacetService()
+
+register_listener(Stock, facet_service.apply_changes)
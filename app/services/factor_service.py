@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.stock import Stock, StockFactorScore
+
+logger = logging.getLogger(__name__)
+
+# Stock fundamentals that are ranked
+FACTOR_FIELDS = (
+    "market_cap", "pe_ratio", "price", "price_to_book", "dividend_yield", "eps", "beta",
+    "fifty_two_week_high", "fifty_two_week_low", "avg_volume"
+)
+# Screen field suffix -> StockFactorScore column, longest suffixes first
+SCORE_SUFFIXES = (
+    ("_sector_pct", "sector_pct"),
+    ("_sector_z", "sector_z"),
+    ("_industry_pct", "industry_pct"),
+    ("_industry_z", "industry_z"),
+    ("_pct", "pct")
+)
+SCORE_COLUMNS = tuple(column for _, column in SCORE_SUFFIXES)
+# Relative difference below which a recomputed score is left as stored
+SCORE_TOLERANCE = 1e-9
+
+def parse_score_field(name: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a screen field such as `pe_ratio_sector_pct` into
+    (fundamental, score column), or None if it names no score
+    """
+    for suffix, column in SCORE_SUFFIXES:
+        if name.endswith(suffix) and name[:-len(suffix)] in FACTOR_FIELDS:
+            return name[:-len(suffix)], column
+    return None
+
+def compute_factor_scores(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Score every fundamental of every stock in one vectorized pass. `frame`
+    has one row per stock with `sector`, `industry` and FACTOR_FIELDS
+    columns. Returns a stocks x fields frame per score column; stocks
+    without a value, or without a sector/industry for the group scores,
+    get NaN.
+    """
+    values = frame[list(FACTOR_FIELDS)].astype(np.float64)
+    scores = {"pct": values.rank(pct=True) * 100}
+    for group in ("sector", "industry"):
+        grouped = values.groupby(frame[group])
+        scores[f"{group}_pct"] = grouped.rank(pct=True) * 100
+        # Groups of one value or without spread have no z-score
+        z = (values - grouped.transform("mean")) / grouped.transform("std")
+        scores[f"{group}_z"] = z.replace([np.inf, -np.inf], np.nan)
+    return scores
+
+def _same_score(stored: Optional[float], score: Optional[float]) -> bool:
+    """Whether a recomputed score matches the stored one, up to float noise"""
+    if stored is None or score is None:
+        return stored is None and score is None
+    return abs(stored - score) <= SCORE_TOLERANCE * max(1.0, abs(score))
+
+class FactorScoreService:
+    """
+    Percentile ranks and sector/industry z-scores of the Stock fundamentals
+    across the whole universe, stored in stock_factor_scores so screens can
+    filter on them without window functions per request.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def refresh(self) -> int:
+        """
+        Recompute the scores of every stock and store the ones that changed.
+        Returns the number of rows written.
+        """
+        started = time.perf_counter()
+        rows = self.db.connection().execute(
+            select(Stock.id, Stock.sector, Stock.industry, *[getattr(Stock, f) for f in FACTOR_FIELDS])
+        ).all()
+        frame = pd.DataFrame(rows, columns=["id", "sector", "industry", *FACTOR_FIELDS])
+        scores = compute_factor_scores(frame)
+
+        existing = {
+            (row.stock_id, row.field): row
+            for row in self.db.query(
+                StockFactorScore.id, StockFactorScore.stock_id, StockFactorScore.field,
+                *[getattr(StockFactorScore, column) for column in SCORE_COLUMNS]
+            ).all()
+        }
+
+        now = datetime.utcnow()
+        stock_ids = frame["id"].tolist()
+        columns = {
+            (column, field): [None if v != v else v for v in scores[column][field].tolist()]
+            for column in SCORE_COLUMNS for field in FACTOR_FIELDS
+        }
+        new_rows = []
+        changed_rows = []
+        for field in FACTOR_FIELDS:
+            for i, stock_id in enumerate(stock_ids):
+                row = {column: columns[column, field][i] for column in SCORE_COLUMNS}
+                stored = existing.pop((stock_id, field), None)
+                if stored is None:
+                    new_rows.append({"stock_id": stock_id, "field": field, **row, "updated_at": now})
+                # Unchanged rows keep their updated_at, which versions screen results
+                elif not all(_same_score(getattr(stored, column), row[column]) for column in SCORE_COLUMNS):
+                    changed_rows.append({"id": stored.id, **row, "updated_at": now})
+
+        if new_rows:
+            self.db.execute(insert(StockFactorScore), new_rows)
+        if changed_rows:
+            self.db.execute(update(StockFactorScore), changed_rows)
+        # Scores of deleted stocks or of fields no longer ranked
+        if existing:
+            self.db.execute(delete(StockFactorScore).where(StockFactorScore.id.in_([row.id for row in existing.values()])))
+        self.db.commit()
+
+        logger.info(
+            f"Factor scores refreshed for {len(stock_ids)} stocks in {time.perf_counter() - started:.2f}s"
+        )
+        return len(new_rows) + len(changed_rows)
@@ -0,0 +1,264 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock import Stock, StockPrice, StockIndicator, StockIndicatorState
+from app.services.indicator_state import IndicatorState
+from app.services.price_history_service import register_bar_listener
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_FIELDS = (
+    "sma_20", "sma_50", "sma_200", "rsi_14",
+    "macd", "macd_signal", "macd_histogram",
+    "bollinger_upper", "bollinger_middle", "bollinger_lower"
+)
+
+# Bars needed before each indicator is reported, as in
+# StockService.calculate_technical_indicators
+MIN_BARS = {
+    "sma_20": 20, "sma_50": 50, "sma_200": 200, "rsi_14": 14,
+    "macd": 26, "macd_signal": 26, "macd_histogram": 26,
+    "bollinger_upper": 20, "bollinger_middle": 20, "bollinger_lower": 20
+}
+
+def compute_indicators(closes: pd.DataFrame, counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Latest value of every indicator for every column of a bars x stocks
+    close matrix in one vectorized pass. Each column holds one stock's own
+    bars, right-aligned so its last bar is in the last row; `counts` is the
+    number of bars per column.
+    """
+    sma_20 = closes.rolling(window=20).mean()
+    std_20 = closes.rolling(window=20).std()
+
+    delta = closes.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+
+    ema_12 = closes.ewm(span=12, adjust=False).mean()
+    ema_26 = closes.ewm(span=26, adjust=False).mean()
+    macd = ema_12 - ema_26
+    signal = macd.ewm(span=9, adjust=False).mean()
+
+    last = {
+        "sma_20": sma_20.iloc[-1],
+        "sma_50": closes.iloc[-50:].mean(skipna=False),
+        "sma_200": closes.iloc[-200:].mean(skipna=False),
+        "rsi_14": 100 - (100 / (1 + gain.iloc[-1] / loss.iloc[-1])),
+        "macd": macd.iloc[-1],
+        "macd_signal": signal.iloc[-1],
+        "macd_histogram": macd.iloc[-1] - signal.iloc[-1],
+        "bollinger_upper": sma_20.iloc[-1] + std_20.iloc[-1] * 2,
+        "bollinger_middle": sma_20.iloc[-1],
+        "bollinger_lower": sma_20.iloc[-1] - std_20.iloc[-1] * 2
+    }
+
+    results = {}
+    for name in INDICATOR_FIELDS:
+        values = last[name].to_numpy(dtype=np.float64, copy=True)
+        # Columns shorter than the indicator's window have no value
+        values[counts < MIN_BARS[name]] = np.nan
+        results[name] = values
+    return results
+
+class IndicatorService:
+    """
+    Universe-wide technical indicators. Closes for many stocks are loaded
+    with one query into an aligned bars x stocks matrix, every indicator is
+    computed for every stock in one pass and results are written back in bulk.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_close_matrix(
+        self,
+        stock_ids: List[int],
+        start: date,
+        end: date
+    ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build a bars x stocks close matrix for [start, end], right-aligned per
+        stock. Returns (closes, stock_ids, bar counts, last bar dates) for the
+        stocks that have bars.
+        """
+        in_range = (
+            StockPrice.stock_id.in_(stock_ids),
+            StockPrice.date >= start,
+            StockPrice.date <= end
+        )
+        # Plain Core rows: ORM row processing dominates for ~10^6 bars
+        rows = self.db.connection().execute(
+            select(StockPrice.stock_id, StockPrice.close).where(*in_range)
+            .order_by(StockPrice.stock_id, StockPrice.date)
+        ).all()
+        if not rows:
+            empty = np.array([], dtype=np.int64)
+            return pd.DataFrame(), empty, empty, np.array([], dtype="datetime64[D]")
+
+        ids, closes = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        closes = np.array(closes, dtype=np.float64)
+
+        columns, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        column = np.repeat(np.arange(len(columns)), counts)
+        position = np.arange(len(ids)) - np.repeat(first, counts)
+        length = int(counts.max())
+        row = length - np.repeat(counts, counts) + position
+
+        matrix = np.full((length, len(columns)), np.nan)
+        matrix[row, column] = closes
+
+        last_bar = dict(self.db.query(StockPrice.stock_id, func.max(StockPrice.date)).filter(
+            *in_range
+        ).group_by(StockPrice.stock_id).all())
+        last_dates = np.array([last_bar[i] for i in columns.tolist()], dtype="datetime64[D]")
+        return pd.DataFrame(matrix, columns=columns), columns, counts, last_dates
+
+    def compute(
+        self,
+        stock_ids: List[int],
+        days: Optional[int] = None,
+        end: Optional[date] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Indicators for the given stocks over the last `days` calendar days,
+        keyed by stock ID. Stocks without bars are omitted.
+        """
+        days = settings.INDICATOR_LOOKBACK_DAYS if days is None else days
+        end = end or datetime.now().date()
+        closes, columns, counts, last_dates = self.load_close_matrix(
+            stock_ids, end - timedelta(days=days), end
+        )
+        if not len(columns):
+            return {}
+
+        values = compute_indicators(closes, counts)
+        results = {}
+        for i, stock_id in enumerate(columns.tolist()):
+            indicators = {}
+            for name in INDICATOR_FIELDS:
+                value = values[name][i]
+                indicators[name] = None if np.isnan(value) else float(value)
+            results[stock_id] = {"as_of": last_dates[i].item(), **indicators}
+        return results
+
+    def refresh_all(self, days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Recompute and store indicators for every stock, a batch of stocks per
+        query. Returns the number of stocks written.
+        """
+        batch_size = batch_size or settings.INDICATOR_BATCH_SIZE
+        started = time.perf_counter()
+        stock_ids = [row.id for row in self.db.query(Stock.id).order_by(Stock.id).all()]
+
+        written = 0
+        for i in range(0, len(stock_ids), batch_size):
+            results = self.compute(stock_ids[i:i + batch_size], days=days)
+            written += self.store(results, commit=False)
+            self.db.commit()
+
+        logger.info(
+            f"Indicators refreshed for {written} stocks in {time.perf_counter() - started:.2f}s"
+        )
+        return written
+
+    def store(self, results: Dict[int, Dict[str, Any]], commit: bool = True) -> int:
+        """
+        Upsert indicator rows with one lookup query and bulk statements
+        """
+        if not results:
+            return 0
+        existing = dict(self.db.query(StockIndicator.stock_id, StockIndicator.id).filter(
+            StockIndicator.stock_id.in_(list(results))
+        ).all())
+
+        now = datetime.utcnow()
+        new_rows = []
+        changed_rows = []
+        for stock_id, values in results.items():
+            row = {**values, "updated_at": now}
+            if stock_id in existing:
+                changed_rows.append({"id": existing[stock_id], **row})
+            else:
+                new_rows.append({"stock_id": stock_id, **row})
+
+        if new_rows:
+            self.db.execute(insert(StockIndicator), new_rows)
+        if changed_rows:
+            self.db.execute(update(StockIndicator), changed_rows)
+        if commit:
+            self.db.commit()
+        return len(new_rows) + len(changed_rows)
+
+    def apply_bars(self, stock_id: int, bars: List[Dict[str, Any]]) -> None:
+        """
+        Advance a stock's persisted indicator state with newly written bars
+        and store the resulting indicators. Later bars and a revised last bar
+        are applied in O(1); backfills or missed bars rebuild the state.
+        """
+        bars = [bar for bar in bars if bar.get("close") is not None]
+        if not bars:
+            return
+
+        row = self.db.query(StockIndicatorState).filter(StockIndicatorState.stock_id == stock_id).first()
+        state = IndicatorState.from_row(row) if row else None
+        if state is not None:
+            appended = sum(1 for bar in bars if bar["date"] > state.last_date)
+            stored = self.db.query(func.count(StockPrice.id)).filter(
+                StockPrice.stock_id == stock_id,
+                StockPrice.date > state.last_date,
+                StockPrice.close.isnot(None)
+            ).scalar()
+            # Bars written without this listener would otherwise be skipped
+            if stored != appended:
+                state = None
+        if state is not None:
+            for bar in bars:
+                if not state.apply(bar["date"], bar["close"]):
+                    state = None
+                    break
+        if state is None:
+            state = self.rebuild_state(stock_id)
+            if state is None:
+                return
+
+        if row is None:
+            self.db.add(StockIndicatorState(stock_id=stock_id, **state.to_dict()))
+        else:
+            for key, value in state.to_dict().items():
+                setattr(row, key, value)
+        self.store({stock_id: {"as_of": state.last_date, **state.indicators()}}, commit=False)
+
+    def rebuild_state(self, stock_id: int, days: Optional[int] = None) -> Optional[IndicatorState]:
+        """
+        Replay the stock's stored closes in the lookback window into a fresh state
+        """
+        days = settings.INDICATOR_LOOKBACK_DAYS if days is None else days
+        bars = self.db.query(StockPrice.date, StockPrice.close).filter(
+            StockPrice.stock_id == stock_id,
+            StockPrice.date >= datetime.now().date() - timedelta(days=days),
+            StockPrice.close.isnot(None)
+        ).order_by(StockPrice.date).all()
+        if not bars:
+            return None
+        return IndicatorState.from_closes(bars)
+
+    def get(self, stock_id: int) -> Optional[StockIndicator]:
+        """
+        Stored indicators for a stock
+        """
+        return self.db.query(StockIndicator).filter(StockIndicator.stock_id == stock_id).first()
+
+def _apply_new_bars(db: Session, stock_id: int, bars: List[Dict[str, Any]]) -> None:
+    IndicatorService(db).apply_bars(stock_id, bars)
+
+register_bar_listener(_apply_new_bars)
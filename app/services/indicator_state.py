@@ -0,0 +1,196 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+import math
+
+# Closes kept in the state: the 200-bar SMA window plus the bar leaving it
+WINDOW = 201
+SMA_WINDOWS = (20, 50, 200)
+RSI_WINDOW = 14
+EMA_ALPHAS = {"ema_12": 2 / 13, "ema_26": 2 / 27}
+SIGNAL_ALPHA = 2 / 10
+
+# Re-derive running sums from the window this often to bound float drift
+RESYNC_EVERY = 500
+
+class IndicatorState:
+    """
+    Constant-size per-stock state from which SMA, RSI, MACD and Bollinger
+    values are updated in O(1) per new bar, with the same definitions as
+    StockService.calculate_technical_indicators.
+
+    EMA values are kept as of the bar before the last one, so the last bar
+    can be replaced (an intraday refresh of today's bar) without a rebuild.
+    """
+
+    def __init__(
+        self,
+        last_date: Optional[date] = None,
+        bar_count: int = 0,
+        closes: Optional[List[float]] = None,
+        sums: Optional[Dict[str, float]] = None,
+        gain_14: float = 0.0,
+        loss_14: float = 0.0,
+        ema_12: Optional[float] = None,
+        ema_26: Optional[float] = None,
+        macd_signal: Optional[float] = None
+    ):
+        self.last_date = last_date
+        self.bar_count = bar_count
+        self.closes = list(closes or [])
+        self.sums = dict(sums or {f"sum_{n}": 0.0 for n in SMA_WINDOWS})
+        self.gain_14 = gain_14
+        self.loss_14 = loss_14
+        self.ema_12 = ema_12
+        self.ema_26 = ema_26
+        self.macd_signal = macd_signal
+
+    @classmethod
+    def from_closes(cls, bars: Iterable) -> "IndicatorState":
+        """
+        Build the state by replaying (date, close) bars in date order
+        """
+        state = cls()
+        for bar_date, close in bars:
+            state.append(bar_date, close)
+        return state
+
+    def apply(self, bar_date: date, close: float) -> bool:
+        """
+        Apply one bar: a later date appends, the current last date replaces
+        the last close. Returns False for an earlier date, which needs a
+        rebuild from stored history.
+        """
+        if self.last_date is None or bar_date > self.last_date:
+            self.append(bar_date, close)
+            return True
+        if bar_date == self.last_date:
+            self.replace_last(close)
+            return True
+        return False
+
+    def append(self, bar_date: date, close: float) -> None:
+        if self.closes:
+            # Fold the previous last bar into the EMA base
+            self.ema_12, self.ema_26, self.macd_signal = self._emas()
+
+        closes = self.closes
+        closes.append(close)
+        for n in SMA_WINDOWS:
+            self.sums[f"sum_{n}"] += close
+            if len(closes) > n:
+                self.sums[f"sum_{n}"] -= closes[-n - 1]
+        if len(closes) >= 2:
+            self._add_delta(closes[-1] - closes[-2], 1)
+        if len(closes) > RSI_WINDOW + 1:
+            self._add_delta(closes[-RSI_WINDOW - 1] - closes[-RSI_WINDOW - 2], -1)
+        if len(closes) > WINDOW:
+            del closes[0]
+
+        self.last_date = bar_date
+        self.bar_count += 1
+        if self.bar_count % RESYNC_EVERY == 0:
+            self._resync()
+
+    def replace_last(self, close: float) -> None:
+        closes = self.closes
+        previous = closes[-1]
+        closes[-1] = close
+        for n in SMA_WINDOWS:
+            self.sums[f"sum_{n}"] += close - previous
+        if len(closes) >= 2:
+            self._add_delta(previous - closes[-2], -1)
+            self._add_delta(close - closes[-2], 1)
+
+    def indicators(self) -> Dict[str, Optional[float]]:
+        """
+        Indicator values as of the last bar; None where history is too short
+        """
+        n = self.bar_count
+        values: Dict[str, Optional[float]] = {
+            "sma_20": None, "sma_50": None, "sma_200": None, "rsi_14": None,
+            "macd": None, "macd_signal": None, "macd_histogram": None,
+            "bollinger_upper": None, "bollinger_middle": None, "bollinger_lower": None
+        }
+        for window in SMA_WINDOWS:
+            if n >= window:
+                values[f"sma_{window}"] = self.sums[f"sum_{window}"] / window
+
+        if n >= RSI_WINDOW:
+            gain = self.gain_14 / RSI_WINDOW
+            loss = self.loss_14 / RSI_WINDOW
+            values["rsi_14"] = _rsi(gain, loss)
+
+        if n >= 26:
+            ema_12, ema_26, signal = self._emas()
+            values["macd"] = ema_12 - ema_26
+            values["macd_signal"] = signal
+            values["macd_histogram"] = values["macd"] - signal
+
+        if n >= 20:
+            window = self.closes[-20:]
+            mean = values["sma_20"]
+            # Sample deviation from the 20 stored closes; bounded work per bar
+            std = math.sqrt(sum((c - mean) ** 2 for c in window) / 19)
+            values["bollinger_upper"] = mean + std * 2
+            values["bollinger_middle"] = mean
+            values["bollinger_lower"] = mean - std * 2
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "last_date": self.last_date,
+            "bar_count": self.bar_count,
+            "closes": self.closes,
+            **self.sums,
+            "gain_14": self.gain_14,
+            "loss_14": self.loss_14,
+            "ema_12": self.ema_12,
+            "ema_26": self.ema_26,
+            "macd_signal": self.macd_signal
+        }
+
+    @classmethod
+    def from_row(cls, row: Any) -> "IndicatorState":
+        return cls(
+            last_date=row.last_date,
+            bar_count=row.bar_count,
+            closes=row.closes,
+            sums={f"sum_{n}": getattr(row, f"sum_{n}") for n in SMA_WINDOWS},
+            gain_14=row.gain_14,
+            loss_14=row.loss_14,
+            ema_12=row.ema_12,
+            ema_26=row.ema_26,
+            macd_signal=row.macd_signal
+        )
+
+    def _emas(self):
+        """EMA 12/26 and MACD signal including the last close"""
+        close = self.closes[-1]
+        if self.ema_12 is None:
+            ema_12 = ema_26 = close
+            return ema_12, ema_26, ema_12 - ema_26
+        ema_12 = EMA_ALPHAS["ema_12"] * close + (1 - EMA_ALPHAS["ema_12"]) * self.ema_12
+        ema_26 = EMA_ALPHAS["ema_26"] * close + (1 - EMA_ALPHAS["ema_26"]) * self.ema_26
+        macd = ema_12 - ema_26
+        signal = SIGNAL_ALPHA * macd + (1 - SIGNAL_ALPHA) * self.macd_signal
+        return ema_12, ema_26, signal
+
+    def _add_delta(self, delta: float, sign: int) -> None:
+        if delta > 0:
+            self.gain_14 += sign * delta
+        elif delta < 0:
+            self.loss_14 -= sign * delta
+
+    def _resync(self) -> None:
+        closes = self.closes
+        for n in SMA_WINDOWS:
+            self.sums[f"sum_{n}"] = math.fsum(closes[-n:])
+        deltas = [b - a for a, b in zip(closes[-RSI_WINDOW - 1:], closes[-RSI_WINDOW:])]
+        self.gain_14 = math.fsum(d for d in deltas if d > 0)
+        self.loss_14 = -math.fsum(d for d in deltas if d < 0)
+
+def _rsi(gain: float, loss: float) -> Optional[float]:
+    # Same edge cases as pandas: x/0 is inf (RSI 100), 0/0 is NaN (None)
+    if loss == 0:
+        return None if gain == 0 else 100.0
+    return 100 - (100 / (1 + gain / loss))
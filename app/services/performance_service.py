@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.services.price_history_service import PriceHistoryService
+
+# Calendar days covered by each performance period
+PERIOD_DAYS = {"1m": 30, "3m": 90, "6m": 180, "1y": 365, "3y": 3 * 365, "5y": 5 * 365}
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def performance_metrics(dates: np.ndarray, closes: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Total and annualized return, annualized volatility of daily returns and
+    maximum drawdown (all in percent) for date-ordered closes. Bars without
+    a close are skipped. Returns None when there are no closes.
+    """
+    valid = ~np.isnan(closes)
+    dates, closes = dates[valid], closes[valid]
+    if not len(closes):
+        return None
+
+    start_price, end_price = float(closes[0]), float(closes[-1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_return = (end_price - start_price) / start_price * 100 if start_price else math.nan
+
+        days = int((dates[-1] - dates[0]).astype(np.int64))
+        if days > 0:
+            annualized_return = float(np.float64(1 + total_return / 100) ** (365 / days) - 1) * 100
+        else:
+            annualized_return = 0
+
+        returns = closes[1:] / closes[:-1] - 1
+        volatility = returns.std(ddof=1) * (252 ** 0.5) * 100 if len(returns) > 1 else math.nan
+
+        # Drawdown of the compounded daily returns from their running peak
+        growth = np.cumprod(1 + returns)
+        max_drawdown = (
+            (growth / np.maximum.accumulate(growth) - 1).min() * 100 if len(returns) else math.nan
+        )
+
+    return {
+        "start_date": dates[0].item(),
+        "end_date": dates[-1].item(),
+        "start_price": start_price,
+        "end_price": end_price,
+        "total_return": _finite(total_return),
+        "annualized_return": _finite(annualized_return),
+        "volatility": _finite(volatility),
+        "max_drawdown": _finite(max_drawdown)
+    }
+
+class PerformanceService:
+    """
+    Performance metrics for several periods and stocks from one history
+    load: bars for the longest period are read once and every shorter
+    period is a slice of the same arrays.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def compute(
+        self,
+        stock_ids: List[int],
+        periods: List[str],
+        end: Optional[date] = None
+    ) -> Dict[int, Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        Metrics keyed by stock ID, then period. Periods without bars are None.
+        """
+        invalid = [p for p in periods if p not in PERIOD_DAYS]
+        if invalid:
+            raise ValueError(f"Invalid period. Must be one of: {', '.join(PERIOD_DAYS)}")
+
+        end = end or datetime.now().date()
+        longest = max(PERIOD_DAYS[p] for p in periods)
+        columns = PriceHistoryService(self.db).get_price_columns(
+            stock_ids, end - timedelta(days=longest), end
+        )
+        period_starts = {p: np.datetime64(end - timedelta(days=PERIOD_DAYS[p]), "D") for p in periods}
+
+        results = {stock_id: {p: None for p in periods} for stock_id in stock_ids}
+        ids, first, counts = np.unique(columns["stock_id"], return_index=True, return_counts=True)
+        for stock_id, lo, count in zip(ids.tolist(), first.tolist(), counts.tolist()):
+            dates = columns["date"][lo:lo + count]
+            closes = columns["close"][lo:lo + count]
+            for period, period_start in period_starts.items():
+                offset = int(np.searchsorted(dates, period_start))
+                results[stock_id][period] = performance_metrics(dates[offset:], closes[offset:])
+        return results
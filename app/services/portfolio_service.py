@@ -0,0 +1,141 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.services.performance_service import performance_metrics
+from app.services.price_history_service import PriceHistoryService
+
+TRADING_DAYS = 252
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def portfolio_metrics(
+    dates: np.ndarray,
+    closes: np.ndarray,
+    weights: np.ndarray,
+    risk_free_rate: float = 0.0,
+    confidence: float = 0.95
+) -> Dict[str, Any]:
+    """
+    Risk and return of a daily-rebalanced portfolio from a dates x holdings
+    close matrix (NaN where a holding has no bar). Gaps carry the last close
+    forward and holdings earn nothing before their first bar.
+
+    Returns, volatility, drawdown and VaR/CVaR are in percent. Return
+    contribution is each holding's sum of weighted daily returns; risk
+    contribution is its share of portfolio variance (summing to 100).
+    """
+    weights = weights / weights.sum()
+
+    # Forward-fill each column, then daily returns with 0 for missing bars
+    rows = np.where(~np.isnan(closes), np.arange(len(closes))[:, None], 0)
+    filled = np.take_along_axis(closes, np.maximum.accumulate(rows, axis=0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = filled[1:] / filled[:-1] - 1
+    returns[~np.isfinite(returns)] = 0.0
+
+    portfolio = returns @ weights
+    value = np.concatenate(([1.0], np.cumprod(1 + portfolio)))
+    metrics = performance_metrics(dates, value)
+
+    # Annualized excess return per unit of annualized volatility
+    std = portfolio.std(ddof=1) if len(portfolio) > 1 else math.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (portfolio.mean() * TRADING_DAYS - risk_free_rate) / (std * math.sqrt(TRADING_DAYS))
+
+    # Historical VaR/CVaR: loss at and beyond the (1 - confidence) quantile
+    cutoff = np.quantile(portfolio, 1 - confidence)
+    value_at_risk = -cutoff * 100
+    conditional_value_at_risk = -portfolio[portfolio <= cutoff].mean() * 100
+
+    # Marginal risk from the centred returns, without forming the covariance matrix
+    centred = returns - returns.mean(axis=0)
+    marginal = centred.T @ (centred @ weights) / max(len(returns) - 1, 1)
+    variance = weights @ marginal
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk_contribution = weights * marginal / variance * 100
+    return_contribution = weights * returns.sum(axis=0) * 100
+
+    return {
+        "start_date": metrics["start_date"],
+        "end_date": metrics["end_date"],
+        "observations": len(portfolio),
+        "total_return": metrics["total_return"],
+        "annualized_return": metrics["annualized_return"],
+        "volatility": metrics["volatility"],
+        "sharpe_ratio": _finite(sharpe),
+        "max_drawdown": metrics["max_drawdown"],
+        "confidence": confidence,
+        "value_at_risk": _finite(value_at_risk),
+        "conditional_value_at_risk": _finite(conditional_value_at_risk),
+        "weights": weights,
+        "return_contribution": return_contribution,
+        "risk_contribution": risk_contribution,
+        "series": {
+            "dates": [d.item() for d in dates[1:]],
+            "returns": portfolio.tolist(),
+            "value": value[1:].tolist()
+        }
+    }
+
+class PortfolioService:
+    """
+    Portfolio analytics over the aligned close matrix of the holdings,
+    loaded with one query and evaluated with matrix operations
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def analyze(
+        self,
+        holdings: List[Tuple[int, str, float]],
+        days: int = 365,
+        risk_free_rate: float = 0.0,
+        confidence: float = 0.95,
+        end: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Analytics for (stock ID, symbol, weight) holdings over the last `days`
+        calendar days
+        """
+        stock_ids = [stock_id for stock_id, symbol, weight in holdings]
+        if len(set(stock_ids)) != len(stock_ids):
+            raise ValueError("Each stock can only be held once")
+        weights = np.array([weight for stock_id, symbol, weight in holdings], dtype=np.float64)
+        if not np.isfinite(weights).all() or abs(weights.sum()) < 1e-12:
+            raise ValueError("Weights must be finite and must not sum to zero")
+
+        end = end or datetime.now().date()
+        dates, closes = PriceHistoryService(self.db).get_close_matrix(
+            stock_ids, end - timedelta(days=days), end
+        )
+        without_history = [
+            symbol for (stock_id, symbol, weight), has_bars
+            in zip(holdings, (~np.isnan(closes)).any(axis=0)) if not has_bars
+        ]
+        if without_history:
+            raise ValueError(f"No price history in the window for: {', '.join(without_history)}")
+        if len(dates) < 2:
+            raise ValueError("At least two trading days of price history are needed")
+
+        result = portfolio_metrics(dates, closes, weights, risk_free_rate, confidence)
+        result["holdings"] = [
+            {
+                "stock_id": stock_id,
+                "symbol": symbol,
+                "weight": float(weight),
+                "return_contribution": _finite(ret),
+                "risk_contribution": _finite(risk)
+            }
+            for (stock_id, symbol, _), weight, ret, risk in zip(
+                holdings, result.pop("weights"), result.pop("return_contribution"),
+                result.pop("risk_contribution")
+            )
+        ]
+        return result
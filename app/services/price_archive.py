@@ -0,0 +1,180 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock import Stock, StockPrice, StockPriceDerived
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = ("open", "high", "low", "close", "volume")
+
+def _empty_history() -> Dict[str, np.ndarray]:
+    return {
+        "date": np.array([], dtype="datetime64[D]"),
+        **{name: np.array([], dtype=np.int64 if name == "volume" else np.float64) for name in ARCHIVE_FIELDS}
+    }
+
+class PriceArchive:
+    """
+    Cold tier of stock_prices: bars older than the archive horizon are moved
+    into Parquet files partitioned by symbol and year,
+    `<root>/symbol=<SYMBOL>/year=<YYYY>.parquet`, and deleted from the table.
+    Price history reads merge these bars under the ones in stock_prices.
+    """
+
+    def __init__(self, root: str):
+        if pa is None:
+            raise RuntimeError("The Parquet price archive requires pyarrow")
+        self.root = root
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, f"symbol={symbol.replace('/', '_')}")
+
+    def _year_path(self, symbol: str, year: int) -> str:
+        return os.path.join(self._symbol_dir(symbol), f"year={year}.parquet")
+
+    def _years(self, symbol: str) -> List[int]:
+        try:
+            names = os.listdir(self._symbol_dir(symbol))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(name[len("year="):-len(".parquet")]) for name in names
+            if name.startswith("year=") and name.endswith(".parquet")
+        )
+
+    def _read_file(self, path: str) -> Dict[str, np.ndarray]:
+        table = pq.read_table(path, columns=["date", *ARCHIVE_FIELDS])
+        return {
+            "date": table.column("date").to_numpy().astype("datetime64[D]"),
+            **{
+                name: table.column(name).to_numpy(zero_copy_only=False).astype(
+                    np.int64 if name == "volume" else np.float64
+                )
+                for name in ARCHIVE_FIELDS
+            }
+        }
+
+    def read(
+        self,
+        db: Session,
+        stock_ids: Iterable[int],
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Archived bars per stock, date ordered, optionally limited to [start, end].
+        Only the year files overlapping the range are opened.
+        """
+        stock_ids = list(stock_ids)
+        symbols = dict(db.query(Stock.id, Stock.symbol).filter(Stock.id.in_(stock_ids)).all())
+        histories = {}
+        for stock_id in stock_ids:
+            symbol = symbols.get(stock_id)
+            years = [
+                year for year in (self._years(symbol) if symbol else [])
+                if (start is None or year >= start.year) and (end is None or year <= end.year)
+            ]
+            parts = [self._read_file(self._year_path(symbol, year)) for year in years]
+            if not parts:
+                histories[stock_id] = _empty_history()
+                continue
+            history = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+            keep = np.ones(len(history["date"]), dtype=bool)
+            if start is not None:
+                keep &= history["date"] >= np.datetime64(start, "D")
+            if end is not None:
+                keep &= history["date"] <= np.datetime64(end, "D")
+            histories[stock_id] = {name: values[keep] for name, values in history.items()}
+        return histories
+
+    def _write_year(self, stock_id: int, symbol: str, year: int, bars: Dict[str, np.ndarray]) -> None:
+        """
+        Merge bars into a year file; bars already archived for the same date are replaced
+        """
+        path = self._year_path(symbol, year)
+        if os.path.exists(path):
+            current = self._read_file(path)
+            keep = ~np.isin(current["date"], bars["date"])
+            merged = {name: np.concatenate((current[name][keep], bars[name])) for name in bars}
+            order = np.argsort(merged["date"], kind="stable")
+            bars = {name: values[order] for name, values in merged.items()}
+
+        table = pa.table({
+            "stock_id": pa.array(np.full(len(bars["date"]), stock_id, dtype=np.int64)),
+            "date": pa.array(bars["date"], type=pa.date32()),
+            **{
+                name: pa.array(bars[name], type=pa.int64() if name == "volume" else pa.float64(), from_pandas=True)
+                for name in ARCHIVE_FIELDS
+            }
+        })
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+
+    def compact(self, db: Session, before: date) -> int:
+        """
+        Move bars dated before `before` from stock_prices into the archive,
+        one stock per transaction. Returns the number of bars moved.
+        """
+        stocks = db.query(Stock.id, Stock.symbol).filter(
+            Stock.id.in_(select(StockPrice.stock_id).where(StockPrice.date < before).distinct())
+        ).order_by(Stock.id).all()
+
+        moved = 0
+        for stock_id, symbol in stocks:
+            rows = db.connection().execute(
+                select(StockPrice.date, *[getattr(StockPrice, f) for f in ARCHIVE_FIELDS]).where(
+                    StockPrice.stock_id == stock_id,
+                    StockPrice.date < before
+                ).order_by(StockPrice.date)
+            ).all()
+            dates, opens, highs, lows, closes, volumes = zip(*rows)
+            bars = {
+                "date": np.array(dates, dtype="datetime64[D]"),
+                "open": np.array(opens, dtype=np.float64),
+                "high": np.array(highs, dtype=np.float64),
+                "low": np.array(lows, dtype=np.float64),
+                "close": np.array(closes, dtype=np.float64),
+                "volume": np.array([v or 0 for v in volumes], dtype=np.int64)
+            }
+            years = bars["date"].astype("datetime64[Y]").astype(np.int64) + 1970
+            for year in np.unique(years).tolist():
+                in_year = years == year
+                self._write_year(stock_id, symbol, year, {name: values[in_year] for name, values in bars.items()})
+
+            # Files are in place before the rows go; Core statements skip the
+            # change events because every range read returns the same bars
+            connection = db.connection()
+            connection.execute(delete(StockPrice).where(
+                StockPrice.stock_id == stock_id, StockPrice.date < before
+            ))
+            connection.execute(delete(StockPriceDerived).where(
+                StockPriceDerived.stock_id == stock_id, StockPriceDerived.date < before
+            ))
+            db.commit()
+            moved += len(rows)
+        logger.info(f"Archived {moved} bars of {len(stocks)} stocks dated before {before}")
+        return moved
+
+# Create a singleton instance when an archive horizon is configured
+price_archive: Optional[PriceArchive] = (
+    PriceArchive(settings.PRICE_ARCHIVE_PATH) if settings.PRICE_ARCHIVE_AFTER_DAYS else None
+)
+
+def get_price_archive() -> Optional[PriceArchive]:
+    return price_archive
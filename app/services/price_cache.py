@@ -0,0 +1,220 @@
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock import StockPrice
+from app.services.change_events import has_pending_changes, register_listener
+from app.services.price_archive import get_price_archive
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+History = Dict[str, np.ndarray]
+
+def _empty_columns() -> History:
+    return {
+        "stock_id": np.array([], dtype=np.int64),
+        "date": np.array([], dtype="datetime64[D]"),
+        **{name: np.array([], dtype=np.int64 if name == "volume" else np.float64) for name in PRICE_FIELDS}
+    }
+
+def _to_history(dates: List[date], values: Dict[str, list]) -> History:
+    return {
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "open": np.array(values["open"], dtype=np.float64),
+        "high": np.array(values["high"], dtype=np.float64),
+        "low": np.array(values["low"], dtype=np.float64),
+        "close": np.array(values["close"], dtype=np.float64),
+        "volume": np.array([v or 0 for v in values["volume"]], dtype=np.int64)
+    }
+
+def _history_bytes(history: History) -> int:
+    return sum(values.nbytes for values in history.values())
+
+def merge_bars(history: History, bars: History) -> History:
+    """
+    Write date-ordered bars into a stock's history: a tail of later dates is
+    appended, anything else replaces bars with the same date or is inserted
+    """
+    if len(bars["date"]) == 0:
+        return history
+    if len(history["date"]) == 0 or bars["date"][0] > history["date"][-1]:
+        return {name: np.concatenate((history[name], bars[name])) for name in history}
+    keep = ~np.isin(history["date"], bars["date"])
+    dates = np.concatenate((history["date"][keep], bars["date"]))
+    order = np.argsort(dates, kind="stable")
+    return {
+        name: np.concatenate((history[name][keep], bars[name]))[order]
+        for name in history
+    }
+
+class PriceHistoryCache:
+    """
+    Per-process LRU cache of each stock's full stored price history as
+    contiguous NumPy arrays (date, OHLCV), bounded by the bytes held.
+
+    Committed bar writes are merged into cached histories, so a new daily
+    bar is an append instead of a reload. Writes whose rows are unknown drop
+    the affected histories. Histories are reloaded after a TTL to pick up
+    writes made by other processes.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._histories: "OrderedDict[int, Tuple[History, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_histories(self, db: Session, stock_ids: Iterable[int]) -> Dict[int, History]:
+        """
+        Full histories of the stocks, loading the ones not cached with one query
+        """
+        now = time.monotonic()
+        histories: Dict[int, History] = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for stock_id in stock_ids:
+                cached = self._histories.get(stock_id)
+                if cached is not None and now - cached[2] < self.ttl_seconds:
+                    self._histories.move_to_end(stock_id)
+                    histories[stock_id] = cached[0]
+                else:
+                    missing.append(stock_id)
+        if not missing:
+            return histories
+
+        loaded = self._load(db, missing)
+        with self._lock:
+            # Skip storing histories that raced with a price write or that
+            # include this session's uncommitted bars
+            store = self._generation == generation and not has_pending_changes(db, StockPrice)
+            for stock_id in missing:
+                histories[stock_id] = loaded[stock_id]
+                if store:
+                    self._store(stock_id, loaded[stock_id], now)
+        return histories
+
+    def get_columns(self, db: Session, stock_ids: Iterable[int], start: date, end: date) -> Dict[str, np.ndarray]:
+        """
+        Bars in [start, end] for several stocks as column arrays ordered by
+        (stock_id, date), the layout of PriceHistoryService.get_price_columns
+        """
+        ids = sorted(set(stock_ids))
+        if not ids:
+            return _empty_columns()
+        histories = self.get_histories(db, ids)
+        lo_date, hi_date = np.datetime64(start, "D"), np.datetime64(end, "D")
+
+        parts = []
+        for stock_id in ids:
+            history = histories[stock_id]
+            lo = np.searchsorted(history["date"], lo_date, side="left")
+            hi = np.searchsorted(history["date"], hi_date, side="right")
+            parts.append((stock_id, {name: values[lo:hi] for name, values in history.items()}))
+        return {
+            "stock_id": np.concatenate([np.full(len(part["date"]), stock_id, dtype=np.int64) for stock_id, part in parts]),
+            **{name: np.concatenate([part[name] for _, part in parts]) for name in ("date",) + PRICE_FIELDS}
+        }
+
+    def _load(self, db: Session, stock_ids: List[int]) -> Dict[int, History]:
+        rows = db.connection().execute(
+            select(StockPrice.stock_id, StockPrice.date, *[getattr(StockPrice, f) for f in PRICE_FIELDS]).where(
+                StockPrice.stock_id.in_(stock_ids)
+            ).order_by(StockPrice.stock_id, StockPrice.date)
+        ).all()
+        by_stock: Dict[int, list] = defaultdict(list)
+        for row in rows:
+            by_stock[row[0]].append(row[1:])
+        archive = get_price_archive()
+        archived = archive.read(db, stock_ids) if archive is not None else {}
+        histories = {}
+        for stock_id in stock_ids:
+            dates, *values = zip(*by_stock[stock_id]) if by_stock[stock_id] else ([],) * 6
+            histories[stock_id] = _to_history(list(dates), dict(zip(PRICE_FIELDS, values)))
+            if stock_id in archived:
+                histories[stock_id] = merge_bars(archived[stock_id], histories[stock_id])
+        return histories
+
+    def _store(self, stock_id: int, history: History, loaded_at: float) -> None:
+        # Called with the lock held; shared arrays must not change under readers
+        for values in history.values():
+            values.flags.writeable = False
+        size = _history_bytes(history)
+        if stock_id in self._histories:
+            self._bytes -= self._histories.pop(stock_id)[1]
+        if size > self.max_bytes:
+            return
+        self._histories[stock_id] = (history, size, loaded_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._bytes -= self._histories.popitem(last=False)[1][1]
+
+    def apply_price_changes(self, changes) -> None:
+        """
+        Merge committed bar writes into cached histories
+        """
+        bars: Dict[int, Dict[date, dict]] = defaultdict(dict)
+        dropped = set()
+        for operation, snapshot in changes:
+            stock_id = snapshot.get("stock_id")
+            if stock_id is None:
+                # Unknown rows: nothing cached can be trusted
+                self.clear()
+                return
+            if operation == "delete" or "date" not in snapshot or any(f not in snapshot for f in PRICE_FIELDS):
+                dropped.add(stock_id)
+            else:
+                bars[stock_id][snapshot["date"]] = snapshot
+
+        with self._lock:
+            self._generation += 1
+            for stock_id in dropped:
+                if stock_id in self._histories:
+                    self._bytes -= self._histories.pop(stock_id)[1]
+            for stock_id, by_date in bars.items():
+                cached = self._histories.get(stock_id)
+                if cached is None or stock_id in dropped:
+                    continue
+                dates = sorted(by_date)
+                update = _to_history(dates, {
+                    name: [by_date[d][name] for d in dates] for name in PRICE_FIELDS
+                })
+                self._store(stock_id, merge_bars(cached[0], update), cached[2])
+
+    def invalidate(self, stock_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Drop cached histories for some stocks, or for all stocks
+        """
+        with self._lock:
+            self._generation += 1
+            if stock_ids is None:
+                self._histories.clear()
+                self._bytes = 0
+                return
+            for stock_id in stock_ids:
+                if stock_id in self._histories:
+                    self._bytes -= self._histories.pop(stock_id)[1]
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+# Create a singleton instance
+price_cache = PriceHistoryCache(
+    settings.PRICE_CACHE_MAX_MB * 1024 * 1024,
+    settings.PRICE_CACHE_TTL_SECONDS
+)
+
+register_listener(StockPrice, price_cache.apply_price_changes)
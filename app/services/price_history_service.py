@@ -0,0 +1,301 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
+from datetime import date, datetime, timedelta
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.models.stock import Stock, StockPrice, StockPriceCoverage
+from app.services.price_cache import PRICE_FIELDS, price_cache
+from app.services.price_store import get_price_store
+from app.services.price_archive import get_price_archive
+from app.utils.columnar import to_rows
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[date, datetime, str]
+
+# Called as listener(db, stock_id, bars) with the new or changed bars of an
+# upsert, in date order, before the upsert is committed
+BarListener = Callable[[Session, int, List[Dict[str, Any]]], None]
+
+_bar_listeners: List[BarListener] = []
+
+def register_bar_listener(callback: BarListener) -> None:
+    """
+    Call `callback` whenever upsert_bars writes new or changed bars
+    """
+    _bar_listeners.append(callback)
+
+def to_date(value: DateLike) -> date:
+    """Convert a date, datetime or ISO string to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+class PriceHistoryService:
+    """
+    Read-through store for historical prices. Requests are served from
+    `stock_prices`; only sub-ranges not yet covered are fetched from Yahoo
+    Finance and upserted.
+    """
+
+    def __init__(self, db: Session, yf_service=None):
+        self.db = db
+        self.yf_service = yf_service
+
+    @staticmethod
+    def resolve_range(
+        start_date: Optional[DateLike] = None,
+        end_date: Optional[DateLike] = None
+    ) -> Tuple[date, date]:
+        """
+        Resolve an inclusive date range, defaulting to the last year
+        """
+        try:
+            end = to_date(end_date) if end_date else datetime.now().date()
+            start = to_date(start_date) if start_date else end - timedelta(days=365)
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format")
+        if start > end:
+            raise ValueError("start_date must not be after end_date")
+        return start, end
+
+    def get_missing_ranges(self, stock_id: int, start: date, end: date) -> List[Tuple[date, date]]:
+        """
+        Return the inclusive sub-ranges of [start, end] not covered by earlier fetches
+        """
+        today = datetime.now().date()
+        end = min(end, today)
+        if start > end:
+            return []
+
+        coverage = self.db.query(
+            StockPriceCoverage.start_date,
+            StockPriceCoverage.end_date,
+            StockPriceCoverage.updated_at
+        ).filter(
+            StockPriceCoverage.stock_id == stock_id,
+            StockPriceCoverage.start_date <= end,
+            StockPriceCoverage.end_date >= start
+        ).order_by(StockPriceCoverage.start_date).all()
+
+        freshness = timedelta(seconds=settings.STOCK_FRESHNESS_SECONDS)
+        missing = []
+        cursor = start
+        for covered_start, covered_end, updated_at in coverage:
+            # Today's bar is still moving; only trust it within the freshness window
+            if covered_end >= today and (
+                updated_at is None or datetime.utcnow() - updated_at >= freshness
+            ):
+                covered_end = today - timedelta(days=1)
+            if covered_start > cursor:
+                missing.append((cursor, min(covered_start - timedelta(days=1), end)))
+            cursor = max(cursor, covered_end + timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            missing.append((cursor, end))
+        return missing
+
+    def fill_gaps(self, stock: Stock, start: date, end: date) -> int:
+        """
+        Fetch and upsert the missing sub-ranges of [start, end].
+        Returns the number of bars written.
+        """
+        written = 0
+        for gap_start, gap_end in self.get_missing_ranges(stock.id, start, end):
+            try:
+                bars = self.yf_service.fetch_historical_data(
+                    stock.symbol,
+                    start_date=gap_start.isoformat(),
+                    end_date=(gap_end + timedelta(days=1)).isoformat(),
+                    allow_empty=True
+                )
+            except ValueError as e:
+                # Serve what is stored; the gap is retried on the next request
+                logger.warning(f"Could not fill {stock.symbol} prices {gap_start}..{gap_end}: {str(e)}")
+                continue
+            written += self.upsert_bars(stock.id, bars, commit=False)
+            self.mark_covered(stock.id, gap_start, gap_end, commit=False)
+            self.db.commit()
+        return written
+
+    def upsert_bars(self, stock_id: int, bars: List[Dict[str, Any]], commit: bool = True) -> int:
+        """
+        Insert new bars and update changed ones with one lookup query and
+        bulk statements. Returns the number of rows inserted or updated.
+        """
+        if not bars:
+            return 0
+
+        incoming = {}
+        for bar in bars:
+            incoming[to_date(bar["date"])] = {field: bar.get(field) for field in PRICE_FIELDS}
+
+        existing = self.db.query(
+            StockPrice.id, StockPrice.date, *[getattr(StockPrice, f) for f in PRICE_FIELDS]
+        ).filter(
+            StockPrice.stock_id == stock_id,
+            StockPrice.date >= min(incoming),
+            StockPrice.date <= max(incoming)
+        ).all()
+        existing_by_date = {row.date: row for row in existing}
+
+        new_rows = []
+        changed_rows = []
+        written = []
+        for bar_date, values in sorted(incoming.items()):
+            row = existing_by_date.get(bar_date)
+            if row is None:
+                new_rows.append({"stock_id": stock_id, "date": bar_date, **values})
+            elif any(getattr(row, field) != value for field, value in values.items()):
+                # Key columns ride along so change listeners know which bar changed
+                changed_rows.append({"id": row.id, "stock_id": stock_id, "date": bar_date, **values})
+            else:
+                continue
+            written.append({"date": bar_date, **values})
+
+        if new_rows:
+            self.db.execute(insert(StockPrice), new_rows)
+        if changed_rows:
+            self.db.execute(update(StockPrice), changed_rows)
+        if written:
+            self._notify(stock_id, written)
+        if commit:
+            self.db.commit()
+        return len(written)
+
+    def _notify(self, stock_id: int, written: List[Dict[str, Any]]) -> None:
+        for listener in _bar_listeners:
+            try:
+                listener(self.db, stock_id, written)
+            except Exception as e:
+                # Derived data must not block price ingest
+                logger.error(f"Bar listener failed for stock {stock_id}: {str(e)}")
+
+    def mark_covered(self, stock_id: int, start: date, end: date, commit: bool = True) -> None:
+        """
+        Record [start, end] as fetched, merging overlapping or adjacent ranges
+        """
+        end = min(end, datetime.now().date())
+        if start > end:
+            return
+
+        overlapping = self.db.query(StockPriceCoverage).filter(
+            StockPriceCoverage.stock_id == stock_id,
+            StockPriceCoverage.start_date <= end + timedelta(days=1),
+            StockPriceCoverage.end_date >= start - timedelta(days=1)
+        ).all()
+
+        for coverage in overlapping:
+            start = min(start, coverage.start_date)
+            end = max(end, coverage.end_date)
+            self.db.delete(coverage)
+
+        self.db.add(StockPriceCoverage(
+            stock_id=stock_id,
+            start_date=start,
+            end_date=end,
+            updated_at=datetime.utcnow()
+        ))
+        if commit:
+            self.db.commit()
+
+    def get_prices(self, stock_id: int, start: date, end: date) -> List[StockPrice]:
+        """
+        Read stored bars for [start, end] with a single (stock_id, date) range
+        query. Archived bars in the range come first, as unsaved StockPrice objects.
+        With the columnar store configured every bar is read from its memory
+        map instead, as unsaved StockPrice objects.
+        """
+        store = get_price_store()
+        if store is not None:
+            columns = store.get_columns(self.db, [stock_id], start, end)
+            return [StockPrice(**row) for row in to_rows(columns)]
+
+        prices = self.db.query(StockPrice).filter(
+            StockPrice.stock_id == stock_id,
+            StockPrice.date >= start,
+            StockPrice.date <= end
+        ).order_by(StockPrice.date).all()
+        archive = get_price_archive()
+        if archive is None:
+            return prices
+
+        archived = archive.read(self.db, [stock_id], start, end)[stock_id]
+        hot_dates = {price.date for price in prices}
+        values = {name: archived[name].tolist() for name in PRICE_FIELDS}
+        cold = [
+            StockPrice(stock_id=stock_id, date=bar_date, **{name: values[name][i] for name in PRICE_FIELDS})
+            for i, bar_date in enumerate(archived["date"].tolist())
+            if bar_date not in hot_dates
+        ]
+        return cold + prices
+
+    def get_range_version(self, stock_id: int, start: date, end: date) -> Tuple[int, Optional[date], Optional[datetime]]:
+        """
+        Cheap validators for [start, end]: bar count, last bar date and the
+        last time bars in the range were written
+        """
+        bar_count, last_bar, last_created = self.db.query(
+            func.count(StockPrice.id), func.max(StockPrice.date), func.max(StockPrice.created_at)
+        ).filter(
+            StockPrice.stock_id == stock_id,
+            StockPrice.date >= start,
+            StockPrice.date <= end
+        ).one()
+        # Upserts of existing bars only show up as a coverage write
+        last_covered = self.db.query(func.max(StockPriceCoverage.updated_at)).filter(
+            StockPriceCoverage.stock_id == stock_id,
+            StockPriceCoverage.start_date <= end,
+            StockPriceCoverage.end_date >= start
+        ).scalar()
+        last_written = max((t for t in (last_created, last_covered) if t is not None), default=None)
+        return bar_count, last_bar, last_written
+
+    def get_price_columns(self, stock_ids: List[int], start: date, end: date) -> Dict[str, np.ndarray]:
+        """
+        Stored bars for several stocks as column arrays, ordered by
+        (stock_id, date), from the columnar store when it is configured and
+        otherwise sliced from the in-process history cache
+        """
+        store = get_price_store()
+        if store is not None:
+            return store.get_columns(self.db, stock_ids, start, end)
+        return price_cache.get_columns(self.db, stock_ids, start, end)
+
+    def get_close_matrix(self, stock_ids: List[int], start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stored closes for [start, end] as (dates, dates x stocks matrix),
+        aligned on the union of the stocks' trading dates, with columns in
+        `stock_ids` order and NaN where a stock has no close
+        """
+        columns = self.get_price_columns(stock_ids, start, end)
+        has_close = ~np.isnan(columns["close"])
+        if not has_close.any():
+            return np.array([], dtype="datetime64[D]"), np.empty((0, len(stock_ids)))
+
+        ids = columns["stock_id"][has_close]
+        calendar, row = np.unique(columns["date"][has_close], return_inverse=True)
+        order = np.argsort(stock_ids)
+        column = order[np.searchsorted(np.asarray(stock_ids)[order], ids)]
+
+        matrix = np.full((len(calendar), len(stock_ids)), np.nan)
+        matrix[row, column] = columns["close"][has_close]
+        return calendar, matrix
+
+    def get_return_matrix(self, stock_ids: List[int], start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Daily returns from get_close_matrix as (dates, dates x stocks matrix),
+        NaN where either close is missing
+        """
+        calendar, matrix = self.get_close_matrix(stock_ids, start, end)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = matrix[1:] / matrix[:-1] - 1
+        returns[~np.isfinite(returns)] = np.nan
+        return calendar[1:], returns
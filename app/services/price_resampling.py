@@ -0,0 +1,89 @@
+from typing import Dict
+
+import numpy as np
+
+INTERVALS = ("1d", "1w", "1mo")
+
+def _period_starts(dates: np.ndarray, interval: str) -> np.ndarray:
+    if interval == "1mo":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    # Weeks start on Monday; 1970-01-01 was a Thursday
+    days = dates.astype(np.int64)
+    return (days - (days + 3) % 7).astype("datetime64[D]")
+
+def resample_ohlcv(columns: Dict[str, np.ndarray], interval: str) -> Dict[str, np.ndarray]:
+    """
+    Aggregate date-ordered daily bars of one stock into weekly or monthly
+    OHLCV bars labelled with the period start
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Invalid interval. Must be one of: {', '.join(INTERVALS)}")
+    if interval == "1d" or len(columns["date"]) == 0:
+        return columns
+
+    periods = _period_starts(columns["date"], interval)
+    starts = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+    ends = np.append(starts[1:], len(periods)) - 1
+    return {
+        "stock_id": columns["stock_id"][starts],
+        "date": periods[starts],
+        "open": columns["open"][starts],
+        "high": np.fmax.reduceat(columns["high"], starts),
+        "low": np.fmin.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts)
+    }
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` indices of (x, y) that
+    preserve the visual shape of the series. First and last points are kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Mean of each next bucket, computed once from prefix sums
+    x_sum = np.concatenate(([0.0], np.cumsum(x)))
+    y_sum = np.concatenate(([0.0], np.cumsum(y)))
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    counts = next_hi - next_lo
+    next_x = (x_sum[next_hi] - x_sum[next_lo]) / counts
+    next_y = (y_sum[next_hi] - y_sum[next_lo]) / counts
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        # Twice the triangle area between the previous pick, each candidate
+        # and the next bucket's mean, for the whole bucket at once
+        area = np.abs(
+            (x[previous] - next_x[bucket]) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y[bucket] - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample(columns: Dict[str, np.ndarray], max_points: int) -> Dict[str, np.ndarray]:
+    """
+    Reduce one stock's bars to at most `max_points` with LTTB on the close
+    """
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    if len(columns["date"]) <= max_points:
+        return columns
+
+    close = columns["close"]
+    # Carry the last close over gaps so missing values do not drive selection
+    valid = ~np.isnan(close)
+    filled = close[np.maximum.accumulate(np.where(valid, np.arange(len(close)), 0))]
+    filled = np.nan_to_num(filled)
+    indices = lttb_indices(columns["date"].astype(np.int64).astype(np.float64), filled, max_points)
+    return {name: values[indices] for name, values in columns.items()}
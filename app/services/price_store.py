@@ -0,0 +1,362 @@
+from datetime import date
+from typing import Dict, Iterable, Optional
+import logging
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.stock import StockPrice
+from app.services.change_events import has_pending_changes, register_listener
+from app.services.price_archive import get_price_archive
+from app.services.price_cache import PRICE_FIELDS, History, merge_bars
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OHLCV001"
+HEADER_BYTES = 64
+# Fixed-width columns in file order; dates are days since 1970-01-01
+COLUMNS = (
+    ("date", np.dtype(np.int32)),
+    ("open", np.dtype(np.float64)),
+    ("high", np.dtype(np.float64)),
+    ("low", np.dtype(np.float64)),
+    ("close", np.dtype(np.float64)),
+    ("volume", np.dtype(np.int64))
+)
+# Room left for appends when a file is (re)written: about a year of bars,
+# rounded so every column stays 8-byte aligned
+GROWTH_BARS = 252
+CAPACITY_STEP = 256
+
+def _capacity(count: int) -> int:
+    return -(-(count + GROWTH_BARS) // CAPACITY_STEP) * CAPACITY_STEP
+
+def _offsets(capacity: int) -> Dict[str, int]:
+    offsets = {}
+    offset = HEADER_BYTES
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset += capacity * dtype.itemsize
+    return offsets
+
+def _days(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+class ColumnarPriceStore:
+    """
+    On-disk price history with one file per stock. Each file is a 64-byte
+    header (magic, bar count, capacity) followed by fixed-width column
+    blocks of `capacity` values each, so a date range of any column is a
+    contiguous slice of a memory map: reads copy only the requested bars and
+    cost the same whatever the size of RAM.
+
+    New trailing bars are written into the spare capacity and published by
+    updating the bar count last; anything else rewrites the file and swaps
+    it in with an atomic rename, so readers never see a partial write.
+    Files are built from stock_prices on first read and kept in step with
+    committed bar writes.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        # Thread lock per stock, so writes to different stocks run in parallel
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # One lock file descriptor per process: closing any descriptor of a
+        # file drops all of the process's fcntl locks on it (POSIX)
+        self._lock_file = None
+        self._lock_file_pid = None
+
+    def _stock_lock(self, stock_id: int) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(stock_id, threading.Lock())
+
+    def _shared_lock_file(self):
+        with self._locks_lock:
+            if self._lock_file is None or self._lock_file_pid != os.getpid():
+                os.makedirs(self.root, exist_ok=True)
+                self._lock_file = open(os.path.join(self.root, ".lock"), "a+b")
+                self._lock_file_pid = os.getpid()
+            return self._lock_file
+
+    def _path(self, stock_id: int) -> str:
+        return os.path.join(self.root, f"{stock_id}.ohlcv")
+
+    def _map(self, stock_id: int):
+        """Memory map of a stock's file with its bar count and capacity, or None"""
+        try:
+            mapped = np.memmap(self._path(stock_id), dtype=np.uint8, mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        if bytes(mapped[:len(MAGIC)]) != MAGIC:
+            logger.error(f"Ignoring price store file with a bad header for stock {stock_id}")
+            return None
+        count, capacity = np.frombuffer(mapped, dtype=np.uint64, count=2, offset=8).tolist()
+        return mapped, count, capacity
+
+    def read(self, stock_id: int) -> Optional[History]:
+        """
+        Zero-copy views of a stock's stored columns, or None without a file
+        """
+        mapping = self._map(stock_id)
+        if mapping is None:
+            return None
+        mapped, count, capacity = mapping
+        offsets = _offsets(capacity)
+        return {
+            name: np.frombuffer(mapped, dtype=dtype, count=count, offset=offsets[name])
+            for name, dtype in COLUMNS
+        }
+
+    def get_columns(self, db: Session, stock_ids: Iterable[int], start: date, end: date) -> Dict[str, np.ndarray]:
+        """
+        Bars in [start, end] for several stocks as column arrays ordered by
+        (stock_id, date), the layout of PriceHistoryService.get_price_columns
+        """
+        lo_day, hi_day = _days(start), _days(end)
+        parts = []
+        for stock_id in sorted(set(stock_ids)):
+            history = self.read(stock_id)
+            if history is None:
+                history = self._build(db, stock_id)
+            lo = np.searchsorted(history["date"], lo_day, side="left")
+            hi = np.searchsorted(history["date"], hi_day, side="right")
+            parts.append((stock_id, {name: values[lo:hi] for name, values in history.items()}))
+
+        columns = {
+            name: np.concatenate([np.array([], dtype=dtype)] + [part[name] for _, part in parts])
+            for name, dtype in COLUMNS
+        }
+        columns["date"] = columns["date"].astype("datetime64[D]")
+        columns["stock_id"] = np.concatenate([np.array([], dtype=np.int64)] + [
+            np.full(len(part["date"]), stock_id, dtype=np.int64) for stock_id, part in parts
+        ])
+        return columns
+
+    def _load(self, db: Session, stock_id: int) -> History:
+        rows = db.connection().execute(
+            select(StockPrice.date, *[getattr(StockPrice, f) for f in PRICE_FIELDS]).where(
+                StockPrice.stock_id == stock_id
+            ).order_by(StockPrice.date)
+        ).all()
+        dates, opens, highs, lows, closes, volumes = zip(*rows) if rows else ([],) * 6
+        history = {
+            "date": np.array(dates, dtype="datetime64[D]"),
+            "open": np.array(opens, dtype=np.float64),
+            "high": np.array(highs, dtype=np.float64),
+            "low": np.array(lows, dtype=np.float64),
+            "close": np.array(closes, dtype=np.float64),
+            "volume": np.array([v or 0 for v in volumes], dtype=np.int64)
+        }
+        archive = get_price_archive()
+        if archive is not None:
+            history = merge_bars(archive.read(db, [stock_id])[stock_id], history)
+        history["date"] = history["date"].astype(np.int32)
+        return history
+
+    def _build(self, db: Session, stock_id: int) -> History:
+        """
+        Write a stock's file from stock_prices and return its columns
+        """
+        # Uncommitted bars of this session must not reach the file
+        if has_pending_changes(db, StockPrice):
+            return self._load(db, stock_id)
+        with self._locked(stock_id):
+            history = self._load(db, stock_id)
+            self._write(stock_id, history)
+        return history
+
+    def rebuild(self, db: Session, stock_id: int) -> None:
+        self._build(db, stock_id)
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Rebuild files whose bar count or last date disagree with
+        stock_prices, e.g. after writes this process did not see. Returns
+        the number of stocks rebuilt.
+        """
+        # Archived bars are only in the files, so compare from each stock's
+        # first bar in stock_prices on
+        expected = {
+            stock_id: (count, _days(first), _days(last))
+            for stock_id, count, first, last in db.query(
+                StockPrice.stock_id, func.count(StockPrice.id), func.min(StockPrice.date), func.max(StockPrice.date)
+            ).group_by(StockPrice.stock_id).all()
+        }
+        stale = []
+        for stock_id, (count, first, last) in expected.items():
+            history = self.read(stock_id)
+            dates = history["date"] if history is not None else np.array([], dtype=np.int32)
+            stored_count = len(dates) - int(np.searchsorted(dates, first))
+            if stored_count != count or not len(dates) or int(dates[-1]) != last:
+                stale.append(stock_id)
+        for stock_id in stale:
+            self.rebuild(db, stock_id)
+        return len(stale)
+
+    def write_bars(self, stock_id: int, bars: History) -> None:
+        """
+        Merge date-ordered bars into an existing file; stocks without a file
+        are built from stock_prices on their next read instead
+        """
+        with self._locked(stock_id):
+            mapping = self._map(stock_id)
+            if mapping is None or len(bars["date"]) == 0:
+                return
+            current = self.read(stock_id)
+            path = self._path(stock_id)
+            count, capacity = mapping[1:]
+            appending = count == 0 or bars["date"][0] > current["date"][-1]
+            if not appending or count + len(bars["date"]) > capacity:
+                self._write(stock_id, merge_bars(current, bars))
+                return
+
+            # Fill the spare capacity, then publish the new count
+            offsets = _offsets(capacity)
+            with open(path, "r+b") as f:
+                for name, dtype in COLUMNS:
+                    f.seek(offsets[name] + count * dtype.itemsize)
+                    f.write(np.ascontiguousarray(bars[name], dtype=dtype).tobytes())
+                f.flush()
+                f.seek(8)
+                f.write(np.uint64(count + len(bars["date"])).tobytes())
+
+    def _write(self, stock_id: int, history: History) -> None:
+        # Called with the stock locked
+        os.makedirs(self.root, exist_ok=True)
+        count = len(history["date"])
+        capacity = _capacity(count)
+        path = self._path(stock_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC + np.array([count, capacity], dtype=np.uint64).tobytes())
+            f.write(b"\0" * (HEADER_BYTES - f.tell()))
+            for name, dtype in COLUMNS:
+                f.write(np.ascontiguousarray(history[name], dtype=dtype).tobytes())
+                f.write(b"\0" * ((capacity - count) * dtype.itemsize))
+        os.replace(temp_path, path)
+
+    def remove(self, stock_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Delete files so they are rebuilt on their next read; all files without `stock_ids`
+        """
+        if stock_ids is None:
+            if not os.path.isdir(self.root):
+                return
+            stock_ids = [
+                int(name[:-len(".ohlcv")]) for name in os.listdir(self.root)
+                if name.endswith(".ohlcv") and name[:-len(".ohlcv")].isdigit()
+            ]
+        for stock_id in stock_ids:
+            with self._locked(stock_id):
+                try:
+                    os.remove(self._path(stock_id))
+                except FileNotFoundError:
+                    pass
+
+    def apply_price_changes(self, changes) -> None:
+        """
+        Write committed bar changes through to the stocks' files
+        """
+        bars: Dict[int, Dict[date, dict]] = {}
+        dropped = set()
+        for operation, snapshot in changes:
+            stock_id = snapshot.get("stock_id")
+            if stock_id is None:
+                # Unknown rows: rebuild everything lazily
+                self.remove()
+                return
+            if operation == "delete" or "date" not in snapshot or any(f not in snapshot for f in PRICE_FIELDS):
+                dropped.add(stock_id)
+            else:
+                bars.setdefault(stock_id, {})[snapshot["date"]] = snapshot
+
+        self.remove(dropped)
+        for stock_id, by_date in bars.items():
+            if stock_id in dropped:
+                continue
+            dates = sorted(by_date)
+            update = {"date": np.array(dates, dtype="datetime64[D]").astype(np.int32)}
+            for name, dtype in COLUMNS[1:]:
+                values = [by_date[d][name] for d in dates]
+                if name == "volume":
+                    values = [v or 0 for v in values]
+                update[name] = np.array(values, dtype=dtype)
+            self.write_bars(stock_id, update)
+
+    def _locked(self, stock_id: int) -> "_StockLock":
+        return _StockLock(self, stock_id)
+
+def _lock_byte(file, offset: int):
+    """Block until this process holds the byte at `offset` of `file`"""
+    if fcntl is not None:
+        fcntl.lockf(file, fcntl.LOCK_EX, 1, offset)
+        return
+    file.seek(offset)
+    while True:
+        try:
+            # LK_LOCK gives up after ten one-second retries
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+def _unlock_byte(file, offset: int):
+    if fcntl is not None:
+        fcntl.lockf(file, fcntl.LOCK_UN, 1, offset)
+        return
+    file.seek(offset)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+class _StockLock:
+    """
+    Exclusive write access to one stock's file: a per-stock thread lock
+    within the process and a byte-range lock on a shared lock file across
+    processes
+    """
+
+    def __init__(self, store: ColumnarPriceStore, stock_id: int):
+        self.store = store
+        self.stock_id = stock_id
+        self.thread_lock = store._stock_lock(stock_id)
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.file = self.store._shared_lock_file()
+            _lock_byte(self.file, self.stock_id)
+        except Exception:
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            _unlock_byte(self.file, self.stock_id)
+        finally:
+            self.thread_lock.release()
+
+# Create a singleton instance when the columnar backend is configured
+price_store: Optional[ColumnarPriceStore] = (
+    ColumnarPriceStore(settings.PRICE_STORE_PATH) if settings.PRICE_STORE_BACKEND == "mmap" else None
+)
+
+def get_price_store() -> Optional[ColumnarPriceStore]:
+    return price_store
+
+def _apply_price_changes(changes) -> None:
+    if price_store is not None:
+        price_store.apply_price_changes(changes)
+
+register_listener(StockPrice, _apply_price_changes)
@@ -0,0 +1,128 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.price_history_service import PriceHistoryService
+
+ROLLING_METRICS = ("volatility", "sharpe", "beta", "correlation")
+BENCHMARK_METRICS = ("beta", "correlation")
+TRADING_DAYS = 252
+
+def _column_means(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Mean of the valid entries of each column; 0 for empty columns"""
+    counts = valid.sum(axis=0)
+    return np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+
+def window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sums over every trailing window of rows from one cumulative sum: row k
+    of the result covers rows k .. k + window - 1 of `values`
+    """
+    cumulative = np.cumsum(values, axis=0)
+    sums = cumulative[window - 1:].copy()
+    sums[1:] -= cumulative[:-window]
+    return sums
+
+def rolling_metrics(
+    returns: np.ndarray,
+    window: int,
+    metrics: List[str],
+    benchmark: Optional[np.ndarray] = None,
+    risk_free_rate: float = 0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Rolling annualized volatility (percent), Sharpe ratio, and beta and
+    correlation against a benchmark return series, for every column of a
+    dates x stocks return matrix. Row k of each result is the window ending
+    at row k + window - 1. As with pandas' rolling(window), a window with any
+    missing return is NaN.
+
+    Every statistic comes from differences of cumulative sums, so the cost
+    is a few passes over the matrix whatever the window length.
+    """
+    valid = ~np.isnan(returns)
+    # Moments below are shift-invariant; centring keeps the sums from cancelling
+    centre = _column_means(returns, valid)
+    x = np.where(valid, returns - centre, 0.0)
+    full = window_sums(valid.astype(np.int32), window) == window
+
+    results = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sum_x = window_sums(x, window)
+        var_x = (window_sums(x * x, window) - sum_x ** 2 / window) / (window - 1)
+        std_x = np.sqrt(np.maximum(var_x, 0))
+        if "volatility" in metrics:
+            results["volatility"] = np.where(full, std_x * math.sqrt(TRADING_DAYS) * 100, np.nan)
+        if "sharpe" in metrics:
+            mean = sum_x / window + centre
+            sharpe = (mean * TRADING_DAYS - risk_free_rate) / (std_x * math.sqrt(TRADING_DAYS))
+            results["sharpe"] = np.where(full & (var_x > 0), sharpe, np.nan)
+
+        if benchmark is not None and any(m in metrics for m in BENCHMARK_METRICS):
+            benchmark_valid = ~np.isnan(benchmark)
+            b = np.where(benchmark_valid, benchmark - _column_means(benchmark, benchmark_valid), 0.0)
+            joint = full & (window_sums(benchmark_valid.astype(np.int32), window) == window)[:, None]
+            sum_b = window_sums(b, window)
+            var_b = (window_sums(b * b, window) - sum_b ** 2 / window) / (window - 1)
+            cov = (window_sums(x * b[:, None], window) - sum_x * sum_b[:, None] / window) / (window - 1)
+            if "beta" in metrics:
+                results["beta"] = np.where(joint & (var_b > 0)[:, None], cov / var_b[:, None], np.nan)
+            if "correlation" in metrics:
+                correlation = np.clip(cov / (std_x * np.sqrt(np.maximum(var_b, 0))[:, None]), -1, 1)
+                results["correlation"] = np.where(joint & (var_x > 0), correlation, np.nan)
+    return results
+
+class RollingService:
+    """
+    Full rolling-window series for many stocks, computed from one aligned
+    return matrix a block of stocks at a time
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def compute(
+        self,
+        stock_ids: List[int],
+        window: int,
+        metrics: List[str],
+        days: int,
+        benchmark_id: Optional[int] = None,
+        risk_free_rate: float = 0.0,
+        end: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Rolling series keyed by metric, each a stocks x dates float32 array
+        with rows in `stock_ids` order
+        """
+        if benchmark_id is None and any(m in metrics for m in BENCHMARK_METRICS):
+            raise ValueError("A benchmark is required for rolling beta and correlation")
+
+        end = end or datetime.now().date()
+        ids = list(stock_ids)
+        if benchmark_id is not None and benchmark_id not in ids:
+            ids.append(benchmark_id)
+        dates, returns = PriceHistoryService(self.db).get_return_matrix(
+            ids, end - timedelta(days=days), end
+        )
+        benchmark = returns[:, ids.index(benchmark_id)] if benchmark_id is not None else None
+        returns = returns[:, :len(stock_ids)]
+        if len(dates) < window:
+            raise ValueError(f"Only {len(dates)} daily returns in the range; the window is {window}")
+
+        block_size = settings.ROLLING_BLOCK_SIZE
+        series = {
+            metric: np.empty((len(stock_ids), len(dates) - window + 1), dtype=np.float32)
+            for metric in metrics
+        }
+        for i in range(0, len(stock_ids), block_size):
+            block = rolling_metrics(
+                returns[:, i:i + block_size], window, metrics, benchmark, risk_free_rate
+            )
+            for metric, values in block.items():
+                series[metric][i:i + block_size] = values.T
+        return {"dates": [d.item() for d in dates[window - 1:]], **series}
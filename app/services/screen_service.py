@@ -1,17 +1,45 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, and_, or_, text, select
 from typing import List, Dict, Any
 from app.models.screen import Screen, ScreenCriteria
-from app.models.stock import Stock
+from app.models.stock import Stock, StockPriceDerived, StockFactorScore
+from app.services.derived_series_service import DERIVED_FIELDS
+from app.services.factor_service import parse_score_field
+
+RESULT_FIELDS = (
+    "id", "symbol", "company_name", "sector", "industry", "market_cap",
+    "pe_ratio", "price", "price_to_book", "dividend_yield", "eps", "beta",
+    "fifty_two_week_high", "fifty_two_week_low", "avg_volume"
+)
 
 class ScreenService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _derived_field(self, name: str) -> Any:
+        """A derived series value as of each stock's latest bar"""
+        return select(getattr(StockPriceDerived, name)).where(
+            StockPriceDerived.stock_id == Stock.id
+        ).order_by(StockPriceDerived.date.desc()).limit(1).scalar_subquery()
+
+    def _score_field(self, field: str, column: str) -> Any:
+        """A stored factor score of each stock, e.g. its sector P/E percentile"""
+        return select(getattr(StockFactorScore, column)).where(
+            StockFactorScore.stock_id == Stock.id,
+            StockFactorScore.field == field
+        ).scalar_subquery()
+
     def _build_criteria_condition(self, criterion: ScreenCriteria) -> Any:
         """Build SQL condition for a single criterion"""
-        field = getattr(Stock, criterion.field, None)
-        if not field:
+        score = parse_score_field(criterion.field)
+        if criterion.field in DERIVED_FIELDS:
+            field = self._derived_field(criterion.field)
+        elif score is not None:
+            field = self._score_field(*score)
+        else:
+            field = getattr(Stock, criterion.field, None)
+        if field is None:
             raise ValueError(f"Invalid field: {criterion.field}")
 
         if criterion.operator == ">":
@@ -31,55 +59,60 @@ class ScreenService:
         else:
             raise ValueError(f"Invalid operator: {criterion.operator}")
 
-    def run_screen(self, screen_id: int) -> Dict[str, Any]:
-        """Execute a screen and return matching stocks"""
-        # Get screen and its criteria
-        screen = self.db.query(Screen).filter(Screen.id == screen_id).first()
-        if not screen:
-            raise ValueError(f"Screen with ID {screen_id} not found")
-
+    def results_statement(self, criteria: List[ScreenCriteria]) -> Select:
+        """Select the result columns of the stocks matching every criterion"""
         # Build query conditions
         conditions = []
-        for criterion in screen.criteria:
+        for criterion in criteria:
             try:
                 condition = self._build_criteria_condition(criterion)
                 conditions.append(condition)
             except ValueError as e:
                 raise ValueError(f"Error in criterion {criterion.id}: {str(e)}")
 
-        # Apply all conditions
-        query = self.db.query(Stock)
+        # Apply all conditions; select only the result columns
+        statement = select(*[getattr(Stock, f) for f in RESULT_FIELDS])
         if conditions:
-            query = query.filter(and_(*conditions))
-
-        # Execute query
-        matching_stocks = query.all()
-
-        # Format results
-        results = []
-        for stock in matching_stocks:
-            stock_dict = {
-                "id": stock.id,
-                "symbol": stock.symbol,
-                "company_name": stock.company_name,
-                "sector": stock.sector,
-                "industry": stock.industry,
-                "market_cap": stock.market_cap,
-                "pe_ratio": stock.pe_ratio,
-                "price": stock.price,
-                "price_to_book": stock.price_to_book,
-                "dividend_yield": stock.dividend_yield,
-                "eps": stock.eps,
-                "beta": stock.beta,
-                "fifty_two_week_high": stock.fifty_two_week_high,
-                "fifty_two_week_low": stock.fifty_two_week_low,
-                "avg_volume": stock.avg_volume
-            }
-            results.append(stock_dict)
+            statement = statement.where(and_(*conditions))
+        return statement
+
+    @staticmethod
+    def format_result(screen: Screen, rows) -> Dict[str, Any]:
+        """Shape a screen's matching rows as a ScreenResult"""
+        results = [dict(zip(RESULT_FIELDS, row)) for row in rows]
 
         return {
             "screen_id": screen.id,
             "screen_name": screen.name,
             "results": results,
             "count": len(results)
-        } 
\ No newline at end of file
+        }
+
+    def run_screen(self, screen_id: int) -> Dict[str, Any]:
+        """Execute a screen and return matching stocks"""
+        # Get screen and its criteria
+        screen = self.db.query(Screen).filter(Screen.id == screen_id).first()
+        if not screen:
+            raise ValueError(f"Screen with ID {screen_id} not found")
+
+        # Execute query and format results
+        rows = self.db.execute(self.results_statement(screen.criteria)).all()
+        return self.format_result(screen, rows)
+
+class AsyncScreenService(ScreenService):
+    """ScreenService on an async session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run_screen(self, screen_id: int) -> Dict[str, Any]:
+        """Execute a screen and return matching stocks"""
+        # Criteria are loaded up front; async sessions cannot lazy load
+        screen = (await self.db.execute(
+            select(Screen).options(selectinload(Screen.criteria)).where(Screen.id == screen_id)
+        )).scalars().first()
+        if not screen:
+            raise ValueError(f"Screen with ID {screen_id} not found")
+
+        rows = (await self.db.execute(self.results_statement(screen.criteria))).all()
+        return self.format_result(screen, rows)
@@ -0,0 +1,282 @@
+from typing import Any, Dict, List, Optional, Set
+import heapq
+import logging
+import re
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.models.stock import Stock
+from app.services.change_events import register_listener
+
+logger = logging.getLogger(__name__)
+
+# Match tiers, best first
+EXACT_SYMBOL = 100
+SYMBOL_PREFIX = 80
+NAME_PREFIX = 65
+NAME_TOKEN_PREFIX = 60
+SYMBOL_SUBSTRING = 40
+NAME_SUBSTRING = 20
+
+_TOKEN_RE = re.compile(r"[^\w]+")
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[int] = set()
+
+class _Trie:
+    """Prefix trie storing at every node the ids of the keys below it"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, key: str, stock_id: int) -> None:
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids.add(stock_id)
+
+    def remove(self, key: str, stock_id: int) -> None:
+        node = self.root
+        path = []
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                return
+            path.append((node, char, child))
+            node = child
+        for parent, char, child in reversed(path):
+            child.ids.discard(stock_id)
+            if not child.ids:
+                del parent.children[char]
+
+    def prefix(self, prefix: str) -> Set[int]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+def _normalize_name(name: str) -> str:
+    return " ".join(_TOKEN_RE.sub(" ", (name or "").casefold()).split())
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class StockSearchIndex:
+    """
+    In-process typeahead index over stock symbols and company names:
+    prefix tries for symbols and name tokens plus a trigram index for
+    substrings. Kept current from committed Stock writes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._symbols = _Trie()
+        self._names = _Trie()
+        self._trigrams: Dict[str, Set[int]] = {}
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        Build the index from the database on first use
+        """
+        if not self._loaded:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Rebuild the whole index from the stocks table
+        """
+        rows = db.query(Stock.id, Stock.symbol, Stock.company_name, Stock.sector, Stock.market_cap).all()
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(row.id, row.symbol, row.company_name, row.sector, row.market_cap)
+            self._loaded = True
+        logger.info(f"Stock search index built with {len(rows)} entries")
+
+    def reset(self) -> None:
+        """
+        Drop all entries; the next ensure_loaded() rebuilds from the database
+        """
+        with self._lock:
+            self._clear()
+            self._loaded = False
+
+    def upsert(
+        self,
+        stock_id: int,
+        symbol: str,
+        company_name: str,
+        sector: Optional[str] = None,
+        market_cap: Optional[float] = None
+    ) -> None:
+        with self._lock:
+            self._remove(stock_id)
+            self._add(stock_id, symbol, company_name, sector, market_cap)
+
+    def remove(self, stock_id: int) -> None:
+        with self._lock:
+            self._remove(stock_id)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` stocks matching `query`, best match first.
+        Ties are broken by market cap, then symbol.
+        """
+        symbol_query = query.strip().upper()
+        name_query = _normalize_name(query)
+        if not symbol_query:
+            return []
+
+        with self._lock:
+            results: List[Dict[str, Any]] = []
+            seen: Set[int] = set()
+            # Tiers are strictly ordered, so stop once a tier fills the page
+            for value, ids in self._match_tiers(symbol_query, name_query):
+                tier = [i for i in ids if i not in seen]
+                seen.update(tier)
+                for stock_id in heapq.nsmallest(limit - len(results), tier, key=self._rank_key):
+                    entry = self._entries[stock_id]
+                    results.append({
+                        "id": stock_id,
+                        "symbol": entry["symbol"],
+                        "company_name": entry["company_name"],
+                        "sector": entry["sector"],
+                        "score": value
+                    })
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _match_tiers(self, symbol_query: str, name_query: str):
+        entries = self._entries
+        symbol_prefix = self._symbols.prefix(symbol_query)
+        yield EXACT_SYMBOL, [i for i in symbol_prefix if entries[i]["symbol"] == symbol_query]
+        yield SYMBOL_PREFIX, symbol_prefix
+        if name_query:
+            name_prefix = self._names.prefix(name_query)
+            yield NAME_PREFIX, [i for i in name_prefix if entries[i]["name_key"].startswith(name_query)]
+            yield NAME_TOKEN_PREFIX, name_prefix
+        # Substring tiers need a full trigram; shorter queries match prefixes only
+        if len(symbol_query) >= 3:
+            candidates = self._substring_candidates(symbol_query.casefold())
+            yield SYMBOL_SUBSTRING, [i for i in candidates if symbol_query in entries[i]["symbol"]]
+        if len(name_query) >= 3:
+            candidates = self._substring_candidates(name_query)
+            yield NAME_SUBSTRING, [i for i in candidates if name_query in entries[i]["name_key"]]
+
+    def _rank_key(self, stock_id: int):
+        entry = self._entries[stock_id]
+        return -(entry["market_cap"] or 0), entry["symbol"]
+
+    def find_symbol_ids(self, fragment: str) -> Set[int]:
+        """
+        Ids of stocks whose symbol contains `fragment` (case-insensitive)
+        """
+        fragment = fragment.strip().upper()
+        with self._lock:
+            if len(fragment) < 3:
+                return {i for i, e in self._entries.items() if fragment in e["symbol"]}
+            return {
+                i for i in self._substring_candidates(fragment.casefold())
+                if fragment in self._entries[i]["symbol"]
+            }
+
+    def apply_changes(self, changes) -> None:
+        """
+        Change listener: apply committed Stock writes to a loaded index
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            for operation, snapshot in changes:
+                if operation == "bulk":
+                    # Rows unknown; rebuild on next use
+                    self._clear()
+                    self._loaded = False
+                    return
+                stock_id = snapshot.get("id")
+                if stock_id is None:
+                    continue
+                if operation == "delete":
+                    self._remove(stock_id)
+                    continue
+                current = self._entries.get(stock_id, {})
+                self.upsert(
+                    stock_id,
+                    snapshot.get("symbol", current.get("symbol")),
+                    snapshot.get("company_name", current.get("company_name")),
+                    snapshot.get("sector", current.get("sector")),
+                    snapshot.get("market_cap", current.get("market_cap"))
+                )
+
+    def _substring_candidates(self, text: str) -> Set[int]:
+        grams = _trigrams(text)
+        candidates: Optional[Set[int]] = None
+        for gram in sorted(grams, key=lambda g: len(self._trigrams.get(g, ()))):
+            ids = self._trigrams.get(gram)
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                break
+        return candidates or set()
+
+    def _keys(self, entry: Dict[str, Any]) -> Set[str]:
+        return _trigrams(entry["symbol"].casefold()) | _trigrams(entry["name_key"])
+
+    def _add(self, stock_id, symbol, company_name, sector, market_cap) -> None:
+        if not symbol:
+            return
+        entry = {
+            "symbol": symbol.upper(),
+            "company_name": company_name or "",
+            "name_key": _normalize_name(company_name),
+            "sector": sector,
+            "market_cap": market_cap
+        }
+        self._entries[stock_id] = entry
+        self._symbols.add(entry["symbol"], stock_id)
+        for token in self._name_tokens(entry):
+            self._names.add(token, stock_id)
+        for gram in self._keys(entry):
+            self._trigrams.setdefault(gram, set()).add(stock_id)
+
+    def _remove(self, stock_id: int) -> None:
+        entry = self._entries.pop(stock_id, None)
+        if entry is None:
+            return
+        self._symbols.remove(entry["symbol"], stock_id)
+        for token in self._name_tokens(entry):
+            self._names.remove(token, stock_id)
+        for gram in self._keys(entry):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(stock_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    @staticmethod
+    def _name_tokens(entry: Dict[str, Any]) -> Set[str]:
+        # Each word suffix of the name, so "motor co" matches "Ford Motor Co."
+        words = entry["name_key"].split()
+        return {" ".join(words[i:]) for i in range(len(words))}
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._symbols = _Trie()
+        self._names = _Trie()
+        self._trigrams.clear()
+
+# Create a singleton instance
+search_index = StockSearchIndex()
+
+register_listener(Stock, search_index.apply_changes)
@@ -0,0 +1,259 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import threading
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.stock import Stock, StockPrice
+from app.services.change_events import register_listener
+
+logger = logging.getLogger(__name__)
+
+STOCK_FIELDS = ("sector", "industry", "pe_ratio", "market_cap", "dividend_yield")
+# The 1-month return compares the latest close with the last close at
+# least this many days earlier, found within the lookback window
+MONTH_DAYS = 30
+RETURN_LOOKBACK_DAYS = 45
+
+# ("sector", sector, None) or ("industry", sector, industry)
+GroupKey = Tuple[str, str, Optional[str]]
+
+def _mean(values: List[float]) -> Optional[float]:
+    return float(np.mean(values)) if values else None
+
+def compute_returns(dates: np.ndarray, closes: np.ndarray) -> Tuple[Optional[float], Optional[float]]:
+    """
+    (1-day, 1-month) return as of the last of one stock's date-ordered bars
+    """
+    if len(closes) < 2:
+        return None, None
+    return_1d = float(closes[-1] / closes[-2] - 1) if closes[-2] else None
+    before = np.searchsorted(dates, dates[-1] - np.timedelta64(MONTH_DAYS, "D"), side="right") - 1
+    return_1m = float(closes[-1] / closes[before] - 1) if before >= 0 and closes[before] else None
+    return return_1d, return_1m
+
+class SectorAggregateService:
+    """
+    In-memory sector and industry aggregates: median P/E, total market cap,
+    average dividend yield and average 1-day / 1-month return.
+
+    Committed Stock writes move a stock between groups or update its
+    fundamentals, and committed bar writes mark its returns stale. Only the
+    groups of changed stocks are recomputed, on the next read, so unchanged
+    reads are served from precomputed results.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stocks: Dict[int, Dict[str, Any]] = {}
+        self._members: Dict[GroupKey, Set[int]] = {}
+        self._aggregates: Dict[GroupKey, Dict[str, Any]] = {}
+        # Aggregates per level in (sector, industry) order, as served
+        self._by_level: Dict[str, List[Dict[str, Any]]] = {"sector": [], "industry": []}
+        self._dirty_groups: Set[GroupKey] = set()
+        self._stale_returns: Set[int] = set()
+
+    def ensure_current(self, db: Session) -> None:
+        """
+        Build the aggregates on first use, then bring changed groups up to
+        date. Returns are loaded without holding the lock, so concurrent
+        reads keep being served from the current aggregates meanwhile.
+        """
+        if not self._loaded:
+            self.rebuild(db)
+            return
+        with self._lock:
+            stale = list(self._stale_returns)
+            self._stale_returns.clear()
+            if not stale and not self._dirty_groups:
+                return
+        # Bars written meanwhile mark their stocks stale again
+        returns = self._load_returns(db, stale)
+        with self._lock:
+            self._set_returns(returns)
+            self._recompute_dirty()
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Rebuild all aggregates from the stocks and stock_prices tables
+        """
+        rows = db.connection().execute(
+            select(Stock.id, *[getattr(Stock, f) for f in STOCK_FIELDS])
+        ).all()
+        returns = self._load_returns(db, [row[0] for row in rows])
+        with self._lock:
+            self._stocks.clear()
+            self._members.clear()
+            self._aggregates.clear()
+            self._stale_returns.clear()
+            for row in rows:
+                self._add(row[0], dict(zip(STOCK_FIELDS, row[1:]), return_1d=None, return_1m=None))
+            self._set_returns(returns)
+            self._recompute_dirty()
+            self._loaded = True
+        logger.info(f"Sector aggregates built from {len(rows)} stocks")
+
+    def reset(self) -> None:
+        """
+        Drop all aggregates; the next ensure_current() rebuilds from the database
+        """
+        with self._lock:
+            self._stocks.clear()
+            self._members.clear()
+            self._aggregates.clear()
+            self._by_level = {"sector": [], "industry": []}
+            self._dirty_groups.clear()
+            self._stale_returns.clear()
+            self._loaded = False
+
+    def aggregates(self, level: str = "sector", sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregates of every sector, or of every industry, optionally within one sector
+        """
+        if level not in ("sector", "industry"):
+            raise ValueError("level must be 'sector' or 'industry'")
+        with self._lock:
+            aggregates = self._by_level[level]
+        if sector is None:
+            return aggregates
+        return [aggregate for aggregate in aggregates if aggregate["sector"] == sector]
+
+    def _load_returns(self, db: Session, stock_ids: List[int]) -> Dict[int, Tuple[Optional[float], Optional[float]]]:
+        if not stock_ids:
+            return {}
+        start = datetime.now().date() - timedelta(days=RETURN_LOOKBACK_DAYS)
+        rows = db.connection().execute(
+            select(StockPrice.stock_id, StockPrice.date, StockPrice.close).where(
+                StockPrice.stock_id.in_(stock_ids),
+                StockPrice.date >= start,
+                StockPrice.close.isnot(None)
+            ).order_by(StockPrice.stock_id, StockPrice.date)
+        ).all()
+        returns = {stock_id: (None, None) for stock_id in stock_ids}
+        if not rows:
+            return returns
+        ids, dates, closes = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        dates = np.array(dates, dtype="datetime64[D]")
+        closes = np.array(closes, dtype=np.float64)
+        columns, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        for stock_id, lo, count in zip(columns.tolist(), first.tolist(), counts.tolist()):
+            returns[stock_id] = compute_returns(dates[lo:lo + count], closes[lo:lo + count])
+        return returns
+
+    def _set_returns(self, returns: Dict[int, Tuple[Optional[float], Optional[float]]]) -> None:
+        for stock_id, (return_1d, return_1m) in returns.items():
+            values = self._stocks.get(stock_id)
+            if values is None:
+                continue
+            values["return_1d"] = return_1d
+            values["return_1m"] = return_1m
+            self._dirty_groups.update(self._groups(values))
+
+    def apply_stock_changes(self, changes) -> None:
+        """
+        Change listener: apply committed Stock writes to loaded aggregates
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            for operation, snapshot in changes:
+                stock_id = snapshot.get("id")
+                if stock_id is None:
+                    # Rows unknown; rebuild on next use
+                    self.reset()
+                    return
+                current = self._remove(stock_id)
+                if operation == "delete":
+                    continue
+                values = {
+                    name: snapshot.get(name, current[name] if current else None) for name in STOCK_FIELDS
+                }
+                values["return_1d"] = current["return_1d"] if current else None
+                values["return_1m"] = current["return_1m"] if current else None
+                self._add(stock_id, values)
+                if current is None:
+                    self._stale_returns.add(stock_id)
+
+    def apply_price_changes(self, changes) -> None:
+        """
+        Change listener: mark the returns of stocks with committed bar writes stale
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            for _, snapshot in changes:
+                stock_id = snapshot.get("stock_id")
+                if stock_id is None:
+                    self._stale_returns.update(self._stocks)
+                    return
+                self._stale_returns.add(stock_id)
+
+    @staticmethod
+    def _groups(values: Dict[str, Any]) -> Iterable[GroupKey]:
+        sector = values["sector"] or None
+        if sector is None:
+            return ()
+        industry = values["industry"] or None
+        if industry is None:
+            return (("sector", sector, None),)
+        return (("sector", sector, None), ("industry", sector, industry))
+
+    def _add(self, stock_id: int, values: Dict[str, Any]) -> None:
+        self._stocks[stock_id] = values
+        for key in self._groups(values):
+            self._members.setdefault(key, set()).add(stock_id)
+            self._dirty_groups.add(key)
+
+    def _remove(self, stock_id: int) -> Optional[Dict[str, Any]]:
+        values = self._stocks.pop(stock_id, None)
+        if values is not None:
+            for key in self._groups(values):
+                self._members[key].discard(stock_id)
+                self._dirty_groups.add(key)
+        return values
+
+    def _recompute_dirty(self) -> None:
+        if not self._dirty_groups:
+            return
+        for key in self._dirty_groups:
+            self._recompute(key)
+        self._dirty_groups.clear()
+        by_level = {"sector": [], "industry": []}
+        for key in sorted(self._aggregates, key=lambda key: (key[1], key[2] or "")):
+            by_level[key[0]].append(self._aggregates[key])
+        self._by_level = by_level
+
+    def _recompute(self, key: GroupKey) -> None:
+        members = self._members.get(key)
+        if not members:
+            self._members.pop(key, None)
+            self._aggregates.pop(key, None)
+            return
+        stocks = [self._stocks[stock_id] for stock_id in members]
+
+        def present(name: str) -> List[float]:
+            return [s[name] for s in stocks if s[name] is not None]
+
+        pe_ratios = present("pe_ratio")
+        level, sector, industry = key
+        self._aggregates[key] = {
+            "name": sector if level == "sector" else industry,
+            "sector": sector,
+            "count": len(stocks),
+            "median_pe_ratio": float(np.median(pe_ratios)) if pe_ratios else None,
+            "total_market_cap": float(sum(present("market_cap"))),
+            "avg_dividend_yield": _mean(present("dividend_yield")),
+            "avg_return_1d": _mean(present("return_1d")),
+            "avg_return_1m": _mean(present("return_1m"))
+        }
+
+# Create a singleton instance
+sector_aggregates = SectorAggregateService()
+
+register_listener(Stock, sector_aggregates.apply_stock_changes)
+register_listener(StockPrice, sector_aggregates.apply_price_changes)
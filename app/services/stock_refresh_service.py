@@ -0,0 +1,154 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.stock import Stock
+from app.services.yfinance_service import YFinanceService
+
+logger = logging.getLogger(__name__)
+
+class StockRefreshService:
+    """
+    Stale-while-revalidate refresh of stock rows from Yahoo Finance.
+
+    Readers are served from the database and stale rows are refreshed on a
+    small background pool. Concurrent refresh requests for the same symbol
+    share a single in-flight future.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        freshness_seconds: Optional[int] = None,
+        retry_seconds: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.freshness_seconds = (
+            settings.STOCK_FRESHNESS_SECONDS if freshness_seconds is None else freshness_seconds
+        )
+        self.retry_seconds = (
+            settings.STOCK_REFRESH_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        )
+        self.max_workers = max_workers or settings.STOCK_REFRESH_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._last_attempt: Dict[str, float] = {}
+
+    def is_fresh(self, last_updated: Optional[datetime]) -> bool:
+        """
+        Check whether a row updated at `last_updated` is inside the freshness window
+        """
+        if last_updated is None:
+            return False
+        if last_updated.tzinfo is not None:
+            last_updated = last_updated.replace(tzinfo=None) - last_updated.utcoffset()
+        age = datetime.utcnow() - last_updated
+        return age < timedelta(seconds=self.freshness_seconds)
+
+    def ensure_fresh(self, stock: Stock) -> bool:
+        """
+        Return True if the stock is fresh, otherwise schedule a background refresh
+        """
+        if self.is_fresh(stock.last_updated):
+            return True
+        self.schedule_refresh(stock.symbol)
+        return False
+
+    def schedule_refresh(self, symbol: str) -> Optional[Future]:
+        """
+        Schedule a background refresh, joining an in-flight one for the same symbol
+        """
+        with self._lock:
+            future = self._in_flight.get(symbol)
+            if future is not None:
+                return future
+
+            # Back off after a recent attempt so a failing upstream is not hammered
+            last_attempt = self._last_attempt.get(symbol)
+            if last_attempt is not None and time.monotonic() - last_attempt < self.retry_seconds:
+                return None
+
+            self._last_attempt[symbol] = time.monotonic()
+            future = self._get_executor().submit(self._refresh, symbol)
+            self._in_flight[symbol] = future
+
+        future.add_done_callback(lambda f: self._finish([symbol], f))
+        return future
+
+    def schedule_batch_refresh(self, symbols: List[str]) -> Optional[Future]:
+        """
+        Refresh many symbols with one batched provider call. Symbols already
+        being refreshed (or backing off) are skipped; the rest share one future.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pending = []
+            for symbol in dict.fromkeys(symbols):
+                if symbol in self._in_flight:
+                    continue
+                last_attempt = self._last_attempt.get(symbol)
+                if last_attempt is not None and now - last_attempt < self.retry_seconds:
+                    continue
+                pending.append(symbol)
+            if not pending:
+                return None
+
+            future = self._get_executor().submit(self._refresh_batch, pending)
+            for symbol in pending:
+                self._last_attempt[symbol] = now
+                self._in_flight[symbol] = future
+
+        future.add_done_callback(lambda f: self._finish(pending, f))
+        return future
+
+    def _refresh(self, symbol: str) -> None:
+        db = self.session_factory()
+        try:
+            YFinanceService(db).update_stock_data(symbol)
+            logger.info(f"Background refresh completed for {symbol}")
+        finally:
+            db.close()
+
+    def _refresh_batch(self, symbols: List[str]) -> None:
+        db = self.session_factory()
+        try:
+            YFinanceService(db).update_quotes(symbols)
+            logger.info(f"Background quote refresh completed for {len(symbols)} symbols")
+        finally:
+            db.close()
+
+    def _finish(self, symbols: List[str], future: Future) -> None:
+        with self._lock:
+            for symbol in symbols:
+                if self._in_flight.get(symbol) is future:
+                    del self._in_flight[symbol]
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            logger.error(f"Background refresh failed for {', '.join(symbols[:10])}: {str(error)}")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="stock-refresh"
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Stop the background refresh pool
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+# Create a singleton instance
+stock_refresh_service = StockRefreshService()
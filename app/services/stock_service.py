@@ -1,16 +1,49 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from sqlalchemy import or_
+from typing import List, Dict, Any, Optional, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-from app.models.stock import Stock, StockPrice
+from app.models.stock import Stock, StockPriceDerived
+from app.services.performance_service import PERIOD_DAYS, performance_metrics
+from app.services.price_history_service import PriceHistoryService
+
+PERFORMANCE_PERIODS = tuple(PERIOD_DAYS)
 
 class StockService:
     """
     Service for stock-related operations
     """
     
+    @staticmethod
+    def resolve_stocks(
+        db: Session,
+        stock_ids: Optional[str],
+        symbols: Optional[str],
+        limit: int
+    ) -> Tuple[List[Stock], List[str]]:
+        """
+        Load the stocks named by comma-separated IDs and/or symbols, ordered
+        by ID. Returns (stocks, IDs and symbols that were not found).
+        """
+        try:
+            ids = [int(i) for i in (stock_ids or "").split(",") if i.strip()]
+        except ValueError:
+            raise ValueError("stock_ids must be comma-separated integers")
+        names = [s.strip().upper() for s in (symbols or "").split(",") if s.strip()]
+        if not ids and not names:
+            raise ValueError("Provide stock_ids and/or symbols")
+        if len(ids) + len(names) > limit:
+            raise ValueError(f"At most {limit} stocks can be requested at once")
+        
+        stocks = db.query(Stock).filter(
+            or_(Stock.id.in_(ids), Stock.symbol.in_(names))
+        ).order_by(Stock.id).all()
+        found = {stock.id for stock in stocks} | {stock.symbol.upper() for stock in stocks}
+        missing = [str(i) for i in ids if i not in found] + [s for s in names if s not in found]
+        return stocks, missing
+    
     @staticmethod
     def calculate_technical_indicators(
         stock_id: int,
@@ -29,24 +62,13 @@ class StockService:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        prices = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock_id,
-            StockPrice.date >= start_date,
-            StockPrice.date <= end_date
-        ).order_by(StockPrice.date).all()
+        prices = PriceHistoryService(db).get_price_columns([stock_id], start_date, end_date)
         
-        if not prices:
+        if not len(prices["date"]):
             return {"error": f"No price data found for stock ID {stock_id}"}
         
         # Convert to pandas DataFrame
-        df = pd.DataFrame([{
-            "date": p.date,
-            "open": p.open,
-            "high": p.high,
-            "low": p.low,
-            "close": p.close,
-            "volume": p.volume
-        } for p in prices])
+        df = pd.DataFrame({name: prices[name] for name in ("date", "open", "high", "low", "close", "volume")})
         
         # Calculate indicators
         indicators = {}
@@ -109,70 +131,29 @@ class StockService:
         if not stock:
             return {"error": f"Stock with ID {stock_id} not found"}
         
-        # Determine date range based on period
+        # Determine date range based on period, defaulting to 1 year
         end_date = datetime.now().date()
-        
-        if period == "1m":
-            start_date = end_date - timedelta(days=30)
-        elif period == "3m":
-            start_date = end_date - timedelta(days=90)
-        elif period == "6m":
-            start_date = end_date - timedelta(days=180)
-        elif period == "1y":
-            start_date = end_date - timedelta(days=365)
-        elif period == "3y":
-            start_date = end_date - timedelta(days=3*365)
-        elif period == "5y":
-            start_date = end_date - timedelta(days=5*365)
-        else:
-            start_date = end_date - timedelta(days=365)  # Default to 1 year
+        start_date = end_date - timedelta(days=PERIOD_DAYS.get(period, 365))
         
         # Get historical prices
-        prices = db.query(StockPrice).filter(
-            StockPrice.stock_id == stock_id,
-            StockPrice.date >= start_date,
-            StockPrice.date <= end_date
-        ).order_by(StockPrice.date).all()
+        prices = PriceHistoryService(db).get_price_columns([stock_id], start_date, end_date)
         
-        if not prices:
+        metrics = performance_metrics(prices["date"], prices["close"])
+        if metrics is None:
             return {"error": f"No price data found for stock ID {stock_id}"}
         
-        # Calculate performance metrics
-        start_price = prices[0].close
-        end_price = prices[-1].close
-        
-        # Total return
-        total_return = (end_price - start_price) / start_price * 100
-        
-        # Annualized return
-        days = (prices[-1].date - prices[0].date).days
-        if days > 0:
-            annualized_return = ((1 + total_return/100) ** (365/days) - 1) * 100
-        else:
-            annualized_return = 0
-        
-        # Volatility (standard deviation of daily returns)
-        df = pd.DataFrame([{"date": p.date, "close": p.close} for p in prices])
-        df["daily_return"] = df["close"].pct_change()
-        volatility = df["daily_return"].std() * (252 ** 0.5) * 100  # Annualized
-        
-        # Maximum drawdown
-        df["cumulative_return"] = (1 + df["daily_return"]).cumprod()
-        df["cumulative_max"] = df["cumulative_return"].cummax()
-        df["drawdown"] = (df["cumulative_return"] / df["cumulative_max"] - 1) * 100
-        max_drawdown = df["drawdown"].min()
+        # 52-week range from our own bars as of the period end
+        derived = db.query(StockPriceDerived.high_52w, StockPriceDerived.low_52w).filter(
+            StockPriceDerived.stock_id == stock_id,
+            StockPriceDerived.date <= end_date
+        ).order_by(StockPriceDerived.date.desc()).first()
         
         return {
             "stock_id": stock_id,
             "symbol": stock.symbol,
             "company_name": stock.company_name,
             "period": period,
-            "start_date": prices[0].date,
-            "end_date": prices[-1].date,
-            "start_price": start_price,
-            "end_price": end_price,
-            "total_return": total_return,
-            "annualized_return": annualized_return,
-            "volatility": volatility,
-            "max_drawdown": max_drawdown
+            **metrics,
+            "high_52w": derived.high_52w if derived else None,
+            "low_52w": derived.low_52w if derived else None
         }
@@ -5,6 +5,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.models.stock import Stock, StockPrice
 from app.services.yfinance_service import YFinanceService
+from app.services.price_history_service import PriceHistoryService, to_date
 
 logger = logging.getLogger(__name__)
 
@@ -77,22 +78,15 @@ class StockSyncService:
                 end_date=end_date
             )
 
-            # Update database
-            for data in historical_data:
-                price = self.db.query(StockPrice).filter(
-                    StockPrice.stock_id == stock.id,
-                    StockPrice.date == data["date"]
-                ).first()
-
-                if not price:
-                    price = StockPrice(
-                        stock_id=stock.id,
-                        **data
-                    )
-                    self.db.add(price)
-                else:
-                    for key, value in data.items():
-                        setattr(price, key, value)
+            # Update database; end_date is exclusive for Yahoo Finance
+            price_history = PriceHistoryService(self.db)
+            price_history.upsert_bars(stock.id, historical_data, commit=False)
+            price_history.mark_covered(
+                stock.id,
+                to_date(start_date),
+                to_date(end_date) - timedelta(days=1),
+                commit=False
+            )
 
             self.db.commit()
             return historical_data
@@ -1,10 +1,13 @@
 import yfinance as yf
+import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import logging
 from sqlalchemy.orm import Session
-from app.models.stock import Stock, StockPrice
+from sqlalchemy.orm.attributes import flag_modified
+from app.models.stock import Stock
 from app.models.screen import Screen, ScreenCriteria
+from app.services.price_history_service import PriceHistoryService
 
 logger = logging.getLogger(__name__)
 
@@ -50,10 +53,13 @@ class YFinanceService:
         symbol: str,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        period: str = "1y"
+        period: str = "1y",
+        allow_empty: bool = False
     ) -> List[Dict[str, Any]]:
         """
-        Fetch historical price data from Yahoo Finance
+        Fetch historical price data from Yahoo Finance.
+        `end_date` is exclusive. With `allow_empty`, a range without trading
+        days (weekend, holiday) returns an empty list instead of raising.
         """
         try:
             if not start_date:
@@ -65,6 +71,8 @@ class YFinanceService:
             hist = stock.history(start=start_date, end=end_date)
             
             if hist.empty:
+                if allow_empty:
+                    return []
                 raise ValueError(f"No historical data found for {symbol}")
             
             return [
@@ -100,33 +108,26 @@ class YFinanceService:
                 self.db.commit()
                 self.db.refresh(stock)
             else:
-                # Update existing stock
+                # Update existing stock; stamp last_updated even when no
+                # field changed so freshness checks see the refresh
                 for key, value in stock_info.items():
                     setattr(stock, key, value)
+                stock.last_updated = datetime.utcnow()
                 self.db.commit()
                 self.db.refresh(stock)
             
-            # Fetch and update historical data
-            historical_data = self.fetch_historical_data(symbol)
+            # Fetch the last year including today's bar and upsert it in bulk
+            end_date = datetime.now().date()
+            start_date = end_date - timedelta(days=365)
+            historical_data = self.fetch_historical_data(
+                symbol,
+                start_date=start_date.isoformat(),
+                end_date=(end_date + timedelta(days=1)).isoformat()
+            )
             
-            for data in historical_data:
-                # Check if price data exists for this date
-                price = self.db.query(StockPrice).filter(
-                    StockPrice.stock_id == stock.id,
-                    StockPrice.date == data["date"]
-                ).first()
-                
-                if not price:
-                    # Create new price entry
-                    price = StockPrice(
-                        stock_id=stock.id,
-                        **data
-                    )
-                    self.db.add(price)
-                else:
-                    # Update existing price entry
-                    for key, value in data.items():
-                        setattr(price, key, value)
+            price_history = PriceHistoryService(self.db)
+            price_history.upsert_bars(stock.id, historical_data, commit=False)
+            price_history.mark_covered(stock.id, start_date, end_date, commit=False)
             
             self.db.commit()
             return stock
@@ -140,6 +141,69 @@ class YFinanceService:
             self.db.rollback()
             raise ValueError(f"Failed to update stock data for {symbol}: {str(e)}")
 
+    def update_quotes(self, symbols: List[str]) -> List[Stock]:
+        """
+        Refresh prices for many stocks with a single batched download of the
+        last few daily bars. Fundamentals have no batch endpoint on Yahoo
+        Finance and are left to update_stock_data and the periodic sync.
+        """
+        if not symbols:
+            return []
+        try:
+            end_date = datetime.now().date()
+            start_date = end_date - timedelta(days=5)
+            hist = yf.download(
+                tickers=symbols,
+                start=start_date.isoformat(),
+                end=(end_date + timedelta(days=1)).isoformat(),
+                group_by="ticker",
+                progress=False,
+                threads=True
+            )
+            
+            stocks = self.db.query(Stock).filter(Stock.symbol.in_(symbols)).all()
+            price_history = PriceHistoryService(self.db)
+            updated = []
+            for stock in stocks:
+                # Columns are grouped per ticker except for single-ticker downloads
+                if isinstance(hist.columns, pd.MultiIndex):
+                    if stock.symbol not in hist.columns.get_level_values(0):
+                        logger.warning(f"No recent bars returned for {stock.symbol}")
+                        continue
+                    frame = hist[stock.symbol]
+                else:
+                    frame = hist
+                frame = frame.dropna(subset=["Close"])
+                if frame.empty:
+                    logger.warning(f"No recent bars returned for {stock.symbol}")
+                    continue
+                
+                bars = [
+                    {
+                        "date": index.strftime("%Y-%m-%d"),
+                        "open": float(row["Open"]),
+                        "high": float(row["High"]),
+                        "low": float(row["Low"]),
+                        "close": float(row["Close"]),
+                        "volume": int(row["Volume"])
+                    }
+                    for index, row in frame.iterrows()
+                ]
+                price_history.upsert_bars(stock.id, bars, commit=False)
+                price_history.mark_covered(stock.id, start_date, end_date, commit=False)
+                stock.price = bars[-1]["close"]
+                # last_updated dates the fundamentals, which a quote does not
+                # refresh; writing it back keeps its onupdate from firing
+                flag_modified(stock, "last_updated")
+                updated.append(stock)
+            
+            self.db.commit()
+            return updated
+        except Exception as e:
+            logger.error(f"Error updating quotes for {len(symbols)} symbols: {str(e)}")
+            self.db.rollback()
+            raise ValueError(f"Failed to update quotes: {str(e)}")
+
     def execute_screen(self, screen: Screen) -> List[Stock]:
         """
         Execute a screen using Yahoo Finance data
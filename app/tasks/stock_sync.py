@@ -2,15 +2,44 @@ import asyncio
 from datetime import datetime, timedelta
 import logging
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal, engine
+from app.db.partitioning import drop_expired_partitions, ensure_partitions
 from app.services.stock_sync_service import StockSyncService
+from app.services.indicator_service import IndicatorService
+from app.services.derived_series_service import DerivedSeriesService
+from app.services.factor_service import FactorScoreService
+from app.services.price_store import get_price_store
+from app.services.price_archive import get_price_archive
+from app.services.price_cache import price_cache
+from app.services.analytics_cache import analytics_cache
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+def _with_session(work):
+    """
+    Run blocking database work on a session of its own; called through
+    run_in_threadpool so it stays off the event loop
+    """
+    db = SessionLocal()
+    try:
+        return work(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 class StockSyncTask:
     def __init__(self):
         self.db = SessionLocal()
         self.sync_service = StockSyncService(self.db)
+        self.indicators_refreshed_on = None
+        self.derived_checked_on = None
+        self.price_store_checked_on = None
+        self.archived_on = None
+        self.partitions_checked_on = None
         self.is_running = False
 
     async def sync_stocks(self):
@@ -24,6 +53,15 @@ class StockSyncTask:
         except Exception as e:
             logger.error(f"Error in stock sync task: {str(e)}")
 
+    async def refresh_factor_scores(self):
+        """
+        Re-rank the fundamentals after each stock sync
+        """
+        try:
+            await run_in_threadpool(_with_session, lambda db: FactorScoreService(db).refresh())
+        except Exception as e:
+            logger.error(f"Error in factor score task: {str(e)}")
+
     async def sync_historical_data(self):
         """
         Sync historical data for all stocks
@@ -43,6 +81,85 @@ class StockSyncTask:
         except Exception as e:
             logger.error(f"Error in historical data sync task: {str(e)}")
 
+    async def refresh_indicators(self):
+        """
+        Recompute technical indicators for the whole universe once a day
+        """
+        today = datetime.now().date()
+        if self.indicators_refreshed_on == today:
+            return
+        try:
+            logger.info("Starting indicator refresh task")
+            count = await run_in_threadpool(_with_session, lambda db: IndicatorService(db).refresh_all())
+            self.indicators_refreshed_on = today
+            logger.info(f"Indicator refresh completed for {count} stocks")
+        except Exception as e:
+            logger.error(f"Error in indicator refresh task: {str(e)}")
+
+    async def backfill_derived_series(self):
+        """
+        Rebuild derived price series that are out of step with stored bars, once a day
+        """
+        today = datetime.now().date()
+        if self.derived_checked_on == today:
+            return
+        try:
+            count = await run_in_threadpool(_with_session, lambda db: DerivedSeriesService(db).backfill())
+            self.derived_checked_on = today
+            logger.info(f"Derived series rebuilt for {count} stocks")
+        except Exception as e:
+            logger.error(f"Error in derived series backfill task: {str(e)}")
+
+    async def reconcile_price_store(self):
+        """
+        Bring the columnar price store in step with stock_prices, once a day
+        """
+        store = get_price_store()
+        today = datetime.now().date()
+        if store is None or self.price_store_checked_on == today:
+            return
+        try:
+            count = await run_in_threadpool(_with_session, store.reconcile)
+            self.price_store_checked_on = today
+            logger.info(f"Price store files rebuilt for {count} stocks")
+        except Exception as e:
+            logger.error(f"Error in price store reconcile task: {str(e)}")
+
+    async def compact_price_archive(self):
+        """
+        Move bars past the archive horizon out of stock_prices, once a day
+        """
+        archive = get_price_archive()
+        today = datetime.now().date()
+        if archive is None or self.archived_on == today:
+            return
+        try:
+            horizon = today - timedelta(days=settings.PRICE_ARCHIVE_AFTER_DAYS)
+            await run_in_threadpool(_with_session, lambda db: archive.compact(db, horizon))
+            self.archived_on = today
+        except Exception as e:
+            logger.error(f"Error in price archive task: {str(e)}")
+
+    async def maintain_price_partitions(self):
+        """
+        Create upcoming stock_prices partitions and drop expired ones, once a day
+        """
+        today = datetime.now().date()
+        if self.partitions_checked_on == today:
+            return
+        try:
+            await run_in_threadpool(ensure_partitions, engine, today)
+            if await run_in_threadpool(drop_expired_partitions, engine, today):
+                # Dropped partitions bypass the bar change events
+                price_cache.clear()
+                analytics_cache.clear()
+                store = get_price_store()
+                if store is not None:
+                    store.remove()
+            self.partitions_checked_on = today
+        except Exception as e:
+            logger.error(f"Error in price partition task: {str(e)}")
+
     async def run_sync_tasks(self):
         """
         Run sync tasks periodically
@@ -51,10 +168,18 @@ class StockSyncTask:
             try:
                 # Sync stock data every hour
                 await self.sync_stocks()
+                await self.refresh_factor_scores()
                 await asyncio.sleep(3600)  # 1 hour
                 
                 # Sync historical data every 4 hours
                 await self.sync_historical_data()
+                
+                # Nightly indicators, after the first history sync of the day
+                await self.refresh_indicators()
+                await self.backfill_derived_series()
+                await self.compact_price_archive()
+                await self.maintain_price_partitions()
+                await self.reconcile_price_store()
                 await asyncio.sleep(14400)  # 4 hours
             except Exception as e:
                 logger.error(f"Error in sync tasks: {str(e)}")
@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+FORMATS = {
+    "json": JSON_MEDIA_TYPE,
+    "columnar": COLUMNAR_JSON_MEDIA_TYPE,
+    "arrow": ARROW_MEDIA_TYPE
+}
+
+VALUE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+def _extra_columns(columns: Dict[str, np.ndarray]) -> List[str]:
+    # Float series merged in next to the bars, e.g. derived returns
+    return [name for name in columns if name not in ("stock_id", "date") + VALUE_COLUMNS]
+
+def negotiate_format(format_param: Optional[str], accept: Optional[str], default: str = "json") -> str:
+    """
+    Pick a response format from an explicit `format` parameter, falling
+    back to the Accept header and then `default`
+    """
+    if format_param:
+        format_param = format_param.lower()
+        if format_param not in FORMATS:
+            raise ValueError(f"Invalid format. Must be one of: {', '.join(FORMATS)}")
+        return format_param
+    by_media_type = {media_type: name for name, media_type in FORMATS.items()}
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in by_media_type:
+            return by_media_type[media_type]
+    return default
+
+def arrow_available() -> bool:
+    return pa is not None
+
+def _float_list(values: np.ndarray) -> List[Optional[float]]:
+    # NaN is not valid JSON; missing values go out as null
+    return [None if v != v else v for v in values.tolist()]
+
+def _series(columns: Dict[str, np.ndarray], stock_id: int, symbol: str, lo: int, hi: int) -> Dict[str, Any]:
+    series = {
+        "stock_id": stock_id,
+        "symbol": symbol,
+        "date": np.datetime_as_string(columns["date"][lo:hi], unit="D").tolist()
+    }
+    for name in VALUE_COLUMNS:
+        values = columns[name][lo:hi]
+        series[name] = values.tolist() if name == "volume" else _float_list(values)
+    for name in _extra_columns(columns):
+        series[name] = _float_list(columns[name][lo:hi])
+    return series
+
+def split_series(columns: Dict[str, np.ndarray], symbols: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Split (stock_id, date)-ordered columns into one array-per-field series
+    per stock, in the order of `symbols`
+    """
+    stock_ids = columns["stock_id"]
+    bounds = {}
+    if len(stock_ids):
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(stock_ids)) + 1))
+        ends = np.append(starts[1:], len(stock_ids))
+        bounds = {int(stock_ids[lo]): (lo, hi) for lo, hi in zip(starts, ends)}
+    return [
+        _series(columns, stock_id, symbol, *bounds.get(stock_id, (0, 0)))
+        for stock_id, symbol in symbols.items()
+    ]
+
+def to_rows(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Turn price columns back into one dict per bar
+    """
+    extra = _extra_columns(columns)
+    values = {name: _float_list(columns[name]) for name in ("open", "high", "low", "close", *extra)}
+    stock_ids = columns["stock_id"].tolist()
+    dates = columns["date"].tolist()
+    volumes = columns["volume"].tolist()
+    return [
+        {
+            "stock_id": stock_ids[i],
+            "date": dates[i],
+            "open": values["open"][i],
+            "high": values["high"][i],
+            "low": values["low"][i],
+            "close": values["close"][i],
+            "volume": volumes[i],
+            **{name: values[name][i] for name in extra}
+        }
+        for i in range(len(dates))
+    ]
+
+def columnar_json_response(payload: Dict[str, Any]) -> JSONResponse:
+    return JSONResponse(content=payload, media_type=COLUMNAR_JSON_MEDIA_TYPE)
+
+def arrow_response(columns: Dict[str, np.ndarray], symbols: Dict[int, str]) -> Response:
+    """
+    Serialize price columns as an Arrow IPC stream with one row per bar
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    stock_ids = columns["stock_id"]
+    keys = np.fromiter(symbols, dtype=np.int64, count=len(symbols))
+    order = np.argsort(keys)
+    symbol_codes = order[np.searchsorted(keys, stock_ids, sorter=order)].astype(np.int32)
+    table = pa.table({
+        "stock_id": pa.array(stock_ids, type=pa.int64()),
+        "symbol": pa.DictionaryArray.from_arrays(
+            pa.array(symbol_codes, type=pa.int32()),
+            pa.array(list(symbols.values()), type=pa.string())
+        ),
+        "date": pa.array(columns["date"], type=pa.date32()),
+        "open": pa.array(columns["open"], from_pandas=True),
+        "high": pa.array(columns["high"], from_pandas=True),
+        "low": pa.array(columns["low"], from_pandas=True),
+        "close": pa.array(columns["close"], from_pandas=True),
+        "volume": pa.array(columns["volume"], type=pa.int64()),
+        **{name: pa.array(columns[name], from_pandas=True) for name in _extra_columns(columns)}
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
@@ -0,0 +1,48 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any
+import json
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # Match Pydantic's rendering of UTC offsets
+        return text[:-6] + "Z" if value.utcoffset() == timezone.utc.utcoffset(None) else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        # NaN is not valid JSON; render missing values as null
+        if value.dtype.kind == "f":
+            return np.where(np.isnan(value), None, value).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode plain rows/dicts (and NumPy arrays, NaN as null) to JSON bytes
+    with orjson when available
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for pre-shaped plain data. Bypasses response_model
+    validation, so callers must build the documented schema themselves.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
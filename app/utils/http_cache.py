@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+import hashlib
+
+from fastapi import Request, Response, status
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from the values that version a representation
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive timestamps in this database are UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    """
+    Most recent of several optional timestamps
+    """
+    present = [_as_utc(v) for v in values if v is not None]
+    return max(present) if present else None
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Evaluate If-None-Match (preferred) or If-Modified-Since against the
+    current validators
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: ignore the W/ prefix on either side
+        current = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """
+    Attach ETag and Last-Modified headers to a response
+    """
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers.setdefault("Cache-Control", "no-cache")
+    return response
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """
+    Empty 304 response carrying the current validators
+    """
+    return set_validators(Response(status_code=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
@@ -0,0 +1,137 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+import base64
+import json
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import Query
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Encode a keyset position as an opaque URL-safe token"""
+    raw = json.dumps(payload, default=lambda v: v.isoformat(), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict) or "i" not in payload:
+        raise ValueError("Invalid cursor")
+    return payload
+
+def _coerce(column, value: Any) -> Any:
+    """Restore a JSON cursor value to the column's Python type"""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+def paginate(
+    query: Query,
+    sort_columns: Dict[str, Any],
+    id_column,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Order `query` by (sort column, id) and return one page plus the cursor
+    for the next page. With a cursor the page starts after the encoded
+    position (keyset pagination); without one `skip` is applied as an offset.
+    NULL sort values are ordered last in both directions.
+    """
+    query = page_query(query, sort_columns, id_column, sort, order, cursor, skip, limit)
+    return split_page(query.all(), sort_columns, id_column, sort, order, limit)
+
+def page_query(
+    query: Union[Query, Select],
+    sort_columns: Dict[str, Any],
+    id_column,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> Union[Query, Select]:
+    """
+    The query or select() statement of one page as in paginate(), fetching
+    one extra row to tell whether a next page exists. Pass its rows to
+    split_page(); async sessions execute the statement themselves.
+    """
+    if sort not in sort_columns:
+        raise ValueError(f"Invalid sort field: {sort}. Allowed: {', '.join(sorted(sort_columns))}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    column = sort_columns[sort]
+    descending = order == "desc"
+    nullable = column is not id_column and getattr(column, "nullable", True)
+
+    def after(left, right):
+        return left < right if descending else left > right
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("s") != sort or position.get("o") != order:
+            raise ValueError("Cursor does not match the requested sort order")
+        last_id = position["i"]
+        last_value = _coerce(column, position.get("v"))
+
+        if column is id_column:
+            query = query.filter(after(id_column, last_id))
+        elif last_value is None:
+            query = query.filter(and_(column.is_(None), after(id_column, last_id)))
+        else:
+            conditions = [
+                after(column, last_value),
+                and_(column == last_value, after(id_column, last_id))
+            ]
+            if nullable:
+                conditions.append(column.is_(None))
+            query = query.filter(or_(*conditions))
+
+    ordering = []
+    if nullable:
+        ordering.append(column.is_(None))
+    if column is not id_column:
+        ordering.append(column.desc() if descending else column.asc())
+    ordering.append(id_column.desc() if descending else id_column.asc())
+    query = query.order_by(*ordering)
+
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def split_page(
+    rows: List[Any],
+    sort_columns: Dict[str, Any],
+    id_column,
+    sort: str,
+    order: str,
+    limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim the rows of a page_query() to the page and encode the next cursor
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            "s": sort,
+            "o": order,
+            "v": getattr(last, sort_columns[sort].key),
+            "i": getattr(last, id_column.key)
+        })
+    return rows, next_cursor
@@ -4,12 +4,14 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import re
 import logging
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User
 from app.schemas.user import TokenData
 
@@ -85,11 +87,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
             detail="Error creating access token"
         )
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user from JWT token with improved error handling"""
+def _token_user_id(token: str) -> int:
+    """User ID of a valid access token, or raise 401"""
     try:
         # Verify and decode the token
         payload = jwt.decode(
@@ -108,8 +107,10 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        token_data = TokenData(user_id=user_id)
+        return TokenData(user_id=user_id).user_id
         
+    except HTTPException:
+        raise
     except JWTError as e:
         logger.error(f"JWT validation error: {str(e)}")
         raise HTTPException(
@@ -123,10 +124,9 @@ async def get_current_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing token"
         )
-    
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    
+
+def _active_user(user: Optional[User]) -> User:
+    """The token's user, or raise 401 if it is missing or inactive"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -142,3 +142,24 @@ async def get_current_user(
         )
     
     return user
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get current user from JWT token, for routes on the sync session so a
+    request uses connections from one engine only
+    """
+    user_id = _token_user_id(token)
+    return _active_user(db.query(User).filter(User.id == user_id).first())
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Get current user from JWT token, for routes on the async session
+    """
+    user_id = _token_user_id(token)
+    return _active_user((await db.execute(select(User).where(User.id == user_id))).scalars().first())
@@ -0,0 +1,187 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.database import Base, get_db
+from app.models.screen import Screen, ScreenCriteria
+from app.models.stock import Stock, StockPrice
+from app.models.user import User
+from app.services.analytics_cache import analytics_cache
+from app.services.price_cache import price_cache
+from app.services.correlation_service import pairwise_correlation
+from app.utils.security import get_current_user
+
+# Create in-memory SQLite database for testing
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    analytics_cache.clear()
+    price_cache.clear()
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+
+    yield TestClient(app)
+
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db(client):
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def closes(db):
+    """Four stocks with partly missing, partly correlated closes"""
+    rng = np.random.default_rng(7)
+    today = date.today()
+    dates = [today - timedelta(days=120 - k) for k in range(120)]
+    base = rng.normal(0, 0.02, len(dates))
+    returns = {
+        "AAA": base,
+        "BBB": 0.6 * base + rng.normal(0, 0.01, len(dates)),
+        "CCC": rng.normal(0, 0.02, len(dates)),
+        "DDD": -base
+    }
+    frame = {}
+    for i, (symbol, r) in enumerate(returns.items()):
+        stock = Stock(symbol=symbol, company_name=symbol, sector="Technology", pe_ratio=10 + i)
+        db.add(stock)
+        db.flush()
+        series = pd.Series(100 * np.cumprod(1 + r), index=dates)
+        if symbol == "CCC":
+            # Missing bars leave gaps in the aligned matrix
+            series.iloc[::5] = np.nan
+        db.execute(insert(StockPrice), [
+            {"stock_id": stock.id, "date": d, "close": float(c)}
+            for d, c in series.dropna().items()
+        ])
+        frame[symbol] = series
+    db.commit()
+    return pd.DataFrame(frame)
+
+def test_blocked_correlation_matches_pandas():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.02, (200, 70))
+    returns[rng.random(returns.shape) < 0.2] = np.nan
+    returns[:190, 3] = np.nan
+    returns[:, 4] = 0.01
+
+    correlation, covariance = pairwise_correlation(returns, min_periods=15, block_size=16, covariance=True)
+    expected = pd.DataFrame(returns)
+    np.testing.assert_allclose(correlation, expected.corr(min_periods=15), atol=1e-6)
+    np.testing.assert_allclose(covariance, expected.cov(min_periods=15), rtol=1e-5, atol=1e-12)
+
+def test_correlation_endpoint_aligns_returns_and_caches(client, db, closes):
+    price_queries = []
+    def count_price_queries(conn, cursor, statement, *args):
+        if "stock_prices" in statement:
+            price_queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_price_queries)
+    try:
+        response = client.get("/api/v1/analytics/correlation", params={
+            "symbols": "DDD,AAA,BBB,CCC", "days": 365, "min_periods": 10, "covariance": True
+        })
+        assert response.status_code == 200
+        assert price_queries
+
+        price_queries.clear()
+        again = client.get("/api/v1/analytics/correlation", params={
+            "symbols": "AAA,BBB,CCC,DDD", "days": 365, "min_periods": 10, "covariance": True
+        })
+        assert again.json() == response.json()
+        assert price_queries == []
+    finally:
+        event.remove(engine, "before_cursor_execute", count_price_queries)
+
+    body = response.json()
+    assert body["symbols"] == ["AAA", "BBB", "CCC", "DDD"]
+    expected = closes.pct_change(fill_method=None)
+    assert body["observations"] == len(closes) - 1
+    np.testing.assert_allclose(body["correlation"], expected.corr(min_periods=10), atol=1e-6)
+    np.testing.assert_allclose(body["covariance"], expected.cov(min_periods=10), rtol=1e-5)
+    assert body["correlation"][0][3] == pytest.approx(-1.0)
+
+    # The whole universe when no stocks are named
+    universe = client.get("/api/v1/analytics/correlation", params={"min_periods": 10}).json()
+    assert universe["symbols"] == ["AAA", "BBB", "CCC", "DDD"]
+    assert universe["covariance"] is None
+
+    assert client.get("/api/v1/analytics/correlation", params={"symbols": "AAA"}).status_code == 400
+    assert client.get("/api/v1/analytics/correlation", params={"symbols": "AAA,ZZZ"}).status_code == 404
+
+def test_screen_correlation_uses_screen_members(client, db, closes):
+    user = User(email="analyst@example.com", username="analyst", hashed_password="x")
+    db.add(user)
+    db.commit()
+    screen = Screen(name="Low PE", user_id=user.id, is_public=False)
+    screen.criteria = [ScreenCriteria(field="pe_ratio", operator="<", value=12)]
+    db.add(screen)
+    db.commit()
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        response = client.get(f"/api/v1/analytics/screens/{screen.id}/correlation", params={"min_periods": 10})
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert response.status_code == 200
+    assert response.json()["symbols"] == ["AAA", "BBB"]
+    assert response.json()["correlation"][0][1] > 0.5
+
+def test_rolling_series_match_pandas(client, db, closes):
+    response = client.get("/api/v1/analytics/rolling", params={
+        "symbols": "BBB,CCC,DDD", "benchmark": "AAA", "window": 20,
+        "metrics": "volatility,sharpe,beta,correlation", "risk_free_rate": 0.01
+    })
+    assert response.status_code == 200
+    body = response.json()
+
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    benchmark = returns["AAA"]
+    window = returns.rolling(20)
+    expected = {
+        "volatility": window.std() * 252 ** 0.5 * 100,
+        "sharpe": (window.mean() * 252 - 0.01) / (window.std() * 252 ** 0.5),
+        "beta": returns.apply(lambda c: c.rolling(20).cov(benchmark)).div(benchmark.rolling(20).var(), axis=0),
+        "correlation": returns.apply(lambda c: c.rolling(20).corr(benchmark))
+    }
+    assert body["dates"] == [d.isoformat() for d in returns.index[19:]]
+    assert [s["symbol"] for s in body["series"]] == ["BBB", "CCC", "DDD"]
+    for series in body["series"]:
+        for metric, frame in expected.items():
+            values = frame[series["symbol"]].iloc[19:]
+            got = np.array(series[metric], dtype=float)
+            np.testing.assert_allclose(got, values, rtol=1e-5, atol=1e-6, err_msg=metric)
+    # DDD is exactly the negated benchmark
+    assert body["series"][2]["beta"][-1] == pytest.approx(-1.0, rel=1e-5)
+
+    assert client.get("/api/v1/analytics/rolling", params={"symbols": "BBB", "metrics": "beta"}).status_code == 400
+    assert client.get("/api/v1/analytics/rolling", params={"symbols": "BBB", "benchmark": "ZZZ"}).status_code == 404
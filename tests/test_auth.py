@@ -1,21 +1,28 @@
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.models.user import User
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# SQLite file shared by the sync fixtures and the async request handlers
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test_auth.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Each TestClient request runs on its own event loop, so connections are not pooled
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{DATABASE_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Override the get_db dependency
 def override_get_db():
@@ -25,12 +32,16 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
 
 @pytest.fixture
 def client():
-    # Create tables
+    # Create tables and route requests to the test database
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     # Use TestClient
     with TestClient(app) as c:
@@ -127,3 +138,29 @@ def test_login_invalid_credentials(client):
     
     assert response.status_code == 401
     assert "Incorrect username or password" in response.json()["detail"]
+
+def test_register_login_and_me_on_async_session(client):
+    user = {"email": "async@example.com", "username": "asyncuser", "password": "Passw0rd!"}
+    response = client.post("/api/v1/auth/register", json=user)
+    assert response.status_code == 201
+    assert client.post("/api/v1/auth/register", json={**user, "username": "other"}).status_code == 400
+
+    response = client.post("/api/v1/auth/login", data={"username": "asyncuser", "password": "Passw0rd!"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert client.post("/api/v1/auth/login", data={"username": "asyncuser", "password": "wrong"}).status_code == 401
+
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.json()["username"] == "asyncuser"
+
+    # Sync routes authenticate on the sync session alone
+    def no_async_db():
+        raise AssertionError("sync route opened an async session")
+        yield
+    app.dependency_overrides[get_async_db] = no_async_db
+    try:
+        portfolios = client.get("/api/v1/portfolios/", headers={"Authorization": f"Bearer {token}"})
+        assert portfolios.status_code == 200
+        assert portfolios.json() == []
+    finally:
+        app.dependency_overrides[get_async_db] = override_get_async_db
@@ -0,0 +1,150 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.database import Base, get_db
+from app.models.stock import Stock, StockPrice
+from app.models.user import User
+from app.services.analytics_cache import analytics_cache
+from app.services.price_cache import price_cache
+from app.utils.security import get_current_user
+
+# Create in-memory SQLite database for testing
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    analytics_cache.clear()
+    price_cache.clear()
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def user(db):
+    user = User(email="pm@example.com", username="pm", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+@pytest.fixture
+def client(db, user):
+    overrides = {get_db: override_get_db, get_current_user: lambda: user}
+    previous = {dep: app.dependency_overrides.get(dep) for dep in overrides}
+    app.dependency_overrides.update(overrides)
+
+    yield TestClient(app)
+
+    for dep, value in previous.items():
+        if value is None:
+            app.dependency_overrides.pop(dep, None)
+        else:
+            app.dependency_overrides[dep] = value
+
+@pytest.fixture
+def closes(db):
+    """Three stocks; one has missing bars and starts late"""
+    rng = np.random.default_rng(3)
+    today = date.today()
+    dates = [today - timedelta(days=200 - k) for k in range(200)]
+    frame = {}
+    for symbol, drift in (("AAA", 0.001), ("BBB", -0.0005), ("CCC", 0.0)):
+        stock = Stock(symbol=symbol, company_name=symbol)
+        db.add(stock)
+        db.flush()
+        series = pd.Series(50 * np.cumprod(1 + rng.normal(drift, 0.015, len(dates))), index=dates)
+        if symbol == "CCC":
+            series.iloc[:10] = np.nan
+            series.iloc[50:53] = np.nan
+        db.execute(insert(StockPrice), [
+            {"stock_id": stock.id, "date": d, "close": float(c)} for d, c in series.dropna().items()
+        ])
+        frame[symbol] = series
+    db.commit()
+    return pd.DataFrame(frame)
+
+def test_portfolio_analytics_match_pandas(client, closes):
+    holdings = [{"symbol": "AAA", "weight": 2}, {"symbol": "bbb", "weight": 1}, {"symbol": "CCC", "weight": 1}]
+    response = client.post("/api/v1/portfolios/analytics", json={
+        "holdings": holdings, "days": 365, "risk_free_rate": 0.02, "confidence": 0.9
+    })
+    assert response.status_code == 200
+    body = response.json()
+
+    weights = np.array([0.5, 0.25, 0.25])
+    returns = closes.ffill().pct_change(fill_method=None).iloc[1:].fillna(0)
+    portfolio = returns @ weights
+    value = (1 + portfolio).cumprod()
+
+    assert body["observations"] == len(closes) - 1
+    assert body["series"]["value"] == pytest.approx(value.tolist(), rel=1e-9)
+    assert body["total_return"] == pytest.approx((value.iloc[-1] - 1) * 100, rel=1e-9)
+    assert body["volatility"] == pytest.approx(portfolio.std() * 252 ** 0.5 * 100, rel=1e-9)
+    assert body["sharpe_ratio"] == pytest.approx(
+        (portfolio.mean() * 252 - 0.02) / (portfolio.std() * 252 ** 0.5), rel=1e-9
+    )
+    cutoff = portfolio.quantile(0.1)
+    assert body["value_at_risk"] == pytest.approx(-cutoff * 100, rel=1e-9)
+    assert body["conditional_value_at_risk"] == pytest.approx(-portfolio[portfolio <= cutoff].mean() * 100, rel=1e-9)
+
+    covariance = returns.cov().to_numpy()
+    expected_risk = weights * (covariance @ weights) / (weights @ covariance @ weights) * 100
+    contributions = body["holdings"]
+    assert [h["symbol"] for h in contributions] == ["AAA", "BBB", "CCC"]
+    assert [h["weight"] for h in contributions] == pytest.approx(weights.tolist())
+    assert [h["risk_contribution"] for h in contributions] == pytest.approx(expected_risk.tolist(), rel=1e-9)
+    assert sum(h["return_contribution"] for h in contributions) == pytest.approx(portfolio.sum() * 100)
+
+def test_saved_portfolio_analytics(client, closes):
+    response = client.post("/api/v1/portfolios/", json={
+        "name": "Core", "holdings": [{"symbol": "AAA", "weight": 0.6}, {"symbol": "CCC", "weight": 0.4}]
+    })
+    assert response.status_code == 201
+    portfolio = response.json()
+    assert [h["symbol"] for h in portfolio["holdings"]] == ["AAA", "CCC"]
+
+    saved = client.get(f"/api/v1/portfolios/{portfolio['id']}/analytics", params={"days": 365})
+    submitted = client.post("/api/v1/portfolios/analytics", json={
+        "holdings": [{"symbol": "AAA", "weight": 0.6}, {"symbol": "CCC", "weight": 0.4}]
+    })
+    assert saved.status_code == 200
+    assert saved.json() == submitted.json()
+
+    assert client.get("/api/v1/portfolios/").json()[0]["name"] == "Core"
+    assert client.delete(f"/api/v1/portfolios/{portfolio['id']}").status_code == 204
+    assert client.get(f"/api/v1/portfolios/{portfolio['id']}").status_code == 404
+
+def test_portfolio_input_errors(client, closes):
+    url = "/api/v1/portfolios/analytics"
+    assert client.post(url, json={"holdings": [{"symbol": "ZZZ", "weight": 1}]}).status_code == 404
+    assert client.post(url, json={"holdings": [
+        {"symbol": "AAA", "weight": 1}, {"symbol": "aaa", "weight": 1}
+    ]}).status_code == 400
+    assert client.post(url, json={"holdings": [
+        {"symbol": "AAA", "weight": 1}, {"symbol": "BBB", "weight": -1}
+    ]}).status_code == 400
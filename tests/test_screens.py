@@ -1,24 +1,32 @@
+import os
+import tempfile
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.models.user import User
 from app.models.stock import Stock
 from app.models.screen import Screen, ScreenCriteria
 from app.utils.security import get_password_hash
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# SQLite file shared by the sync fixtures and the async request handlers
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test_screens.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Each TestClient request runs on its own event loop, so connections are not pooled
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{DATABASE_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Override the get_db dependency
 def override_get_db():
@@ -28,7 +36,9 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
 
 # Create a test user and get token
 def get_test_token(client):
@@ -55,8 +65,10 @@ def get_test_token(client):
 
 @pytest.fixture
 def client():
-    # Create tables
+    # Create tables and route requests to the test database
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     # Use TestClient
     with TestClient(app) as c:
@@ -252,3 +264,139 @@ def test_run_screen(client, test_user, test_stocks, db):
     assert data["screen_name"] == "Value Tech Stocks"
     assert data["count"] == 1  # Only AAPL should match
     assert data["results"][0]["symbol"] == "AAPL"
+
+def test_screen_results_conditional_get(client, test_user, test_stocks, db):
+    from app.utils.security import get_current_user_async
+    app.dependency_overrides[get_current_user_async] = lambda: test_user
+    try:
+        screen = Screen(name="Cheap tech", user_id=test_user.id, is_public=False)
+        screen.criteria = [ScreenCriteria(field="pe_ratio", operator="<", value=30)]
+        db.add(screen)
+        db.commit()
+        url = f"/api/v1/screens/{screen.id}/results"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.json()["count"] == 2
+        etag = first.headers["etag"]
+
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        # A criteria-only change bumps the screen version
+        response = client.put(
+            f"/api/v1/screens/{screen.id}",
+            json={"criteria": [{"field": "pe_ratio", "operator": "<", "value": 40}]}
+        )
+        assert response.status_code == 200
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()["count"] == 3
+
+        # Refreshing the factor scores screens can filter on changes the ETag
+        from app.services.factor_service import FactorScoreService
+        etag = changed.headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        FactorScoreService(db).refresh()
+        refreshed = client.get(url, headers={"If-None-Match": etag})
+        assert refreshed.status_code == 200
+        assert refreshed.headers["etag"] != etag
+
+        # An hourly refresh over unchanged fundamentals writes nothing
+        etag = refreshed.headers["etag"]
+        assert FactorScoreService(db).refresh() == 0
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    finally:
+        app.dependency_overrides.pop(get_current_user_async, None)
+
+def test_list_and_run_screens_without_sync_session(client, test_user, test_stocks, db):
+    from app.services.count_cache import count_cache
+    from app.services.facet_service import facet_service
+    from app.utils.security import get_current_user_async
+
+    def no_sync_db():
+        raise AssertionError("async route opened a sync session")
+        yield
+    count_cache.clear()
+    facet_service.reset()
+    app.dependency_overrides[get_current_user_async] = lambda: test_user
+    app.dependency_overrides[get_db] = no_sync_db
+    try:
+        for name, limit in (("Cheap", 30), ("Very cheap", 26), ("Any", 100)):
+            screen = Screen(name=name, user_id=test_user.id)
+            screen.criteria = [ScreenCriteria(field="pe_ratio", operator="<", value=limit)]
+            db.add(screen)
+        db.commit()
+
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 2, "sort": "name"}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/api/v1/screens/", params=params).json()
+            assert page["total"] == 3
+            pages.append([screen["name"] for screen in page["screens"]])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert pages == [["Any", "Cheap"], ["Very cheap"]]
+        default = client.get("/api/v1/screens/", params={"sort": "name"}).json()
+        assert client.get("/api/v1/screens/", params={"sort": "name", "fast": True}).json() == default
+        assert default["screens"][1]["criteria"][0]["value"] == 30
+        assert client.get("/api/v1/screens/", params={"sort": "risk"}).status_code == 400
+
+        screen_id = default["screens"][1]["id"]
+        result = client.post(f"/api/v1/screens/{screen_id}/run", params={"include_facets": True}).json()
+        assert [r["symbol"] for r in result["results"]] == ["AAPL", "GOOGL"]
+        assert [(f["name"], f["count"]) for f in result["facets"]] == [("Technology", 2)]
+    finally:
+        app.dependency_overrides.pop(get_current_user_async, None)
+        app.dependency_overrides[get_db] = override_get_db
+
+def test_factor_scores_rank_within_sector(client, test_user, test_stocks, db):
+    from app.services.factor_service import FactorScoreService
+    from app.services.screen_service import ScreenService
+
+    db.add(Stock(symbol="XOM", company_name="Exxon Mobil", sector="Energy", industry="Oil & Gas", pe_ratio=12.0))
+    db.commit()
+    assert FactorScoreService(db).refresh() == 40
+
+    from app.models.stock import StockFactorScore
+    scores = {
+        row.stock_id: row for row in db.query(StockFactorScore).filter(StockFactorScore.field == "pe_ratio")
+    }
+    googl, aapl, msft = (next(s.id for s in test_stocks if s.symbol == sym) for sym in ("GOOGL", "AAPL", "MSFT"))
+    # Ascending, so the cheapest P/E has the lowest percentile
+    assert [scores[i].sector_pct for i in (googl, aapl, msft)] == pytest.approx([100 / 3, 200 / 3, 100])
+    tech = np.array([25.4, 28.5, 32.1])
+    assert scores[aapl].sector_z == pytest.approx((28.5 - tech.mean()) / tech.std(ddof=1))
+    # A sector of one has a percentile but no z-score
+    xom = db.query(Stock.id).filter(Stock.symbol == "XOM").scalar()
+    assert scores[xom].sector_pct == 100 and scores[xom].sector_z is None
+    assert scores[xom].pct == 25
+
+    screen = Screen(name="Cheapest in sector", user_id=test_user.id)
+    screen.criteria = [ScreenCriteria(field="pe_ratio_sector_pct", operator="<", value=50)]
+    db.add(screen)
+    db.commit()
+    result = ScreenService(db).run_screen(screen.id)
+    assert [r["symbol"] for r in result["results"]] == ["GOOGL"]
+
+    # Only the rows whose scores moved are rewritten
+    stamps = dict(db.query(StockFactorScore.id, StockFactorScore.updated_at).all())
+    db.query(Stock).filter(Stock.id == xom).update({"beta": 0.7})
+    db.commit()
+    assert FactorScoreService(db).refresh() > 0
+    db.expire_all()
+    rewritten = {
+        field for row_id, field, updated_at in db.query(
+            StockFactorScore.id, StockFactorScore.field, StockFactorScore.updated_at
+        ) if updated_at != stamps[row_id]
+    }
+    assert rewritten == {"beta"}
+
+    # Rows of deleted stocks are removed on the next refresh
+    db.query(Stock).filter(Stock.id == xom).delete()
+    db.commit()
+    FactorScoreService(db).refresh()
+    assert db.query(StockFactorScore).filter(StockFactorScore.stock_id == xom).count() == 0
@@ -0,0 +1,1090 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.database import Base, get_db
+from app.models.stock import Stock, StockPrice
+from app.services import stock_refresh_service as refresh_module
+from app.services.stock_refresh_service import StockRefreshService
+from app.services.price_history_service import PriceHistoryService
+from app.services.count_cache import count_cache
+from app.services.analytics_cache import analytics_cache
+from app.services.price_cache import price_cache
+from app.services.search_index import search_index
+from app.services.facet_service import facet_service
+from app.services.sector_aggregates import sector_aggregates
+from app.services.yfinance_service import YFinanceService
+
+# Create in-memory SQLite database for testing
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def client():
+    # Create tables and route requests to the test database
+    Base.metadata.create_all(bind=engine)
+    count_cache.clear()
+    analytics_cache.clear()
+    price_cache.clear()
+    search_index.reset()
+    facet_service.reset()
+    sector_aggregates.reset()
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+
+    yield TestClient(app)
+
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db(client):
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def refresher(monkeypatch):
+    # Swap the singleton for one bound to the test database
+    service = StockRefreshService(session_factory=TestingSessionLocal, retry_seconds=0)
+    monkeypatch.setattr(refresh_module, "stock_refresh_service", service)
+    monkeypatch.setattr("app.routers.stocks.stock_refresh_service", service)
+    yield service
+    service.shutdown(wait=True)
+
+def add_stock(db, symbol="AAPL", last_updated=None):
+    stock = Stock(
+        symbol=symbol,
+        company_name=f"{symbol} Inc.",
+        sector="Technology",
+        industry="Consumer Electronics",
+        market_cap=2500000000000,
+        pe_ratio=28.5,
+        price=175.50,
+        last_updated=last_updated or datetime.utcnow()
+    )
+    db.add(stock)
+    db.commit()
+    db.refresh(stock)
+    return stock
+
+def test_get_fresh_stock_skips_upstream(client, db, refresher, monkeypatch):
+    stock = add_stock(db)
+    calls = []
+    monkeypatch.setattr(YFinanceService, "update_stock_data", lambda self, symbol: calls.append(symbol))
+
+    response = client.get(f"/api/v1/stocks/{stock.id}")
+
+    assert response.status_code == 200
+    assert response.json()["symbol"] == "AAPL"
+    assert calls == []
+
+def test_get_stale_stock_refreshes_in_background(client, db, refresher, monkeypatch):
+    stock = add_stock(db, last_updated=datetime.utcnow() - timedelta(days=1))
+    release = threading.Event()
+    calls = []
+
+    def slow_update(self, symbol):
+        calls.append(symbol)
+        release.wait(5)
+
+    monkeypatch.setattr(YFinanceService, "update_stock_data", slow_update)
+
+    # Both requests return the stale row while a single refresh is in flight
+    first = client.get(f"/api/v1/stocks/{stock.id}")
+    second = client.get(f"/api/v1/stocks/{stock.id}")
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json()["price"] == 175.50
+
+    future = refresher.schedule_refresh("AAPL")
+    release.set()
+    future.result(timeout=5)
+
+    assert calls == ["AAPL"]
+
+def test_is_fresh_window():
+    service = StockRefreshService(freshness_seconds=60)
+
+    assert service.is_fresh(datetime.utcnow())
+    assert not service.is_fresh(datetime.utcnow() - timedelta(minutes=5))
+    assert not service.is_fresh(None)
+
+def fake_history(calls):
+    def fetch(self, symbol, start_date=None, end_date=None, period="1y", allow_empty=False):
+        calls.append((start_date, end_date))
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+        bars = []
+        day = start
+        while day < end:
+            if day.weekday() < 5:
+                bars.append({
+                    "date": day.strftime("%Y-%m-%d"),
+                    "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.5, "volume": 1000
+                })
+            day += timedelta(days=1)
+        return bars
+    return fetch
+
+def test_get_prices_fetches_only_missing_ranges(client, db, monkeypatch):
+    stock = add_stock(db)
+    calls = []
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history(calls))
+
+    first = client.get(
+        f"/api/v1/stocks/prices/{stock.id}",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    )
+    again = client.get(
+        f"/api/v1/stocks/prices/{stock.id}",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    )
+    extended = client.get(
+        f"/api/v1/stocks/prices/{stock.id}",
+        params={"start_date": "2024-01-15", "end_date": "2024-02-15"}
+    )
+
+    assert first.status_code == 200
+    assert len(first.json()) == 23
+    assert again.json() == first.json()
+    assert len(extended.json()) == 24
+    # Only the uncovered tail is fetched on the overlapping request
+    assert calls == [("2024-01-01", "2024-02-01"), ("2024-02-01", "2024-02-16")]
+    assert db.query(StockPrice).count() == 34
+
+def test_upsert_bars_updates_changed_rows(db):
+    stock = add_stock(db)
+    price_history = PriceHistoryService(db)
+    bar = {"date": "2024-01-02", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}
+
+    assert price_history.upsert_bars(stock.id, [bar]) == 1
+    assert price_history.upsert_bars(stock.id, [bar]) == 0
+    assert price_history.upsert_bars(stock.id, [{**bar, "close": 1.75}]) == 1
+
+    prices = price_history.get_prices(stock.id, date(2024, 1, 1), date(2024, 1, 31))
+    assert [p.close for p in prices] == [1.75]
+
+def test_ensure_indexes_deletes_duplicate_bars_first(db):
+    from sqlalchemy import inspect, text
+    from app.database import ensure_indexes
+
+    db.execute(text("DROP INDEX ix_stock_prices_stock_id_date"))
+    db.add_all([
+        StockPrice(stock_id=1, date=date(2024, 1, 2), close=10.0),
+        StockPrice(stock_id=1, date=date(2024, 1, 2), close=11.0),
+        StockPrice(stock_id=1, date=date(2024, 1, 3), close=12.0),
+        StockPrice(stock_id=2, date=date(2024, 1, 2), close=20.0)
+    ])
+    db.commit()
+
+    ensure_indexes(engine)
+
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("stock_prices")}
+    assert indexes["ix_stock_prices_stock_id_date"]["unique"]
+    rows = db.query(StockPrice.stock_id, StockPrice.date, StockPrice.close).order_by(StockPrice.id).all()
+    assert rows == [(1, date(2024, 1, 2), 11.0), (1, date(2024, 1, 3), 12.0), (2, date(2024, 1, 2), 20.0)]
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pagination_covers_all_rows(client, db, order):
+    pe_ratios = [15.0, None, 30.0, 15.0, None, 8.0, 22.0]
+    for i, pe_ratio in enumerate(pe_ratios):
+        stock = add_stock(db, symbol=f"S{i}")
+        stock.pe_ratio = pe_ratio
+    db.commit()
+
+    symbols = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "sort": "pe_ratio", "order": order}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/v1/stocks/", params=params).json()
+        symbols.extend(s["symbol"] for s in data["stocks"])
+        assert data["total"] == len(pe_ratios)
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    expected = sorted(
+        (s for s in db.query(Stock).all()),
+        key=lambda s: (s.pe_ratio is None, -(s.pe_ratio or 0) if order == "desc" else (s.pe_ratio or 0),
+                       -s.id if order == "desc" else s.id)
+    )
+    assert symbols == [s.symbol for s in expected]
+
+def test_listing_total_refreshes_after_write(client, db):
+    add_stock(db, symbol="AAPL")
+    assert client.get("/api/v1/stocks/").json()["total"] == 1
+
+    add_stock(db, symbol="MSFT")
+    assert client.get("/api/v1/stocks/").json()["total"] == 2
+    assert client.get("/api/v1/stocks/", params={"include_total": False}).json()["total"] is None
+
+def test_invalid_cursor_is_rejected(client, db):
+    response = client.get("/api/v1/stocks/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_search_ranks_symbol_before_name_matches(client, db):
+    add_stock(db, symbol="F").company_name = "Ford Motor Company"
+    add_stock(db, symbol="FDX").company_name = "FedEx Corporation"
+    add_stock(db, symbol="META").company_name = "Meta Platforms Inc."
+    db.commit()
+
+    symbols = [r["symbol"] for r in client.get("/api/v1/stocks/search", params={"q": "f"}).json()]
+    assert symbols[0] == "F"
+    assert set(symbols) == {"F", "FDX"}
+
+    by_name = client.get("/api/v1/stocks/search", params={"q": "motor"}).json()
+    assert [r["symbol"] for r in by_name] == ["F"]
+
+    by_substring = client.get("/api/v1/stocks/search", params={"q": "latform"}).json()
+    assert [r["symbol"] for r in by_substring] == ["META"]
+
+def test_search_index_follows_commits(client, db):
+    stock = add_stock(db, symbol="FB")
+    assert client.get("/api/v1/stocks/search", params={"q": "FB"}).json()[0]["symbol"] == "FB"
+
+    stock.symbol = "META"
+    stock.company_name = "Meta Platforms Inc."
+    db.commit()
+    add_stock(db, symbol="MSFT")
+
+    assert client.get("/api/v1/stocks/search", params={"q": "FB"}).json() == []
+    assert [r["symbol"] for r in client.get("/api/v1/stocks/search", params={"q": "M"}).json()] == ["META", "MSFT"]
+    assert client.get("/api/v1/stocks/", params={"symbol": "eta"}).json()["total"] == 1
+
+def test_facets_follow_commits(client, db):
+    aapl = add_stock(db, symbol="AAPL")
+    msft = add_stock(db, symbol="MSFT")
+    msft.industry = "Software"
+    xom = add_stock(db, symbol="XOM")
+    xom.sector, xom.industry, xom.market_cap = "Energy", "Oil & Gas", 400.0
+    db.commit()
+
+    assert client.get("/api/v1/stocks/sectors").json() == ["Energy", "Technology"]
+    technology = client.get("/api/v1/stocks/facets", params={"sector": "Technology"}).json()[0]
+    assert technology["count"] == 2
+    assert technology["market_cap"] == 2 * aapl.market_cap
+    assert [i["name"] for i in technology["industries"]] == ["Consumer Electronics", "Software"]
+
+    xom.sector = "Technology"
+    db.commit()
+    db.delete(aapl)
+    db.commit()
+
+    assert client.get("/api/v1/stocks/sectors").json() == ["Technology"]
+    assert client.get("/api/v1/stocks/industries", params={"sector": "Technology"}).json() == [
+        "Oil & Gas", "Software"
+    ]
+    assert [f["count"] for f in facet_service.facets_for([xom.id])] == [1]
+
+def test_sector_aggregates_recompute_changed_groups(client, db):
+    aapl = add_stock(db, symbol="AAPL")
+    msft = add_stock(db, symbol="MSFT")
+    msft.pe_ratio, msft.dividend_yield = 32.5, 0.8
+    xom = add_stock(db, symbol="XOM")
+    xom.sector, xom.industry, xom.pe_ratio, xom.market_cap = "Energy", "Oil & Gas", 12.0, 400.0
+    db.commit()
+    today = date.today()
+    bars = [
+        {"date": today - timedelta(days=days), "open": close, "high": close, "low": close, "close": close, "volume": 1}
+        for days, close in ((35, 80.0), (2, 99.0), (1, 100.0))
+    ]
+    PriceHistoryService(db).upsert_bars(aapl.id, bars)
+
+    sectors = client.get("/api/v1/stocks/aggregates").json()
+    assert [s["name"] for s in sectors] == ["Energy", "Technology"]
+    technology = sectors[1]
+    assert technology["count"] == 2
+    assert technology["median_pe_ratio"] == pytest.approx(30.5)
+    assert technology["total_market_cap"] == 2 * aapl.market_cap
+    assert technology["avg_dividend_yield"] == pytest.approx(0.8)
+    assert technology["avg_return_1d"] == pytest.approx(100 / 99 - 1)
+    assert technology["avg_return_1m"] == pytest.approx(0.25)
+
+    # A new bar and a stock moving sector only touch their groups
+    PriceHistoryService(db).upsert_bars(aapl.id, [{**bars[-1], "date": today, "close": 110.0}])
+    xom.sector = "Technology"
+    db.commit()
+    industries = client.get(
+        "/api/v1/stocks/aggregates", params={"level": "industry", "sector": "Technology"}
+    ).json()
+    assert [(i["name"], i["count"]) for i in industries] == [("Consumer Electronics", 2), ("Oil & Gas", 1)]
+    assert industries[0]["avg_return_1d"] == pytest.approx(0.1)
+    assert industries[0]["avg_return_1m"] == pytest.approx(110 / 80 - 1)
+    assert [s["name"] for s in client.get("/api/v1/stocks/aggregates").json()] == ["Technology"]
+
+    assert client.get("/api/v1/stocks/aggregates", params={"level": "country"}).status_code == 400
+
+    # Reads are not held up while changed returns are loaded
+    loading, release = threading.Event(), threading.Event()
+    load_returns = sector_aggregates._load_returns
+    def slow_load_returns(*args):
+        loading.set()
+        release.wait(timeout=5)
+        return load_returns(*args)
+    sector_aggregates._load_returns = slow_load_returns
+    session = TestingSessionLocal()
+    try:
+        PriceHistoryService(db).upsert_bars(aapl.id, [{**bars[-1], "date": today, "close": 121.0}])
+        updater = threading.Thread(target=sector_aggregates.ensure_current, args=(session,))
+        updater.start()
+        assert loading.wait(timeout=5)
+        read = threading.Thread(target=sector_aggregates.aggregates)
+        read.start()
+        read.join(timeout=1)
+        assert not read.is_alive()
+        release.set()
+        updater.join()
+    finally:
+        del sector_aggregates._load_returns
+        session.close()
+    technology = sector_aggregates.aggregates(sector="Technology")[0]
+    assert technology["avg_return_1d"] == pytest.approx(121 / 100 - 1)
+
+def test_batch_quotes_select_fields_and_refresh_stale_once(client, db, refresher, monkeypatch):
+    fresh = add_stock(db, symbol="AAPL")
+    stale = add_stock(db, symbol="MSFT", last_updated=datetime.utcnow() - timedelta(days=1))
+    batches = []
+    monkeypatch.setattr(YFinanceService, "update_quotes", lambda self, symbols: batches.append(symbols))
+
+    response = client.post(
+        "/api/v1/stocks/batch",
+        json={"ids": [stale.id, 999], "symbols": ["aapl", "MSFT", "NOPE"], "fields": ["price"]}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["quotes"] == [
+        {"id": stale.id, "symbol": "MSFT", "price": 175.50},
+        {"id": fresh.id, "symbol": "AAPL", "price": 175.50}
+    ]
+    assert data["missing_ids"] == [999]
+    assert data["missing_symbols"] == ["NOPE"]
+    assert data["stale"] == ["MSFT"]
+
+    refresher.shutdown(wait=True)
+    assert batches == [["MSFT"]]
+
+def test_quote_refresh_keeps_fundamentals_stale(db, monkeypatch):
+    import pandas as pd
+    from app.services import yfinance_service
+
+    stale = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    stock = add_stock(db, symbol="MSFT", last_updated=stale)
+    today = pd.Timestamp(date.today())
+    bars = pd.DataFrame(
+        {"Open": [1.0], "High": [2.0], "Low": [0.5], "Close": [180.25], "Volume": [10]}, index=[today]
+    )
+    monkeypatch.setattr(yfinance_service.yf, "download", lambda **kwargs: bars)
+
+    assert YFinanceService(db).update_quotes(["MSFT"]) == [stock]
+
+    db.expire_all()
+    stock = db.query(Stock).filter(Stock.symbol == "MSFT").one()
+    assert stock.price == 180.25
+    assert stock.last_updated == stale
+
+def test_batch_quotes_reject_unknown_fields(client, db):
+    response = client.post("/api/v1/stocks/batch", json={"ids": [1], "fields": ["hashed_password"]})
+    assert response.status_code == 400
+
+def test_get_prices_columnar_json(client, db, monkeypatch):
+    stock = add_stock(db)
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history([]))
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+    rows = client.get(f"/api/v1/stocks/prices/{stock.id}", params=params).json()
+    response = client.get(
+        f"/api/v1/stocks/prices/{stock.id}",
+        params=params,
+        headers={"Accept": "application/vnd.columnar+json"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/vnd.columnar+json")
+    columns = response.json()
+    assert columns["symbol"] == "AAPL"
+    assert columns["date"] == [row["date"] for row in rows]
+    assert columns["close"] == [row["close"] for row in rows]
+    assert columns["volume"] == [row["volume"] for row in rows]
+
+def test_download_prices_for_several_stocks(client, db, monkeypatch):
+    aapl = add_stock(db, symbol="AAPL")
+    msft = add_stock(db, symbol="MSFT")
+    add_stock(db, symbol="IBM")
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history([]))
+
+    response = client.get("/api/v1/stocks/prices", params={
+        "stock_ids": str(msft.id),
+        "symbols": "aapl",
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-05"
+    })
+
+    assert response.status_code == 200
+    series = response.json()["series"]
+    assert [s["stock_id"] for s in series] == [aapl.id, msft.id]
+    assert all(len(s["date"]) == 5 for s in series)
+
+    missing = client.get("/api/v1/stocks/prices", params={"symbols": "NOPE"})
+    assert missing.status_code == 404
+
+def test_download_prices_as_arrow(client, db, monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    aapl = add_stock(db, symbol="AAPL")
+    msft = add_stock(db, symbol="MSFT")
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history([]))
+
+    response = client.get("/api/v1/stocks/prices", params={
+        "symbols": "MSFT,AAPL",
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-05",
+        "format": "arrow"
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 10
+    assert table.column("stock_id").to_pylist() == [aapl.id] * 5 + [msft.id] * 5
+    assert table.column("symbol").to_pylist() == ["AAPL"] * 5 + ["MSFT"] * 5
+    assert table.column("date").to_pylist()[0] == date(2024, 1, 1)
+
+def test_fast_listing_matches_default_wire_format(client, db):
+    for i, pe_ratio in enumerate([12.5, None, 30.0]):
+        stock = add_stock(db, symbol=f"S{i}")
+        stock.pe_ratio = pe_ratio
+    db.commit()
+    params = {"sort": "pe_ratio", "limit": 2}
+
+    default = client.get("/api/v1/stocks/", params=params)
+    fast = client.get("/api/v1/stocks/", params={**params, "fast": True})
+
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == default.json()
+    assert fast.json()["next_cursor"] is not None
+
+def test_get_stock_conditional_requests(client, db, refresher):
+    stock = add_stock(db)
+
+    first = client.get(f"/api/v1/stocks/{stock.id}")
+    etag = first.headers["etag"]
+    cached = client.get(f"/api/v1/stocks/{stock.id}", headers={"If-None-Match": etag})
+    since = client.get(
+        f"/api/v1/stocks/{stock.id}",
+        headers={"If-Modified-Since": first.headers["last-modified"]}
+    )
+
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert since.status_code == 304
+
+    stock.price = 200.0
+    stock.last_updated = datetime.utcnow()
+    db.commit()
+    changed = client.get(f"/api/v1/stocks/{stock.id}", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.json()["price"] == 200.0
+    assert changed.headers["etag"] != etag
+
+def test_get_prices_conditional_requests(client, db, monkeypatch):
+    stock = add_stock(db)
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history([]))
+    url = f"/api/v1/stocks/prices/{stock.id}"
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+    first = client.get(url, params=params)
+    etag = first.headers["etag"]
+    cached = client.get(url, params=params, headers={"If-None-Match": etag})
+    columnar = client.get(url, params={**params, "format": "columnar"}, headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    # Each representation has its own validator
+    assert columnar.status_code == 200
+
+    bar = {"date": "2024-01-02", "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10}
+    PriceHistoryService(db).upsert_bars(stock.id, [bar], commit=False)
+    PriceHistoryService(db).mark_covered(stock.id, date(2024, 1, 2), date(2024, 1, 2))
+    changed = client.get(url, params=params, headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.json()[1]["close"] == 1.5
+
+def test_get_prices_not_modified_skips_upstream_fetch(client, db, monkeypatch):
+    from app.services import price_history_service
+
+    stock = add_stock(db)
+    calls = []
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history(calls))
+    url = f"/api/v1/stocks/prices/{stock.id}"
+    params = {"start_date": (date.today() - timedelta(days=10)).isoformat()}
+
+    first = client.get(url, params=params)
+    assert len(calls) == 1
+    # Today's bar goes stale, so the range would otherwise be fetched again
+    monkeypatch.setattr(price_history_service.settings, "STOCK_FRESHNESS_SECONDS", 0)
+    cached = client.get(url, params=params, headers={"If-None-Match": first.headers["etag"]})
+
+    assert cached.status_code == 304
+    assert len(calls) == 1
+
+def test_get_prices_weekly_and_downsampled(client, db, monkeypatch):
+    stock = add_stock(db)
+    monkeypatch.setattr(YFinanceService, "fetch_historical_data", fake_history([]))
+    url = f"/api/v1/stocks/prices/{stock.id}"
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+    weekly = client.get(url, params={**params, "interval": "1w"}).json()
+    assert [bar["date"] for bar in weekly] == ["2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22", "2024-01-29"]
+    assert weekly[0]["volume"] == 5000
+    assert weekly[-1]["volume"] == 3000
+    assert weekly[0]["id"] is None
+
+    sampled = client.get(url, params={**params, "max_points": 5, "format": "columnar"}).json()
+    assert len(sampled["date"]) == 5
+    assert sampled["date"][0] == "2024-01-01"
+    assert sampled["date"][-1] == "2024-01-31"
+
+    assert client.get(url, params={**params, "interval": "1h"}).status_code == 400
+
+def test_universe_indicators_match_per_stock_calculation(db):
+    from app.services.indicator_service import IndicatorService
+    from app.services.stock_service import StockService
+    from app.models.stock import StockIndicator
+
+    today = date.today()
+    # Histories of different lengths exercise each indicator's minimum window
+    for i, length in enumerate([10, 30, 60, 250]):
+        stock = add_stock(db, symbol=f"S{i}")
+        for k in range(length):
+            db.add(StockPrice(
+                stock_id=stock.id,
+                date=today - timedelta(days=length - 1 - k),
+                close=100 + 10 * np.sin(k / 7 + i) + k * 0.1
+            ))
+    db.commit()
+
+    assert IndicatorService(db).refresh_all(days=400, batch_size=3) == 4
+
+    for stored in db.query(StockIndicator).all():
+        expected = StockService.calculate_technical_indicators(stored.stock_id, db, days=400)["indicators"]
+        assert stored.as_of == today
+        for name in ("sma_20", "sma_50", "sma_200", "rsi_14", "macd", "macd_signal",
+                     "macd_histogram", "bollinger_upper", "bollinger_middle", "bollinger_lower"):
+            if name in expected:
+                assert getattr(stored, name) == pytest.approx(expected[name], rel=1e-9)
+            else:
+                assert getattr(stored, name) is None
+
+def test_incremental_indicators_match_full_recompute(db):
+    from app.services import indicator_service  # registers the bar listener
+    from app.services.stock_service import StockService
+    from app.models.stock import StockIndicator, StockIndicatorState
+
+    stock = add_stock(db)
+    price_history = PriceHistoryService(db)
+    today = date.today()
+    days = [today - timedelta(days=260 - k) for k in range(261) if k % 9]
+
+    def bar(day, k):
+        return {"date": day, "open": 1.0, "high": 1.0, "low": 1.0,
+                "close": 100 + 10 * np.sin(k / 5) + k * 0.05, "volume": 10}
+
+    def assert_matches_recompute():
+        expected = StockService.calculate_technical_indicators(stock.id, db, days=400)["indicators"]
+        stored = db.query(StockIndicator).filter(StockIndicator.stock_id == stock.id).one()
+        for name, value in expected.items():
+            assert getattr(stored, name) == pytest.approx(value, rel=1e-9), name
+
+    # Initial load, then one bar at a time as a sync would append them
+    price_history.upsert_bars(stock.id, [bar(d, k) for k, d in enumerate(days[:30])])
+    for k, day in enumerate(days[30:], start=30):
+        price_history.upsert_bars(stock.id, [bar(day, k)])
+    assert db.query(StockIndicatorState).one().bar_count == len(days)
+    assert_matches_recompute()
+
+    # Intraday revision of the last bar replaces it in O(1)
+    price_history.upsert_bars(stock.id, [{**bar(days[-1], 0), "close": 150.0}])
+    assert db.query(StockIndicatorState).one().bar_count == len(days)
+    assert_matches_recompute()
+
+    # A backfilled bar before the last one forces a rebuild
+    price_history.upsert_bars(stock.id, [bar(today - timedelta(days=260 - 9), 7)])
+    assert db.query(StockIndicatorState).one().bar_count == len(days) + 1
+    assert_matches_recompute()
+
+def test_indicators_endpoint_serves_stored_row(client, db):
+    from app.models.stock import StockIndicator
+
+    stock = add_stock(db)
+    today = date.today()
+    PriceHistoryService(db).upsert_bars(stock.id, [
+        {"date": today - timedelta(days=60 - k), "open": 1.0, "high": 1.0, "low": 1.0,
+         "close": 100 + k + (k % 3), "volume": 10}
+        for k in range(60)
+    ])
+    stored = db.query(StockIndicator).filter(StockIndicator.stock_id == stock.id).one()
+    assert stored.as_of == today - timedelta(days=1)
+
+    response = client.get(f"/api/v1/stocks/indicators/{stock.id}")
+    assert response.status_code == 200
+    indicators = response.json()["indicators"]
+    assert indicators["sma_50"] == pytest.approx(stored.sma_50)
+    assert "sma_200" not in indicators
+
+    # The stored row is served as is
+    stored.rsi_14 = 12.5
+    db.commit()
+    assert client.get(f"/api/v1/stocks/indicators/{stock.id}").json()["indicators"]["rsi_14"] == 12.5
+
+    # Without a current row the same window is recomputed
+    db.delete(stored)
+    db.commit()
+    recomputed = client.get(f"/api/v1/stocks/indicators/{stock.id}").json()["indicators"]
+    assert recomputed == pytest.approx(indicators)
+    assert recomputed["rsi_14"] != 12.5
+
+def test_indicator_and_performance_results_are_cached_until_bars_change(client, db):
+    stock = add_stock(db)
+    price_history = PriceHistoryService(db)
+    today = date.today()
+    price_history.upsert_bars(stock.id, [
+        {"date": today - timedelta(days=40 - k), "open": 1.0, "high": 1.0, "low": 1.0,
+         "close": 100 + k + (k % 3), "volume": 10}
+        for k in range(40)
+    ])
+
+    price_queries = []
+    def count_price_queries(conn, cursor, statement, *args):
+        if "stock_prices" in statement:
+            price_queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_price_queries)
+    try:
+        first = client.get(f"/api/v1/stocks/indicators/{stock.id}", params={"days": 60})
+        assert first.status_code == 200
+        assert first.json()["as_of"] == (today - timedelta(days=1)).isoformat()
+        assert first.json()["indicators"]["sma_20"] is not None
+        performance = client.get(f"/api/v1/stocks/performance/{stock.id}", params={"period": "3m"})
+        assert performance.status_code == 200
+        assert performance.json()["total_return"] > 0
+        assert price_queries
+
+        # Repeated requests between writes do not read stock_prices
+        price_queries.clear()
+        assert client.get(f"/api/v1/stocks/indicators/{stock.id}", params={"days": 60}).json() == first.json()
+        assert client.get(f"/api/v1/stocks/performance/{stock.id}", params={"period": "3m"}).json() == performance.json()
+        assert price_queries == []
+
+        # A new bar is a new cache key
+        price_history.upsert_bars(stock.id, [
+            {"date": today, "open": 1.0, "high": 1.0, "low": 1.0, "close": 500.0, "volume": 10}
+        ])
+        refreshed = client.get(f"/api/v1/stocks/indicators/{stock.id}", params={"days": 60}).json()
+        assert refreshed["as_of"] == today.isoformat()
+        assert refreshed["indicators"]["sma_20"] > first.json()["indicators"]["sma_20"]
+
+        # Rewriting the latest bar keeps its date but is a new version too
+        price_history.upsert_bars(stock.id, [
+            {"date": today, "open": 1.0, "high": 1.0, "low": 1.0, "close": 50.0, "volume": 10}
+        ])
+        rewritten = client.get(f"/api/v1/stocks/indicators/{stock.id}", params={"days": 60}).json()
+        assert rewritten["as_of"] == today.isoformat()
+        assert rewritten["indicators"]["sma_20"] < refreshed["indicators"]["sma_20"]
+    finally:
+        event.remove(engine, "before_cursor_execute", count_price_queries)
+
+    assert client.get(f"/api/v1/stocks/performance/{stock.id}", params={"period": "2y"}).status_code == 400
+    assert client.get("/api/v1/stocks/indicators/999").status_code == 404
+
+def test_multi_period_performance_matches_single_period(client, db):
+    import pandas as pd
+    from app.services.stock_service import StockService
+
+    today = date.today()
+    stocks = [add_stock(db, symbol=s) for s in ("AAA", "BBB")]
+    for i, stock in enumerate(stocks):
+        for k in range(0, 800 - 300 * i, 2):
+            db.add(StockPrice(
+                stock_id=stock.id,
+                date=today - timedelta(days=800 - k),
+                close=50 + 10 * np.sin(k / 40 + i) + k * 0.02
+            ))
+    db.commit()
+
+    price_queries = []
+    def count_price_queries(conn, cursor, statement, *args):
+        if "FROM stock_prices" in statement:
+            price_queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_price_queries)
+    try:
+        response = client.get("/api/v1/stocks/performance", params={"symbols": "AAA,BBB"})
+    finally:
+        event.remove(engine, "before_cursor_execute", count_price_queries)
+    assert response.status_code == 200
+    # Latest bar dates plus one history load for every stock and period
+    assert len(price_queries) == 2
+
+    body = response.json()
+    assert body["periods"] == ["1m", "3m", "6m", "1y", "3y", "5y"]
+    for stock, result in zip(stocks, body["results"]):
+        assert result["symbol"] == stock.symbol
+        for period, metrics in result["periods"].items():
+            expected = StockService.get_stock_performance(stock.id, db, period)
+            if metrics is None:
+                # BBB's history ends before the short periods start
+                assert "error" in expected and stock.symbol == "BBB"
+                continue
+            assert metrics["start_date"] == expected["start_date"].isoformat()
+            for name in ("total_return", "annualized_return", "volatility", "max_drawdown"):
+                assert metrics[name] == pytest.approx(expected[name], rel=1e-9), (period, name)
+
+    # Same definitions as the former per-period pandas calculation
+    closes = pd.Series([p.close for p in db.query(StockPrice).filter(
+        StockPrice.stock_id == stocks[0].id, StockPrice.date >= today - timedelta(days=365)
+    ).order_by(StockPrice.date)])
+    daily = closes.pct_change()
+    growth = (1 + daily).cumprod()
+    one_year = body["results"][0]["periods"]["1y"]
+    assert one_year["volatility"] == pytest.approx(daily.std() * (252 ** 0.5) * 100, rel=1e-9)
+    assert one_year["max_drawdown"] == pytest.approx(((growth / growth.cummax() - 1) * 100).min(), rel=1e-9)
+
+    assert client.get("/api/v1/stocks/performance", params={"symbols": "AAA", "periods": "2y"}).status_code == 400
+    assert client.get("/api/v1/stocks/performance", params={"symbols": "ZZZ"}).status_code == 404
+
+def test_derived_series_follow_ingest_and_match_pandas(client, db):
+    import pandas as pd
+    from app.models.screen import ScreenCriteria
+    from app.models.stock import StockPriceDerived
+    from app.services.derived_series_service import DerivedSeriesService
+    from app.services.screen_service import ScreenService
+
+    stock = add_stock(db)
+    price_history = PriceHistoryService(db)
+    today = date.today()
+    days = [today - timedelta(days=600 - k) for k in range(601) if k % 7 not in (0, 6)]
+
+    def bar(day, k):
+        close = 100 + 20 * np.sin(k / 30) + k * 0.05
+        # Some bars come without a high/low
+        high, low = (None, None) if k % 11 == 0 else (close + 1, close - 1)
+        return {"date": day, "open": close, "high": high, "low": low, "close": close, "volume": 1000 + k}
+
+    # Initial load, then single bars, then a revision of an older bar
+    price_history.upsert_bars(stock.id, [bar(d, k) for k, d in enumerate(days[:200])])
+    for k, day in enumerate(days[200:], start=200):
+        price_history.upsert_bars(stock.id, [bar(day, k)])
+    price_history.upsert_bars(stock.id, [{**bar(days[300], 300), "close": 500.0, "high": 501.0}])
+
+    bars = pd.DataFrame([
+        (p.date, p.high, p.low, p.close, p.volume)
+        for p in db.query(StockPrice).filter(StockPrice.stock_id == stock.id).order_by(StockPrice.date)
+    ], columns=["date", "high", "low", "close", "volume"]).set_index("date")
+    bars.index = pd.to_datetime(bars.index).rename(None)
+    expected = pd.DataFrame({
+        "daily_return": bars["close"].pct_change(),
+        "high_52w": bars["high"].fillna(bars["close"]).rolling("365D").max(),
+        "low_52w": bars["low"].fillna(bars["close"]).rolling("365D").min(),
+        "avg_volume_50": bars["volume"].rolling(50, min_periods=1).mean()
+    })
+    expected["log_return"] = np.log1p(expected["daily_return"])
+
+    def stored():
+        rows = db.query(StockPriceDerived).filter(
+            StockPriceDerived.stock_id == stock.id
+        ).order_by(StockPriceDerived.date).all()
+        return pd.DataFrame([
+            {name: getattr(row, name) for name in expected.columns} for row in rows
+        ], index=pd.to_datetime([row.date for row in rows]), dtype=float)
+
+    incremental = stored()
+    pd.testing.assert_frame_equal(incremental[expected.columns], expected, check_freq=False, rtol=1e-9)
+    # Nothing is stale, and a full rebuild writes the same values
+    assert DerivedSeriesService(db).backfill() == 0
+    DerivedSeriesService(db).rebuild(stock.id)
+    pd.testing.assert_frame_equal(stored(), incremental)
+
+    # Screens filter on the latest derived row
+    screen = ScreenService(db)
+    latest = incremental.iloc[-1]
+    for operator, value, matches in ((">=", latest["high_52w"], True), (">", latest["high_52w"], False)):
+        condition = screen._build_criteria_condition(
+            ScreenCriteria(field="high_52w", operator=operator, value=value)
+        )
+        assert (db.query(Stock.id).filter(condition).count() == 1) is matches
+
+    # Daily chart bars can carry the derived series
+    response = client.get(
+        f"/api/v1/stocks/prices/{stock.id}",
+        params={"start_date": days[-30].isoformat(), "end_date": today.isoformat(), "include_derived": True}
+    )
+    assert response.status_code == 200
+    rows = response.json()
+    assert len(rows) == 30
+    assert rows[-1]["high_52w"] == pytest.approx(latest["high_52w"])
+    assert rows[-1]["daily_return"] == pytest.approx(latest["daily_return"])
+    assert client.get(
+        f"/api/v1/stocks/prices/{stock.id}", params={"interval": "1w", "include_derived": True}
+    ).status_code == 400
+
+def test_price_cache_appends_committed_bars_without_reloading(db):
+    from app.services.price_cache import PriceHistoryCache
+
+    stocks = [add_stock(db, symbol=s) for s in ("AAA", "BBB")]
+    price_history = PriceHistoryService(db)
+    start = date(2024, 1, 1)
+
+    def bar(k, close=None):
+        return {"date": start + timedelta(days=k), "open": 1.0, "high": 2.0, "low": 0.5,
+                "close": close or 10.0 + k, "volume": 100 + k}
+
+    for stock in stocks:
+        price_history.upsert_bars(stock.id, [bar(k) for k in range(0, 20, 2)])
+
+    loads = []
+    def count_loads(conn, cursor, statement, *args):
+        if "FROM stock_prices" in statement:
+            loads.append(statement)
+    event.listen(engine, "before_cursor_execute", count_loads)
+    try:
+        first = price_history.get_price_columns([stocks[1].id, stocks[0].id], start, date(2024, 2, 1))
+        assert len(loads) == 1
+        # A new bar, a revised bar and a backfilled bar are merged in on commit
+        price_history.upsert_bars(stocks[0].id, [bar(20), bar(4, close=99.0), bar(5)])
+        loads.clear()
+        columns = price_history.get_price_columns([stocks[0].id], date(2024, 1, 3), date(2024, 1, 21))
+        assert loads == []
+    finally:
+        event.remove(engine, "before_cursor_execute", count_loads)
+
+    assert first["stock_id"].tolist() == [stocks[0].id] * 10 + [stocks[1].id] * 10
+    assert columns["date"].astype(str).tolist() == [
+        "2024-01-03", "2024-01-05", "2024-01-06", "2024-01-07", "2024-01-09", "2024-01-11", "2024-01-13",
+        "2024-01-15", "2024-01-17", "2024-01-19", "2024-01-21"
+    ]
+    assert columns["close"][:3].tolist() == [12.0, 99.0, 15.0]
+    assert columns["volume"][-1] == 120
+
+    # Same result as a fresh load, and deletes drop the cached history
+    price_cache.clear()
+    fresh = price_history.get_price_columns([stocks[0].id], date(2024, 1, 3), date(2024, 1, 21))
+    for name in columns:
+        assert fresh[name].tolist() == columns[name].tolist()
+    db.delete(db.query(StockPrice).filter(StockPrice.stock_id == stocks[0].id).first())
+    db.commit()
+    assert len(price_history.get_price_columns([stocks[0].id], start, date(2024, 2, 1))["date"]) == 11
+
+    # Least recently used histories go once the byte budget is exceeded
+    cache = PriceHistoryCache(max_bytes=600, ttl_seconds=300)
+    cache.get_histories(db, [stocks[0].id])
+    cache.get_histories(db, [stocks[1].id])
+    assert cache.size_bytes <= 600
+    assert list(cache._histories) == [stocks[1].id]
+
+def test_columnar_price_store_matches_sql_and_follows_commits(client, db, tmp_path, monkeypatch):
+    import os
+    from sqlalchemy import update
+    from app.services import price_store as price_store_module
+    from app.services.price_store import ColumnarPriceStore
+
+    stocks = [add_stock(db, symbol=s) for s in ("AAA", "BBB")]
+    price_history = PriceHistoryService(db)
+    start = date.today() - timedelta(days=400)
+
+    def bar(k, close=None):
+        return {"date": start + timedelta(days=k), "open": 1.0 + k, "high": 2.0 + k, "low": 0.5,
+                "close": close or 10.0 + k, "volume": None if k == 3 else 100 + k}
+
+    for i, stock in enumerate(stocks):
+        price_history.upsert_bars(stock.id, [bar(k) for k in range(i, 300, 3)])
+    window = (start + timedelta(days=20), start + timedelta(days=250))
+    expected = price_history.get_price_columns([s.id for s in stocks], *window)
+
+    store = ColumnarPriceStore(str(tmp_path))
+    monkeypatch.setattr(price_store_module, "price_store", store)
+    from_store = price_history.get_price_columns([stocks[1].id, stocks[0].id], *window)
+    for name, values in expected.items():
+        assert from_store[name].dtype == values.dtype, name
+        assert from_store[name].tolist() == values.tolist(), name
+
+    # Default JSON bars come from the memory map, not stock_prices
+    price_queries = []
+    def count_price_queries(conn, cursor, statement, *args):
+        if "FROM stock_prices" in statement:
+            price_queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_price_queries)
+    try:
+        prices = price_history.get_prices(stocks[0].id, *window)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_price_queries)
+    assert price_queries == []
+    in_window = expected["stock_id"] == stocks[0].id
+    assert [p.close for p in prices] == expected["close"][in_window].tolist()
+
+    # Writers of different stocks do not wait for each other
+    written = threading.Event()
+    def lock_other_stock():
+        with store._locked(stocks[1].id):
+            written.set()
+    with store._locked(stocks[0].id):
+        writer = threading.Thread(target=lock_other_stock)
+        writer.start()
+        assert written.wait(timeout=5)
+        writer.join()
+
+    # A new trailing bar goes into the file's spare capacity
+    path = os.path.join(str(tmp_path), f"{stocks[0].id}.ohlcv")
+    size = os.path.getsize(path)
+    price_history.upsert_bars(stocks[0].id, [bar(301)])
+    assert os.path.getsize(path) == size
+    # A revised bar rewrites the file
+    price_history.upsert_bars(stocks[0].id, [bar(3, close=99.0)])
+    history = store.read(stocks[0].id)
+    assert history["date"][-1] == (start + timedelta(days=301) - date(1970, 1, 1)).days
+    assert history["close"][1] == 99.0
+
+    # The same analytics come out of either backend
+    from_store = client.get("/api/v1/stocks/performance", params={"symbols": "AAA,BBB"}).json()
+    monkeypatch.setattr(price_store_module, "price_store", None)
+    analytics_cache.clear()
+    assert client.get("/api/v1/stocks/performance", params={"symbols": "AAA,BBB"}).json() == from_store
+
+    # Writes with unknown rows are caught up by reconcile
+    monkeypatch.setattr(price_store_module, "price_store", store)
+    db.execute(update(StockPrice).where(StockPrice.stock_id == stocks[1].id).values(close=1.0))
+    db.commit()
+    assert not os.path.exists(path)
+    assert store.reconcile(db) == 2
+    assert store.reconcile(db) == 0
+    assert store.read(stocks[1].id)["close"].tolist() == [1.0] * 100
+
+def test_price_store_locks_without_fcntl(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from app.services import price_store as price_store_module
+    from app.services.price_store import ColumnarPriceStore
+
+    calls = []
+    msvcrt = SimpleNamespace(
+        LK_LOCK=1, LK_UNLCK=0,
+        locking=lambda fd, mode, nbytes: calls.append((mode, nbytes))
+    )
+    monkeypatch.setattr(price_store_module, "fcntl", None)
+    monkeypatch.setattr(price_store_module, "msvcrt", msvcrt, raising=False)
+    store = ColumnarPriceStore(str(tmp_path))
+    with store._locked(7):
+        assert store._lock_file.tell() == 7
+    assert calls == [(1, 1), (0, 1)]
+
+def test_price_archive_moves_old_bars_and_reads_merge_tiers(client, db, tmp_path, monkeypatch):
+    import os
+    from app.services import price_archive as price_archive_module
+    from app.services.price_archive import PriceArchive
+    from app.services.price_store import ColumnarPriceStore
+    from app.services import price_store as price_store_module
+
+    stocks = [add_stock(db, symbol=s) for s in ("AAA", "BBB")]
+    price_history = PriceHistoryService(db)
+    today = date.today()
+    for i, stock in enumerate(stocks):
+        price_history.upsert_bars(stock.id, [
+            {"date": today - timedelta(days=900 - k), "open": 1.0, "high": 2.0, "low": 0.5,
+             "close": 50 + 10 * np.sin(k / 30 + i), "volume": 100 + k}
+            for k in range(0, 900, 2)
+        ])
+    window = (today - timedelta(days=800), today)
+    expected = price_history.get_price_columns([s.id for s in stocks], *window)
+    expected_rows = [(p.date, p.close) for p in price_history.get_prices(stocks[0].id, *window)]
+    performance = client.get("/api/v1/stocks/performance", params={"symbols": "AAA,BBB"}).json()
+
+    archive = PriceArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(price_archive_module, "price_archive", archive)
+    horizon = today - timedelta(days=500)
+    assert archive.compact(db, horizon) == 400
+    assert db.query(StockPrice).filter(StockPrice.date < horizon).count() == 0
+    years = sorted(os.listdir(tmp_path / "archive" / "symbol=AAA"))
+    assert years[-1] == f"year={(horizon - timedelta(days=1)).year}.parquet"
+
+    # Moving bars between tiers changes no range read, cached or not
+    price_cache.clear()
+    analytics_cache.clear()
+    for source in ("cache", "store"):
+        if source == "store":
+            monkeypatch.setattr(price_store_module, "price_store", ColumnarPriceStore(str(tmp_path / "store")))
+        columns = price_history.get_price_columns([s.id for s in stocks], *window)
+        for name, values in expected.items():
+            assert columns[name].tolist() == values.tolist(), (source, name)
+    assert [(p.date, p.close) for p in price_history.get_prices(stocks[0].id, *window)] == expected_rows
+    assert client.get("/api/v1/stocks/performance", params={"symbols": "AAA,BBB"}).json() == performance
+    assert price_store_module.price_store.reconcile(db) == 0
+
+def test_stock_price_partitions_ddl_and_ranges(monkeypatch):
+    from sqlalchemy import MetaData
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+    from app.db import partitioning
+
+    ddl = str(CreateTable(partitioning.partitioned_table(MetaData())).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (date)" in ddl
+    assert "PRIMARY KEY (id, date)" in ddl
+
+    start = partitioning._period_start(date(2024, 12, 17), "month")
+    assert partitioning._partition_name(start, "month") == "stock_prices_p2024_12"
+    assert partitioning._partition_range("stock_prices_p2024_12") == (date(2024, 12, 1), date(2025, 1, 1))
+    assert partitioning._partition_range("stock_prices_p2024") == (date(2024, 1, 1), date(2025, 1, 1))
+    assert partitioning._partition_range("stock_prices_default") is None
+
+    # Other databases keep the plain table
+    monkeypatch.setattr(partitioning.settings, "PRICE_RETENTION_DAYS", 730)
+    assert not partitioning.is_enabled(engine)
+    assert partitioning.ensure_partitions(engine) == []
+    assert partitioning.drop_expired_partitions(engine) == []
+
+def test_trim_coverage_forgets_dropped_dates(db):
+    from app.db.partitioning import trim_coverage
+    from app.models.stock import StockPriceCoverage
+
+    stock = add_stock(db)
+    db.add_all([
+        StockPriceCoverage(stock_id=stock.id, start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)),
+        StockPriceCoverage(stock_id=stock.id, start_date=date(2021, 1, 1), end_date=date(2023, 6, 30))
+    ])
+    db.commit()
+
+    with engine.begin() as conn:
+        trim_coverage(conn, date(2022, 1, 1))
+
+    assert db.query(StockPriceCoverage.start_date, StockPriceCoverage.end_date).all() == [
+        (date(2022, 1, 1), date(2023, 6, 30))
+    ]
+    # The dropped years are fetched again when requested
+    assert PriceHistoryService(db).get_missing_ranges(stock.id, date(2021, 6, 1), date(2022, 6, 30)) == [
+        (date(2021, 6, 1), date(2021, 12, 31))
+    ]